@@ -0,0 +1,382 @@
+################################################################################
+# benchmarks/bench_vax.py
+################################################################################
+"""Benchmarks for the vax converters.
+
+Every input type that the converters handle differently is timed at a range of sizes,
+from a single scalar up to 10^8 elements. For each case, the best time per call, the
+corresponding throughput in GB/s, and the number of calls timed are recorded; the time
+per call at the smallest size is the per-call overhead.
+
+Run as a script to write the results as JSON, optionally comparing them with a previous
+run:
+
+    python benchmarks/bench_vax.py --max-size 1e8 --json results.json
+    python benchmarks/bench_vax.py --json new.json --compare results.json
+
+With --scalar, the functions for single values, such as vax32_to_float, are also
+compared with the array functions on 1 to 64 values at a time.
+
+Or run the (small) default sizes with pytest, which is not part of the default test run:
+
+    python -m pytest benchmarks/bench_vax.py
+
+Under pytest, the environment variables VAX_BENCH_MAX_SIZE and VAX_BENCH_JSON set the
+largest size and the JSON output path.
+"""
+
+import argparse
+import json
+import numpy as np
+import os
+import platform
+import sys
+import timeit
+import unittest
+
+import vax
+
+# Sizes in elements; 1 means a scalar input. Other sizes must be even, so that the same
+# values can be viewed as complex.
+SIZES = [1, 10, 10**3, 10**5, 10**6, 10**7, 10**8]
+
+# Inputs converted one element at a time in Python are limited to this many elements
+SLOW_LIMIT = 10**6
+
+# Numbers of values converted by the comparisons of the scalar and array functions
+SCALAR_SIZES = [1, 2, 4, 8, 16, 32, 64]
+
+
+def _vax32_bytes(size):
+    values = np.random.default_rng(32).uniform(-1.e6, 1.e6, size).astype('<f4')
+    return vax.to_vax32_bytes(values)
+
+
+def _vax64_bytes(size):
+    values = np.random.default_rng(64).uniform(-1.e6, 1.e6, size)
+    return vax.to_vax64_bytes(values)
+
+
+def _ieee(size, dtype):
+    return np.random.default_rng(0).uniform(-1.e6, 1.e6, size).astype(dtype)
+
+
+def _raw_cases(make_bytes, array_dtypes, float_dtype, complex_dtype):
+    """Input cases for a decoder; each builder returns (data, nbytes) for a size."""
+
+    def build(kind):
+        def builder(size):
+            raw = make_bytes(size)
+            if kind == 'bytes':
+                data = raw
+            elif kind == 'bytearray':
+                data = bytearray(raw)
+            elif kind == 'memoryview':
+                data = memoryview(bytearray(raw))
+            elif kind == 'str':
+                data = raw.decode('latin8')
+            elif kind == 'list':
+                data = np.frombuffer(raw, dtype=float_dtype).tolist()
+            elif kind == 'scalar':
+                data = np.frombuffer(raw, dtype=float_dtype)[0]
+            else:
+                data = np.frombuffer(raw, dtype=kind)
+            return (data, len(raw))
+        return builder
+
+    kinds = (['scalar', 'bytes', 'bytearray', 'memoryview', 'str', 'list']
+             + list(array_dtypes) + [float_dtype, complex_dtype])
+    return [(kind, build(kind)) for kind in kinds]
+
+
+def _ieee_cases(float_dtypes, complex_dtype):
+    """Input cases for an encoder; each builder returns (data, nbytes) for a size."""
+
+    def build(kind):
+        def builder(size):
+            if kind == 'scalar':
+                data = float(_ieee(1, 'f8')[0])
+                return (data, 8)
+            if kind == 'list':
+                data = _ieee(size, 'f8').tolist()
+                return (data, 8 * size)
+            if kind == complex_dtype:
+                real = '<f4' if kind == '<c8' else '<f8'
+                data = _ieee(size, real).view(kind)
+                return (data, data.nbytes)
+            data = _ieee(size, kind)
+            return (data, data.nbytes)
+        return builder
+
+    kinds = ['scalar', 'list'] + list(float_dtypes) + [complex_dtype]
+    return [(kind, build(kind)) for kind in kinds]
+
+
+# (function name, function, input cases)
+BENCHMARKS = [
+    ('from_vax32', vax.from_vax32,
+     _raw_cases(_vax32_bytes, ['<u1', '<u2', '<u4', '<i1', '<i2', '<i4'],
+                '<f4', '<c8')),
+    ('from_vax64', vax.from_vax64,
+     _raw_cases(_vax64_bytes,
+                ['<u1', '<u2', '<u4', '<u8', '<i1', '<i2', '<i4', '<i8'],
+                '<f8', '<c16')),
+    ('to_vax32', vax.to_vax32, _ieee_cases(['<f4', '<f8'], '<c8')),
+    ('to_vax32_bytes', vax.to_vax32_bytes, _ieee_cases(['<f4', '<f8'], '<c8')),
+    ('to_vax64', vax.to_vax64, _ieee_cases(['<f8'], '<c16')),
+    ('to_vax64_bytes', vax.to_vax64_bytes, _ieee_cases(['<f8'], '<c16')),
+]
+
+
+def _scalar_cases():
+    """(scalar name, array name, builder) for each scalar function; each builder returns
+    (scalar call, array call) converting the same values for a size."""
+
+    def decoder(scalar_func, array_func, make_bytes, itemsize):
+        def builder(size):
+            data = make_bytes(size)
+            offsets = range(0, size * itemsize, itemsize)
+            return (lambda: [scalar_func(data, offset) for offset in offsets],
+                    lambda: array_func(data))
+        return builder
+
+    def encoder(scalar_func, array_func, dtype):
+        def builder(size):
+            array = _ieee(size, dtype)
+            values = array.tolist()
+            return (lambda: [scalar_func(value) for value in values],
+                    lambda: array_func(array))
+        return builder
+
+    return [('vax32_to_float', 'from_vax32',
+             decoder(vax.vax32_to_float, vax.from_vax32, _vax32_bytes, 4)),
+            ('vax64_to_float', 'from_vax64',
+             decoder(vax.vax64_to_float, vax.from_vax64, _vax64_bytes, 8)),
+            ('float_to_vax32', 'to_vax32_bytes',
+             encoder(vax.float_to_vax32, vax.to_vax32_bytes, '<f4')),
+            ('float_to_vax64', 'to_vax64_bytes',
+             encoder(vax.float_to_vax64, vax.to_vax64_bytes, '<f8'))]
+
+
+def time_call(func, data, min_time=0.2, repeat=5):
+    """Return (best seconds per call, number of calls per timing) for func(data)."""
+
+    timer = timeit.Timer(lambda: func(data))
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time / repeat or number >= 10**6:
+            break
+        number *= 10
+
+    best = min([elapsed] + timer.repeat(repeat=repeat - 1, number=number))
+    return (best / number, number)
+
+
+def run(max_size=10**6, functions=None, min_time=0.2, nthreads=None, engine=None,
+        verbose=False):
+    """Run the benchmarks and return the results as a JSON-compatible dict.
+
+    Args:
+        max_size (int, optional): The largest number of elements to time.
+        functions (list, optional): Names of the functions to time; None for all.
+        min_time (float, optional): Approximate total seconds to spend on each case.
+        nthreads (int, optional): If given, the number of threads passed to
+            `vax.set_nthreads` for the run.
+        engine (str, optional): If given, the single-precision engine passed to
+            `vax.set_engine` for the run.
+        verbose (bool, optional): True to print each result as it is measured.
+
+    Returns:
+        dict: The platform description under "environment", and a list of results, one
+            per function, input type, and size, under "results".
+    """
+
+    if nthreads is not None:
+        previous = vax.set_nthreads(nthreads)
+    if engine is not None:
+        previous_engine = vax.set_engine(engine)
+
+    results = []
+    try:
+        for (name, func, cases) in BENCHMARKS:
+            if functions and name not in functions:
+                continue
+
+            for (kind, builder) in cases:
+                for size in SIZES:
+                    if size > max_size or (kind == 'scalar') != (size == 1):
+                        continue
+                    if kind in ('list', 'str') and size > SLOW_LIMIT:
+                        continue
+
+                    (data, nbytes) = builder(size)
+                    (seconds, calls) = time_call(func, data, min_time=min_time)
+                    result = {'function': name,
+                              'input': kind,
+                              'size': size,
+                              'nbytes': nbytes,
+                              'calls': calls,
+                              'usec_per_call': seconds * 1.e6,
+                              'gb_per_s': nbytes / seconds / 1.e9}
+                    results.append(result)
+                    if verbose:
+                        print('%-15s %-10s %10d  %12.2f usec  %8.3f GB/s'
+                              % (name, kind, size, result['usec_per_call'],
+                                 result['gb_per_s']))
+    finally:
+        if nthreads is not None:
+            vax.set_nthreads(previous)
+        if engine is not None:
+            vax.set_engine(previous_engine)
+
+    environment = {'vax': vax.__version__,
+                   'numpy': np.__version__,
+                   'python': platform.python_version(),
+                   'platform': platform.platform(),
+                   'processor': platform.processor(),
+                   'cpu_count': os.cpu_count(),
+                   'nthreads': vax.get_nthreads() if nthreads is None else nthreads,
+                   'engine': vax.get_engine() if engine is None else engine}
+
+    return {'environment': environment, 'results': results}
+
+
+def run_scalar(min_time=0.2, verbose=False):
+    """Compare the scalar functions with the array functions on a few values at a time.
+
+    Args:
+        min_time (float, optional): Approximate total seconds to spend on each case.
+        verbose (bool, optional): True to print each result as it is measured.
+
+    Returns:
+        list: One dict per scalar function and size, giving the microseconds to convert
+            that many values with one call to the scalar function per value, and with one
+            call to the array function.
+    """
+
+    results = []
+    for (name, array_name, builder) in _scalar_cases():
+        for size in SCALAR_SIZES:
+            (scalar_call, array_call) = builder(size)
+            scalar_seconds = time_call(lambda _: scalar_call(), None, min_time)[0]
+            array_seconds = time_call(lambda _: array_call(), None, min_time)[0]
+            result = {'function': name,
+                      'array_function': array_name,
+                      'size': size,
+                      'scalar_usec': scalar_seconds * 1.e6,
+                      'array_usec': array_seconds * 1.e6}
+            results.append(result)
+            if verbose:
+                print('%-15s %-15s %3d  %10.2f usec  %10.2f usec'
+                      % (name, array_name, size, result['scalar_usec'],
+                         result['array_usec']))
+
+    return results
+
+
+def compare(old, new):
+    """Return lines comparing the throughput of two sets of results.
+
+    Each line shows the old and new times per call and their ratio; ratios above 1 are
+    slowdowns.
+    """
+
+    def key(result):
+        return (result['function'], result['input'], result['size'])
+
+    old_results = {key(result): result for result in old['results']}
+    lines = []
+    for result in new['results']:
+        prior = old_results.get(key(result))
+        if prior is None:
+            continue
+        ratio = result['usec_per_call'] / prior['usec_per_call']
+        lines.append('%-15s %-10s %10d  %12.2f -> %12.2f usec  x%.2f'
+                     % (key(result) + (prior['usec_per_call'],
+                                       result['usec_per_call'], ratio)))
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the vax converters.')
+    parser.add_argument('--max-size', type=float, default=10**6,
+                        help='largest number of elements to time (default 1e6; at most '
+                             '1e8)')
+    parser.add_argument('--function', action='append', dest='functions',
+                        choices=[name for (name, _, _) in BENCHMARKS],
+                        help='function to time; may be repeated (default all)')
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='approximate seconds to spend on each case (default 0.2)')
+    parser.add_argument('--nthreads', type=int,
+                        help='number of conversion threads (default: vax default)')
+    parser.add_argument('--engine', choices=['int', 'float'],
+                        help='single-precision engine (default: vax default)')
+    parser.add_argument('--json', metavar='PATH',
+                        help='file to write the results to (default: stdout)')
+    parser.add_argument('--compare', metavar='PATH',
+                        help='JSON results of an earlier run to compare against')
+    parser.add_argument('--scalar', action='store_true',
+                        help='also compare the scalar and array functions on 1 to 64 '
+                             'values')
+    args = parser.parse_args(argv)
+
+    report = run(max_size=int(args.max_size), functions=args.functions,
+                 min_time=args.min_time, nthreads=args.nthreads, engine=args.engine,
+                 verbose=bool(args.json))
+    if args.scalar:
+        report['scalar_results'] = run_scalar(min_time=args.min_time,
+                                              verbose=bool(args.json))
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if args.json:
+        with open(args.json, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        print('\n'.join(compare(old, report)), file=sys.stderr if not args.json
+              else sys.stdout)
+
+    return 0
+
+
+class Test_Benchmarks(unittest.TestCase):
+
+    def test_benchmarks(self):
+
+        max_size = int(float(os.environ.get('VAX_BENCH_MAX_SIZE', 10**3)))
+        report = run(max_size=max_size, min_time=0.01)
+
+        cases = set((result['function'], result['input'])
+                    for result in report['results'])
+        for (name, _, inputs) in BENCHMARKS:
+            for (kind, _) in inputs:
+                self.assertIn((name, kind), cases)
+
+        for result in report['results']:
+            self.assertGreater(result['usec_per_call'], 0.)
+            self.assertGreater(result['gb_per_s'], 0.)
+
+        self.assertEqual(len(compare(report, report)), len(report['results']))
+
+        report['scalar_results'] = run_scalar(min_time=0.001)
+        self.assertEqual(len(report['scalar_results']),
+                         len(_scalar_cases()) * len(SCALAR_SIZES))
+        for result in report['scalar_results']:
+            self.assertGreater(result['scalar_usec'], 0.)
+            self.assertGreater(result['array_usec'], 0.)
+
+        path = os.environ.get('VAX_BENCH_JSON')
+        if path:
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+################################################################################
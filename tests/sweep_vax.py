@@ -0,0 +1,422 @@
+################################################################################
+# tests/sweep_vax.py
+################################################################################
+"""Exhaustive and sampled bit-pattern verification of the vax converters.
+
+A new conversion engine must reproduce the results of the current ones exactly. This
+script compares a candidate kernel with a reference kernel, bit for bit:
+
+- For `from_vax32` and `to_vax32`, every one of the 2**32 bit patterns is converted, in
+  chunks divided among worker processes.
+- For `from_vax64` and `to_vax64`, the 64-bit patterns are sampled by stratum: for each
+  combination of sign and exponent, the fractions zero, one, and all ones are tried,
+  along with the given number of random fractions.
+
+Mismatches are counted by the class of the input: for VAX inputs, "zero", "dirty zero",
+"reserved", "denormal-producing" (exponents 1 and 2, which become IEEE denormals),
+"overflow" (exponent 255, which becomes an IEEE infinity or NaN), and "normal"; for
+IEEE inputs, "zero", "denormal", "underflow" (below the D-floating range), "normal",
+"overflow" (above the VAX range), "infinity", and "nan". Each class lists a few of its
+mismatching inputs, with the expected and actual results.
+
+    python tests/sweep_vax.py from_vax32 -j 32
+    python tests/sweep_vax.py to_vax32 --option overflow=wrap --json sweep.json
+    python tests/sweep_vax.py from_vax64 --samples 100000
+    python tests/sweep_vax.py from_vax32 --candidate mypackage.fast:from_vax32
+
+A kernel is "int" or "float", for the engines of `vax.from_vax32` and `vax.to_vax32`;
+"vax", for the vax function with its default settings; "scalar", for the functions for
+single values, such as `vax.vax32_to_float`, called once per value, which is slow but
+shares little code with the array functions; or "module:function", for any function
+with the signature of the vax function. Each `--option` is passed to both kernels,
+other than "scalar" ones. Options under which a kernel raises an exception, such as
+special=raise, cannot be swept.
+
+The default comparisons are "int" against "float" for single precision and "scalar"
+against "vax" for double precision. The exit status is 1 if any result differs.
+"""
+
+import argparse
+import functools
+import importlib
+import json
+import numpy as np
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Run as a script from a source checkout, sys.path[0] is this directory; the package and
+# the "tests" modules named by --candidate are found from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import vax                                                  # noqa: E402
+
+# Classes of input values for each function, in the order of their codes
+CLASSES = {
+    'from_vax32': ['zero', 'dirty zero', 'reserved', 'denormal-producing', 'overflow',
+                   'normal'],
+    'from_vax64': ['zero', 'dirty zero', 'reserved', 'normal'],
+    'to_vax32': ['zero', 'denormal', 'normal', 'overflow', 'infinity', 'nan'],
+    'to_vax64': ['zero', 'denormal', 'underflow', 'normal', 'overflow', 'infinity',
+                 'nan'],
+}
+
+# The unsigned dtype of the bit patterns and the float dtype through which each
+# function receives them
+DTYPES = {'from_vax32': ('<u4', '<f4'),
+          'from_vax64': ('<u8', '<f8'),
+          'to_vax32': ('<u4', '<f4'),
+          'to_vax64': ('<u8', '<f8')}
+
+# Default number of 32-bit patterns per chunk
+CHUNK = 1 << 24
+
+# Default number of random fractions per stratum of 64-bit patterns
+SAMPLES = 1000
+
+
+def sweep32(function='from_vax32', reference='int', candidate='float', options=None,
+            start=0, stop=1 << 32, chunk=CHUNK, nprocs=None, examples=10,
+            verbose=False):
+    """Compare two single-precision kernels on a range of 32-bit patterns.
+
+    Args:
+        function (str): "from_vax32" or "to_vax32".
+        reference (str): The reference kernel; see the module description.
+        candidate (str): The candidate kernel.
+        options (dict, optional): Keyword arguments for both kernels.
+        start (int, optional): The first pattern.
+        stop (int, optional): One more than the last pattern; the default is 2**32.
+        chunk (int, optional): The number of patterns converted at a time.
+        nprocs (int, optional): The number of worker processes; None or 0 for one per
+            CPU, 1 to work in this process.
+        examples (int, optional): The number of mismatches to list for each class.
+        verbose (bool, optional): True to print progress to stderr.
+
+    Returns:
+        dict: The report; see `_run`.
+    """
+
+    if function not in ('from_vax32', 'to_vax32'):
+        raise ValueError('invalid function for a 32-bit sweep: ' + repr(function))
+
+    tasks = [(function, reference, candidate, options or {}, examples,
+              (first, min(first + chunk, stop))) for first in range(start, stop, chunk)]
+    return _run(tasks, nprocs, verbose)
+
+
+def sample64(function='from_vax64', reference='scalar', candidate='vax', options=None,
+             samples=SAMPLES, seed=0, nprocs=None, examples=10, verbose=False):
+    """Compare two double-precision kernels on a stratified sample of 64-bit patterns.
+
+    Each stratum is one combination of sign and exponent: 512 strata for VAX inputs
+    and 4096 for IEEE inputs. The sample is the same for any number of processes.
+
+    Args:
+        function (str): "from_vax64" or "to_vax64".
+        reference (str): The reference kernel; see the module description.
+        candidate (str): The candidate kernel.
+        options (dict, optional): Keyword arguments for both kernels.
+        samples (int, optional): The number of random fractions per stratum.
+        seed (int, optional): The seed of the random fractions.
+        nprocs (int, optional): The number of worker processes; None or 0 for one per
+            CPU, 1 to work in this process.
+        examples (int, optional): The number of mismatches to list for each class.
+        verbose (bool, optional): True to print progress to stderr.
+
+    Returns:
+        dict: The report; see `_run`.
+    """
+
+    if function not in ('from_vax64', 'to_vax64'):
+        raise ValueError('invalid function for a 64-bit sample: ' + repr(function))
+
+    (_, table) = _lookup(function)
+    strata = len(table)
+    step = 64
+    tasks = [(function, reference, candidate, options or {}, examples,
+              (first, min(first + step, strata), samples, seed))
+             for first in range(0, strata, step)]
+    return _run(tasks, nprocs, verbose)
+
+
+def classify(function, bits):
+    """The class code of each input bit pattern, as an index into CLASSES[function]."""
+
+    (shift, table) = _lookup(function)
+    names = CLASSES[function]
+    codes = table[(bits >> shift) & (len(table) - 1)]
+
+    if function.startswith('from'):
+        codes[bits == 0] = names.index('zero')
+    else:
+        magnitude = bits & ((1 << (8 * bits.itemsize - 1)) - 1)
+        codes[magnitude == 0] = names.index('zero')
+        codes[magnitude == (len(table) // 2 - 1) << shift] = names.index('infinity')
+
+    return codes
+
+
+@functools.lru_cache()
+def _lookup(function):
+    """A table of class codes indexed by the sign and exponent of an input, and the
+    shift that moves the sign and exponent to the low bits."""
+
+    names = CLASSES[function]
+    code = names.index
+
+    if function.startswith('from'):
+        table = np.full(512, code('normal'), dtype='u1')
+        table[0] = code('dirty zero')
+        table[256] = code('reserved')
+        if function == 'from_vax32':
+            table[[1, 2, 257, 258]] = code('denormal-producing')
+            table[[255, 511]] = code('overflow')
+        return (7, table)
+
+    if function == 'to_vax32':
+        exponent = np.arange(512) & 0xff
+        table = np.select([exponent == 0, exponent < 254, exponent == 254],
+                          [code('denormal'), code('normal'), code('overflow')],
+                          code('nan'))
+        return (23, table.astype('u1'))
+
+    # D-floating magnitudes run from 2**-128 up to, but not including, 2**127
+    exponent = np.arange(4096) & 0x7ff
+    table = np.select([exponent == 0, exponent < 0x37f, exponent < 0x47e,
+                       exponent < 0x7ff],
+                      [code('denormal'), code('underflow'), code('normal'),
+                       code('overflow')], code('nan'))
+    return (52, table.astype('u1'))
+
+
+def _patterns(function, task):
+    """The bit patterns of one task."""
+
+    (udtype, _) = DTYPES[function]
+    if function.endswith('32'):
+        (first, last) = task
+        bits = np.arange(last - first, dtype=udtype)
+        bits += np.uint32(first)
+        return bits
+
+    (first, last, samples, seed) = task
+    (shift, table) = _lookup(function)
+    fraction = ~np.uint64((len(table) - 1) << shift)
+
+    blocks = []
+    for stratum in range(first, last):
+        rng = np.random.default_rng([seed, stratum])
+        random = rng.integers(0, 1 << 64, samples, dtype='u8', endpoint=False)
+        bits = np.concatenate([np.array([0, 1, fraction], dtype='u8'), random & fraction])
+        bits |= np.uint64(stratum << shift)
+        blocks.append(bits)
+
+    return np.concatenate(blocks).astype(udtype)
+
+
+def _scalar(function):
+    """A kernel calling the function for single values once per value."""
+
+    if function == 'from_vax32':
+        return lambda values: np.array([vax.vax32_to_float(data, k)
+                                        for data in [values.tobytes()]
+                                        for k in range(0, len(data), 4)], dtype='<f4')
+    if function == 'from_vax64':
+        return lambda values: np.array([vax.vax64_to_float(data, k)
+                                        for data in [values.tobytes()]
+                                        for k in range(0, len(data), 8)], dtype='<f8')
+    if function == 'to_vax32':
+        return lambda values: np.frombuffer(b''.join(vax.float_to_vax32(value) for
+                                                     value in values.tolist()),
+                                            dtype='<f4')
+    return lambda values: np.frombuffer(b''.join(vax.float_to_vax64(value) for
+                                                 value in values.tolist()), dtype='<f8')
+
+
+def _kernel(function, spec, options):
+    """A function converting an array of bit patterns into an array of result bits."""
+
+    if spec in ('int', 'float'):
+        if not function.endswith('32'):
+            raise ValueError('engine ' + repr(spec) + ' is not available for '
+                             + function)
+        func = functools.partial(getattr(vax, function), engine=spec, **options)
+    elif spec == 'vax':
+        func = functools.partial(getattr(vax, function), **options)
+    elif spec == 'scalar':
+        func = _scalar(function)
+    elif ':' in spec:
+        (module, name) = spec.split(':', 1)
+        func = functools.partial(getattr(importlib.import_module(module), name),
+                                 **options)
+    else:
+        raise ValueError('invalid kernel: ' + repr(spec))
+
+    (udtype, fdtype) = DTYPES[function]
+
+    def call(bits):
+        with np.errstate(all='ignore'):
+            result = np.asarray(func(bits.view(fdtype)))
+        if result.dtype.itemsize != bits.itemsize or result.size != bits.size:
+            raise ValueError('kernel ' + repr(spec) + ' returned ' + str(result.size)
+                             + ' values of dtype ' + str(result.dtype))
+        return np.ascontiguousarray(result).view(udtype).reshape(-1)
+
+    return call
+
+
+def _work(task):
+    """Run one task, returning its partial report."""
+
+    (function, reference, candidate, options, examples, patterns) = task
+    bits = _patterns(function, patterns)
+    expected = _kernel(function, reference, options)(bits)
+    actual = _kernel(function, candidate, options)(bits)
+
+    names = CLASSES[function]
+    codes = classify(function, bits)
+    counts = np.bincount(codes, minlength=len(names))
+    bad = np.flatnonzero(expected != actual)
+    mismatches = np.bincount(codes[bad], minlength=len(names))
+
+    digits = 2 * bits.itemsize
+    classes = {}
+    for (code, name) in enumerate(names):
+        indices = bad[codes[bad] == code][:examples]
+        classes[name] = {'count': int(counts[code]),
+                         'mismatches': int(mismatches[code]),
+                         'examples': [{'input': '0x%0*x' % (digits, bits[k]),
+                                       'expected': '0x%0*x' % (digits, expected[k]),
+                                       'actual': '0x%0*x' % (digits, actual[k])}
+                                      for k in indices]}
+    return classes
+
+
+def _run(tasks, nprocs, verbose):
+    """Run the tasks, in worker processes unless nprocs is 1, and merge their reports.
+
+    Returns:
+        dict: The report, containing "function", "reference", "candidate", "options",
+            "patterns" (the number compared), "mismatches" (the number that differ),
+            "seconds", and "classes". The last maps each class name to a dictionary
+            of "count", "mismatches", and "examples", which lists mismatching inputs
+            with their expected and actual results, as hexadecimal strings of the bits
+            in little-endian order.
+    """
+
+    (function, reference, candidate, options, examples, _) = tasks[0]
+    for spec in (reference, candidate):
+        _kernel(function, spec, options)        # validate before starting any work
+
+    begin = time.perf_counter()
+    classes = {name: {'count': 0, 'mismatches': 0, 'examples': []}
+               for name in CLASSES[function]}
+
+    nprocs = nprocs or os.cpu_count() or 1
+    if nprocs == 1 or len(tasks) == 1:
+        results = map(_work, tasks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(max_workers=min(nprocs, len(tasks)))
+        results = executor.map(_work, tasks)
+
+    try:
+        for (k, result) in enumerate(results):
+            for (name, partial) in result.items():
+                merged = classes[name]
+                merged['count'] += partial['count']
+                merged['mismatches'] += partial['mismatches']
+                merged['examples'] += partial['examples'][:examples
+                                                          - len(merged['examples'])]
+            if verbose:
+                print('%s: %d of %d tasks complete' % (function, k + 1, len(tasks)),
+                      file=sys.stderr)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    return {'function': function,
+            'reference': reference,
+            'candidate': candidate,
+            'options': options,
+            'patterns': sum(c['count'] for c in classes.values()),
+            'mismatches': sum(c['mismatches'] for c in classes.values()),
+            'seconds': time.perf_counter() - begin,
+            'classes': classes}
+
+
+def _option(text):
+    """Parse an option given as KEY=VALUE."""
+
+    (key, sep, value) = text.partition('=')
+    if not sep or not key:
+        raise argparse.ArgumentTypeError('options must be given as KEY=VALUE')
+    return (key, value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare vax conversion kernels on '
+                                                 'every 32-bit pattern or a stratified '
+                                                 'sample of 64-bit patterns.')
+    parser.add_argument('function', choices=sorted(CLASSES),
+                        help='the conversion to verify')
+    parser.add_argument('--reference',
+                        help='reference kernel (default "int" for single precision, '
+                             '"scalar" for double precision)')
+    parser.add_argument('--candidate',
+                        help='candidate kernel (default "float" for single precision, '
+                             '"vax" for double precision)')
+    parser.add_argument('--option', action='append', type=_option, default=[],
+                        metavar='KEY=VALUE',
+                        help='keyword argument for both kernels; may be repeated')
+    parser.add_argument('-j', '--nprocs', type=int,
+                        help='number of worker processes (default one per CPU)')
+    parser.add_argument('--start', type=lambda text: int(text, 0), default=0,
+                        help='first 32-bit pattern (default 0)')
+    parser.add_argument('--stop', type=lambda text: int(text, 0), default=1 << 32,
+                        help='one more than the last 32-bit pattern (default 2**32)')
+    parser.add_argument('--chunk', type=int, default=CHUNK,
+                        help='32-bit patterns per task (default 2**24)')
+    parser.add_argument('--samples', type=int, default=SAMPLES,
+                        help='random fractions per stratum of 64-bit patterns '
+                             '(default %d)' % SAMPLES)
+    parser.add_argument('--seed', type=int, default=0,
+                        help='seed of the 64-bit sample (default 0)')
+    parser.add_argument('--examples', type=int, default=10,
+                        help='mismatches to list per class (default 10)')
+    parser.add_argument('--json', metavar='PATH',
+                        help='file to write the report to (default: stdout)')
+    args = parser.parse_args(argv)
+
+    options = dict(args.option)
+    if args.function.endswith('32'):
+        report = sweep32(args.function, args.reference or 'int',
+                         args.candidate or 'float', options, start=args.start,
+                         stop=args.stop, chunk=args.chunk, nprocs=args.nprocs,
+                         examples=args.examples, verbose=True)
+    else:
+        report = sample64(args.function, args.reference or 'scalar',
+                          args.candidate or 'vax', options, samples=args.samples,
+                          seed=args.seed, nprocs=args.nprocs, examples=args.examples,
+                          verbose=True)
+
+    text = json.dumps(report, indent=2)
+    if args.json:
+        with open(args.json, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    for (name, result) in report['classes'].items():
+        print('%-20s %12d patterns  %12d mismatches'
+              % (name, result['count'], result['mismatches']), file=sys.stderr)
+
+    return 1 if report['mismatches'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+################################################################################
@@ -0,0 +1,76 @@
+################################################################################
+# tests/test_array.py
+################################################################################
+
+import numpy as np
+import os
+import sys
+import tempfile
+import unittest
+
+from vax import VaxArray, from_vax32, to_vax32_bytes, to_vax64_bytes
+
+
+class Test_VaxArray(unittest.TestCase):
+
+    def test_vaxarray(self):
+
+        vax_dir = os.path.split(sys.modules['vax'].__file__)[0]
+        parent = os.path.split(vax_dir)[0]
+        test_file = os.path.join(parent, 'test_files', 'C3490702_GEOMA.DAT')
+        answer = from_vax32(np.fromfile(test_file, dtype='<f4')[1536//4:])
+
+        # Explicit shape
+        array = VaxArray(test_file, 1536, (552, 4))
+        table = answer[:552*4].reshape(552, 4)
+        self.assertEqual(array.shape, (552, 4))
+        self.assertEqual(array.dtype, np.dtype('<f4'))
+        self.assertEqual(array.ndim, 2)
+        self.assertEqual(array.size, 552*4)
+        self.assertEqual(len(array), 552)
+        self.assertIn('C3490702_GEOMA.DAT', repr(array))
+
+        self.assertTrue(np.all(array[100:200, ::2] == table[100:200, ::2]))
+        self.assertTrue(np.all(array[-5:, 1] == table[-5:, 1]))
+        self.assertTrue(np.all(array[[3, 1, 4]] == table[[3, 1, 4]]))
+        self.assertTrue(np.all(array[table[:, 0] > 100.] == table[table[:, 0] > 100.]))
+        self.assertEqual(array[9, 3], table[9, 3])
+        self.assertIsInstance(array[9, 3], np.float32)
+
+        self.assertTrue(np.all(np.asarray(array) == table))
+        self.assertEqual(np.asarray(array, dtype='f8').dtype, np.dtype('f8'))
+        self.assertEqual(np.sum(array, axis=0).shape, (4,))
+
+        # Shape inferred from the file size
+        array = VaxArray(test_file, offset=1536)
+        self.assertEqual(array.shape, answer.shape)
+        self.assertTrue(np.all(array[:] == answer))
+
+        self.assertRaises(ValueError, VaxArray, test_file, 0, (10,), 'f8')
+        self.assertRaises(ValueError, VaxArray, test_file, 0, (10000,))
+
+    def test_vaxarray_kinds(self):
+
+        ieee = np.arange(-60., 60.).reshape(4, 5, 6)
+        with tempfile.TemporaryDirectory() as tempdir:
+            for kind, data, real, dtype in [
+                    ('f4',   to_vax32_bytes(ieee.astype('f4')), '<f4', '<f4'),
+                    ('c8',   to_vax32_bytes(ieee.astype('f4')), '<f4', '<c8'),
+                    ('d8',   to_vax64_bytes(ieee), '<f8', '<f8'),
+                    ('dc16', to_vax64_bytes(ieee), '<f8', '<c16')]:
+
+                path = os.path.join(tempdir, kind + '.dat')
+                with open(path, 'wb') as f:
+                    f.write(b'header')
+                    f.write(data)
+
+                expected = ieee.astype(real).view(dtype)
+
+                array = VaxArray(path, 6, expected.shape, kind=kind)
+                self.assertEqual(array.dtype, np.dtype(dtype))
+                self.assertTrue(np.all(array[1:3, ::2, -1] == expected[1:3, ::2, -1]))
+                self.assertTrue(np.all(np.asarray(array) == expected))
+
+                if int(np.__version__.split('.')[0]) >= 2:
+                    self.assertRaises(ValueError, np.array, array, copy=False)
+                del array       # release the memory map before the file is deleted
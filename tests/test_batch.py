@@ -0,0 +1,90 @@
+################################################################################
+# tests/test_batch.py
+################################################################################
+
+import numpy as np
+import unittest
+
+from vax import (from_vax32, from_vax32_many, from_vax64_many, to_vax32, to_vax32_bytes,
+                 to_vax32_many, to_vax64_bytes)
+
+
+class Test_Batch(unittest.TestCase):
+
+    def test_from_vax32_many(self):
+
+        values = np.random.RandomState(19).randn(40).astype('<f4')
+        data = to_vax32_bytes(values)
+        sizes = [0, 1, 4, 7, 3, 0, 25]
+        bounds = np.cumsum([0] + sizes)
+        buffers = [data[4*start:4*stop] for (start, stop) in zip(bounds, bounds[1:])]
+
+        # Other buffer types, including ones whose len() is not their size in bytes
+        buffers[2] = bytearray(buffers[2])
+        buffers[3] = memoryview(np.frombuffer(buffers[3], dtype='<u4'))
+        buffers[4] = np.frombuffer(buffers[4], dtype='<u2').reshape(3, 2)
+
+        results = from_vax32_many(buffers)
+        self.assertEqual(len(results), len(sizes))
+        for (result, start, stop) in zip(results, bounds, bounds[1:]):
+            self.assertEqual(result.dtype, np.dtype('<f4'))
+            self.assertEqual(result.tobytes(), values[start:stop].tobytes())
+
+        (flat, offsets) = from_vax32_many(iter(buffers), flat=True)
+        self.assertEqual(flat.tobytes(), values.tobytes())
+        self.assertEqual(list(offsets), list(bounds))
+
+        # Equal sizes; the results are views of one array
+        buffers = [data[k:k+8] for k in range(0, 160, 8)]
+        results = from_vax32_many(buffers, engine='float')
+        self.assertEqual(len(results), 20)
+        self.assertIs(results[0].base, results[-1].base)
+        self.assertEqual(b''.join(r.tobytes() for r in results), values.tobytes())
+
+        self.assertEqual(from_vax32_many([]), [])
+        (flat, offsets) = from_vax32_many([], flat=True)
+        self.assertEqual((flat.size, list(offsets)), (0, [0]))
+
+        self.assertRaises(ValueError, from_vax32_many, [data[:4], data[:6]])
+        self.assertRaises(ValueError, from_vax32_many, [b'\0\0\0\x80'], special='raise')
+
+    def test_from_vax64_many(self):
+
+        values = np.random.RandomState(64).randn(12)
+        data = to_vax64_bytes(values)
+        buffers = [data[:8], data[8:48], b'', data[48:]]
+
+        results = from_vax64_many(buffers)
+        self.assertEqual([len(r) for r in results], [1, 5, 0, 6])
+        self.assertEqual(b''.join(r.tobytes() for r in results), values.tobytes())
+
+        (flat, offsets) = from_vax64_many(buffers, flat=True)
+        self.assertEqual(flat.dtype, np.dtype('<f8'))
+        self.assertEqual(flat.tobytes(), values.tobytes())
+        self.assertEqual(list(offsets), [0, 1, 6, 6, 12])
+
+        self.assertRaises(ValueError, from_vax64_many, [data[:4]])
+
+    def test_to_vax32_many(self):
+
+        values = np.random.RandomState(32).randn(10)
+        arrays = [values[:3], list(values[3:5]), values[5], values[6:].reshape(2, 2)]
+
+        results = to_vax32_many(arrays)
+        self.assertEqual([len(r) for r in results], [3, 2, 1, 4])
+        self.assertEqual(b''.join(r.tobytes() for r in results),
+                         to_vax32_bytes(values))
+        self.assertEqual(from_vax32(results[1]).tolist(),
+                         values[3:5].astype('<f4').tolist())
+
+        (flat, offsets) = to_vax32_many(arrays, flat=True, engine='float')
+        self.assertEqual(flat.tobytes(), to_vax32(values).tobytes())
+        self.assertEqual(list(offsets), [0, 3, 5, 6, 10])
+
+        # Round trip
+        results = from_vax32_many([r.tobytes() for r in to_vax32_many(arrays)])
+        self.assertEqual(results[3].tolist(), values[6:].astype('<f4').tolist())
+
+        self.assertEqual(to_vax32_many([]), [])
+        self.assertRaises(ValueError, to_vax32_many, [values[:2], [1j]])
+        self.assertRaises(ValueError, to_vax32_many, [[2e38]], overflow='raise')
@@ -0,0 +1,175 @@
+################################################################################
+# tests/test_cache.py
+################################################################################
+
+import glob
+import numpy as np
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import vax
+from vax import (cached_from_vax32, cached_from_vax64, clear_cache, from_vax32,
+                 get_cache, set_cache, to_vax64_bytes)
+
+
+class Test_Cache(unittest.TestCase):
+
+    def test_cached_from_vax32(self):
+
+        vax_dir = os.path.split(sys.modules['vax'].__file__)[0]
+        parent = os.path.split(vax_dir)[0]
+        test_file = os.path.join(parent, 'test_files', 'C3490702_GEOMA.DAT')
+        with open(test_file, 'rb') as f:
+            data = f.read()
+        answer = from_vax32(data[1536:1536 + 552*16])
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+
+            # A miss decodes and stores the values; a hit does no conversion
+            with vax.profiling() as report:
+                result = cached_from_vax32(test_file, 1536, 552*4, cache_dir=cache_dir)
+            self.assertEqual(report['from_vax32']['array']['calls'], 1)
+            self.assertIsInstance(result, np.memmap)
+            self.assertEqual(result.dtype, np.dtype('<f4'))
+            self.assertTrue(np.all(result == answer))
+            self.assertEqual(len(glob.glob(os.path.join(cache_dir, '*.npy'))), 1)
+
+            with vax.profiling() as report:
+                result = cached_from_vax32(test_file, 1536, 552*4, cache_dir=cache_dir)
+            self.assertEqual(report, {})
+            self.assertTrue(np.all(result == answer))
+            self.assertFalse(result.flags.writeable)
+
+            # Other arguments are other entries
+            result = cached_from_vax32(test_file, 1536, 552*2, kind='c8',
+                                       cache_dir=cache_dir)
+            self.assertTrue(np.all(result == answer.view('<c8')))
+            cached_from_vax32(test_file, 1536, 552*4, special='nan', cache_dir=cache_dir)
+            self.assertEqual(len(glob.glob(os.path.join(cache_dir, '*.npy'))), 3)
+
+            # The default directory and a whole-file read
+            previous = set_cache(cache_dir)
+            try:
+                self.assertEqual(get_cache()[0], cache_dir)
+                result = cached_from_vax32(test_file, offset=len(data) % 4)
+                self.assertEqual(len(result), len(data) // 4)
+                clear_cache()
+                self.assertEqual(glob.glob(os.path.join(cache_dir, '*')), [])
+            finally:
+                set_cache(*previous)
+
+            self.assertRaises(ValueError, cached_from_vax32, test_file, 1, None,
+                              cache_dir=cache_dir)
+            self.assertRaises(ValueError, cached_from_vax32, test_file, 0, len(data),
+                              cache_dir=cache_dir)
+            self.assertRaises(ValueError, cached_from_vax32, test_file, kind='d8',
+                              cache_dir=cache_dir)
+            self.assertRaises(ValueError, cached_from_vax32, test_file,
+                              special='none', cache_dir=cache_dir)
+
+    def test_cached_from_vax64(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            cache_dir = os.path.join(directory, 'cache')
+            path = os.path.join(directory, 'test.dat')
+            values = np.random.RandomState(23).randn(3000)
+            with open(path, 'wb') as f:
+                f.write(to_vax64_bytes(values))
+
+            full = cached_from_vax64(path, cache_dir=cache_dir)
+            self.assertEqual(full.dtype, np.dtype('<f8'))
+            self.assertTrue(np.all(full == values))
+            part = cached_from_vax64(path, offset=16, count=1000, kind='dc16',
+                                     cache_dir=cache_dir)
+            self.assertTrue(np.all(part == values[2:2002].view('<c16')))
+            empty = cached_from_vax64(path, count=0, cache_dir=cache_dir)
+            self.assertEqual(empty.size, 0)
+
+            # Eviction of the least recently used files; a hit counts as a use
+            names = [a.filename for a in (full, part, empty)]
+            for (k, name) in enumerate(names):
+                os.utime(name, (k + 1, k + 1))
+            cached_from_vax64(path, offset=16, count=1000, kind='dc16',
+                              cache_dir=cache_dir)
+            previous = set_cache(max_bytes=17100)
+            try:
+                new = cached_from_vax64(path, count=100, cache_dir=cache_dir)
+            finally:
+                set_cache(*previous)
+
+            remaining = glob.glob(os.path.join(cache_dir, '*.npy'))
+            self.assertEqual(sorted(remaining), sorted([part.filename, new.filename]))
+            self.assertTrue(np.all(new == values[:100]))
+
+            # A rewritten file is decoded again
+            values[:100] = 7.
+            with open(path, 'wb') as f:
+                f.write(to_vax64_bytes(values))
+            os.utime(path, ns=(0, 10**18))
+            result = cached_from_vax64(path, count=100, cache_dir=cache_dir)
+            self.assertTrue(np.all(result == 7.))
+            self.assertNotEqual(result.filename, new.filename)
+
+    def test_foreign_files(self):
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            path = os.path.join(cache_dir, 'test.dat')
+            with open(path, 'wb') as f:
+                f.write(to_vax64_bytes(np.arange(1000.)))
+
+            # Files that the cache did not write survive eviction and clearing
+            foreign = [os.path.join(cache_dir, name)
+                       for name in ('values.npy', 'old.tmp', 'tmpabc123.tmp',
+                                    40*'0' + '.npy.bak', 40*'A' + '.npy')]
+            for name in foreign:
+                with open(name, 'wb') as f:
+                    np.save(f, np.zeros(1000))
+                os.utime(name, (1, 1))
+            stale = os.path.join(cache_dir, 40*'0' + '.abc_123.tmp')
+            with open(stale, 'wb'):
+                pass
+            os.utime(stale, (1, 1))
+
+            previous = set_cache(max_bytes=0)
+            try:
+                result = cached_from_vax64(path, cache_dir=cache_dir)
+                self.assertTrue(np.all(result == np.arange(1000.)))
+                self.assertFalse(os.path.exists(stale))
+                self.assertTrue(all(os.path.exists(name) for name in foreign))
+                self.assertTrue(os.path.exists(result.filename))
+            finally:
+                set_cache(*previous)
+
+            result = None
+            clear_cache(cache_dir)
+            self.assertEqual(sorted(os.listdir(cache_dir)),
+                             sorted([os.path.basename(name) for name in foreign]
+                                    + ['test.dat']))
+
+    def test_evicted_while_filling(self):
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            path = os.path.join(cache_dir, 'test.dat')
+            values = np.random.RandomState(24).randn(1000)
+            with open(path, 'wb') as f:
+                f.write(to_vax64_bytes(values))
+
+            # Another process evicts each new entry as soon as it is in place
+            fill = vax._cache._fill
+
+            def fill_and_evict(f, filename, *args):
+                result = fill(f, filename, *args)
+                os.remove(filename)
+                return result
+
+            for rename_mapped in (True, False):
+                with mock.patch.object(vax._cache, '_fill', fill_and_evict), \
+                     mock.patch.object(vax._cache, '_RENAME_MAPPED', rename_mapped):
+                    result = cached_from_vax64(path, cache_dir=cache_dir)
+                self.assertTrue(np.all(result == values))
+                self.assertFalse(result.flags.writeable)
+                self.assertEqual(glob.glob(os.path.join(cache_dir, '*.npy')), [])
+                result = None
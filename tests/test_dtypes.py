@@ -0,0 +1,122 @@
+################################################################################
+# tests/test_dtypes.py
+################################################################################
+
+import numpy as np
+import os
+import tempfile
+import unittest
+
+import vax
+from vax import from_vax, to_vax, to_vax32_bytes, to_vax64_bytes
+
+
+class Test_Dtypes(unittest.TestCase):
+
+    def test_from_vax(self):
+
+        values = np.random.RandomState(13).randn(12)
+        for (dtype, ieee, encode) in [(vax.F4, '<f4', to_vax32_bytes),
+                                      (vax.C8, '<c8', to_vax32_bytes),
+                                      (vax.D8, '<f8', to_vax64_bytes),
+                                      (vax.DC16, '<c16', to_vax64_bytes)]:
+            expected = (values.view('<c16') if ieee[1] == 'c' else values).astype(ieee)
+            data = encode(expected)
+
+            # From bytes, from a tagged view, and from a slice of one
+            raw = np.frombuffer(data, dtype=dtype)
+            self.assertEqual(raw.dtype.metadata, dtype.metadata)
+            self.assertEqual(from_vax(data, dtype).tobytes(), expected.tobytes())
+            result = from_vax(raw)
+            self.assertEqual(result.dtype, np.dtype(ieee))
+            self.assertIsNone(result.dtype.metadata)
+            self.assertEqual(result.tobytes(), expected.tobytes())
+            self.assertEqual(from_vax(raw[1:3]).tobytes(), expected[1:3].tobytes())
+            self.assertEqual(from_vax(raw.reshape(2, -1)).shape, (2, len(raw) // 2))
+
+            # The inverse
+            result = to_vax(expected, dtype)
+            self.assertEqual(result.dtype.metadata, dtype.metadata)
+            self.assertEqual(result.tobytes(), data)
+            self.assertEqual(from_vax(to_vax(expected[0], dtype)), expected[0])
+
+        # Through a file
+        (handle, path) = tempfile.mkstemp()
+        os.close(handle)
+        try:
+            to_vax(values, vax.D8).tofile(path)
+            self.assertEqual(list(from_vax(np.fromfile(path, dtype=vax.D8))),
+                             list(values))
+            raw = np.memmap(path, dtype=vax.D8, mode='r')
+            self.assertEqual(list(from_vax(raw[::3])), list(values[::3]))
+            del raw
+        finally:
+            os.remove(path)
+
+        # The raw bits cannot be cast, computed with, or built from numbers
+        for dtype in (vax.F4, vax.C8, vax.D8, vax.DC16):
+            raw = to_vax(values[:4], dtype)
+            self.assertEqual(raw.dtype.kind, 'V')
+            self.assertRaises((TypeError, ValueError), raw.astype, float)
+            self.assertRaises((TypeError, ValueError), raw.astype, '<f4')
+            self.assertRaises((TypeError, ValueError), raw.astype, complex)
+            self.assertRaises(TypeError, np.add, raw, 1.)
+            self.assertRaises((TypeError, ValueError), np.asarray, values[:4].tolist(),
+                              dtype=dtype)
+
+        self.assertRaises(ValueError, from_vax, np.zeros(4, dtype='<f4'))
+        self.assertRaises(ValueError, from_vax, np.zeros(4, dtype='V4'))
+        self.assertRaises(ValueError, to_vax, values,
+                          np.dtype('V2', metadata={'vax': 'f4'}))
+        self.assertRaises(ValueError, from_vax, b'\0' * 8)
+        self.assertRaises(ValueError, from_vax, b'\0' * 8, '<f8')
+        self.assertRaises(ValueError, to_vax, values, '<f4')
+
+    def test_records(self):
+
+        record = np.dtype([('LINE', vax.F4), ('ID', '<i4'), ('POS', vax.D8, (2,)),
+                           ('', 'V4')])
+        self.assertEqual(record.fields['POS'][0].base.metadata, vax.D8.metadata)
+
+        raw = np.zeros(5, dtype=record)
+        raw['LINE'] = to_vax(np.arange(5.), vax.F4)
+        raw['ID'] = np.arange(5) + 100
+        raw['POS'] = to_vax(np.arange(10.).reshape(5, 2), vax.D8)
+
+        for table in (from_vax(raw), from_vax(raw.tobytes(), record),
+                      vax.from_vax_records(raw.tobytes(), record),
+                      vax.from_vax_records(raw.tobytes(),
+                                           [('LINE', vax.F4), ('ID', '<i4'),
+                                            ('POS', vax.D8, (2,)), ('', 'V4')])):
+            self.assertEqual(table.dtype.names, ('LINE', 'ID', 'POS'))
+            self.assertEqual(table['LINE'].dtype, np.dtype('<f4'))
+            self.assertIsNone(table.dtype.fields['POS'][0].base.metadata)
+            self.assertEqual(list(table['LINE']), [0., 1., 2., 3., 4.])
+            self.assertEqual(list(table['ID']), [100, 101, 102, 103, 104])
+            self.assertEqual(table['POS'].tolist(), np.arange(10.).reshape(5, 2).tolist())
+
+    def test_records_nd(self):
+
+        record = np.dtype([('LINE', vax.F4), ('ID', '<i4'), ('POS', vax.D8, (2,)),
+                           ('', 'V4')])
+        raw = np.zeros((3, 4), dtype=record)
+        raw['LINE'] = to_vax(np.arange(12.).reshape(3, 4), vax.F4)
+        raw['ID'] = np.arange(12).reshape(3, 4)
+        raw['POS'] = to_vax(np.arange(24.).reshape(3, 4, 2), vax.D8)
+
+        # The shape of the input is kept, and strided views are converted in place
+        values = np.arange(12.).reshape(3, 4)
+        for (view, expected) in [(raw, values), (raw[:, ::2], values[:, ::2]),
+                                 (raw.T, values.T), (raw[1:, 1], values[1:, 1])]:
+            table = from_vax(view)
+            self.assertEqual(table.shape, view.shape)
+            self.assertEqual(table.dtype.names, ('LINE', 'ID', 'POS'))
+            self.assertEqual(table['LINE'].tolist(), expected.tolist())
+            self.assertEqual(table['ID'].tolist(), expected.astype(int).tolist())
+            self.assertEqual(table['POS'].shape, view.shape + (2,))
+            self.assertEqual(table['POS'][..., 1].tolist(), (2 * expected + 1).tolist())
+
+        table = from_vax(raw[2, 3, ...])
+        self.assertEqual(table.shape, ())
+        self.assertEqual(table['LINE'], 11.)
+        self.assertEqual(from_vax(raw[:0]).shape, (0, 4))
@@ -0,0 +1,168 @@
+################################################################################
+# tests/test_main.py
+################################################################################
+
+import contextlib
+import io
+import numpy as np
+import os
+import tempfile
+import unittest
+
+from vax import from_vax32, to_vax32_bytes, to_vax64_bytes
+from vax.__main__ import main
+
+
+class Test_Main(unittest.TestCase):
+
+    def run_main(self, *args):
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            status = main(list(args))
+        return (status, stdout.getvalue(), stderr.getvalue())
+
+    def test_convert(self):
+
+        f4 = np.arange(-50., 50., dtype='f4')
+        d8 = np.linspace(-1.e30, 1.e30, 77)
+        with tempfile.TemporaryDirectory() as tempdir:
+            for k in range(3):
+                with open(os.path.join(tempdir, 'a%d.dat' % k), 'wb') as f:
+                    f.write(b'HEADER')
+                    f.write(to_vax32_bytes(f4 * (k + 1)))
+            with open(os.path.join(tempdir, 'b.dat'), 'wb') as f:
+                f.write(to_vax64_bytes(d8))
+
+            # Glob, offset, npy output, in-process
+            out = os.path.join(tempdir, 'out')
+            os.mkdir(out)
+            pattern = os.path.join(tempdir, 'a*.dat')
+            (status, stdout, _) = self.run_main('convert', pattern, '--offset', '6',
+                                                '--output-dir', out, '-j', '1')
+            self.assertEqual(status, 0)
+            self.assertIn('3 converted, 0 skipped, 0 failed', stdout)
+            self.assertIn('MB/s', stdout)
+            self.assertIn('files/s', stdout)
+            for k in range(3):
+                result = np.load(os.path.join(out, 'a%d.npy' % k))
+                self.assertEqual(result.dtype, np.dtype('<f4'))
+                self.assertTrue(np.all(result == f4 * (k + 1)))
+
+            # Resume: complete outputs are skipped; an incomplete one is redone
+            np.save(os.path.join(out, 'a1.npy'), f4[:10])
+            (status, stdout, _) = self.run_main('convert', pattern, '--offset', '6',
+                                                '--output-dir', out, '-j', '1')
+            self.assertEqual(status, 0)
+            self.assertIn('1 converted, 2 skipped, 0 failed', stdout)
+            self.assertTrue(np.all(np.load(os.path.join(out, 'a1.npy')) == f4 * 2))
+
+            (status, stdout, _) = self.run_main('convert', pattern, '--offset', '6',
+                                                '--output-dir', out, '--overwrite',
+                                                '-q')
+            self.assertIn('3 converted, 0 skipped, 0 failed', stdout)
+            self.assertNotIn('a0', stdout)
+
+            # File list, raw output, worker processes
+            listing = os.path.join(tempdir, 'files.txt')
+            with open(listing, 'w') as f:
+                f.write(os.path.join(tempdir, 'a0.dat') + '\n\n')
+                f.write(os.path.join(tempdir, 'a2.dat') + '\n')
+            (status, stdout, _) = self.run_main('convert', '--file-list', listing,
+                                                '--offset', '6', '--count', '20',
+                                                '--format', 'raw', '-j', '2')
+            self.assertEqual(status, 0)
+            result = np.fromfile(os.path.join(tempdir, 'a2.ieee'), dtype='<f4')
+            self.assertTrue(np.all(result == f4[:20] * 3))
+
+            # Double precision, whole file
+            (status, _, _) = self.run_main('convert', os.path.join(tempdir, 'b.dat'),
+                                           '--kind', 'd8')
+            self.assertEqual(status, 0)
+            self.assertTrue(np.all(np.load(os.path.join(tempdir, 'b.npy')) == d8))
+
+            # Failures are reported without stopping the other files
+            (status, stdout, stderr) = self.run_main('convert', pattern,
+                                                     os.path.join(tempdir, 'b.dat'),
+                                                     '--output-dir', out, '-j', '1',
+                                                     '--overwrite', '--offset', '5')
+            self.assertEqual(status, 1)
+            self.assertIn('0 converted, 0 skipped, 4 failed', stdout)
+            self.assertIn('not a multiple', stderr)
+            self.assertEqual([name for name in os.listdir(out)
+                              if name.endswith('.part')], [])
+
+            (status, _, stderr) = self.run_main('convert',
+                                                os.path.join(tempdir, '*.none'))
+            self.assertEqual(status, 2)
+
+    def test_output_dir(self):
+
+        f4 = np.arange(10., dtype='f4')
+        with tempfile.TemporaryDirectory() as tempdir:
+            for (k, name) in enumerate(('a/X.DAT', 'b/X.DAT', 'b/c/X.DAT')):
+                path = os.path.join(tempdir, 'data', name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'wb') as f:
+                    f.write(to_vax32_bytes(f4 * (k + 1)))
+
+            # Inputs with the same name keep their relative paths
+            out = os.path.join(tempdir, 'out')
+            pattern = os.path.join(tempdir, 'data', '**', '*.DAT')
+            for jobs in ('1', '2'):
+                (status, stdout, _) = self.run_main('convert', pattern, '--output-dir',
+                                                    out, '-j', jobs, '--overwrite')
+                self.assertEqual(status, 0)
+                self.assertIn('3 converted, 0 skipped, 0 failed', stdout)
+                for (k, name) in enumerate(('a/X.npy', 'b/X.npy', 'b/c/X.npy')):
+                    result = np.load(os.path.join(out, name))
+                    self.assertTrue(np.all(result == f4 * (k + 1)))
+
+            # Inputs of a single directory are written directly into the output one
+            (status, _, _) = self.run_main('convert',
+                                           os.path.join(tempdir, 'data', 'a', 'X.DAT'),
+                                           '--output-dir', out)
+            self.assertEqual(status, 0)
+            self.assertTrue(os.path.exists(os.path.join(out, 'X.npy')))
+
+            # Two inputs that would share an output are an error
+            with open(os.path.join(tempdir, 'data', 'a', 'X.IMG'), 'wb') as f:
+                f.write(to_vax32_bytes(f4))
+            (status, stdout, stderr) = self.run_main('convert',
+                                                     os.path.join(tempdir, 'data', 'a',
+                                                                  'X.*'))
+            self.assertEqual(status, 2)
+            self.assertIn('would both be written to', stderr)
+            self.assertEqual(stdout, '')
+
+    def test_convert_records(self):
+
+        vax_dir = os.path.split(os.path.dirname(os.path.abspath(__file__)))[0]
+        test_file = os.path.join(vax_dir, 'test_files', 'C3490702_GEOMA.DAT')
+        answer = from_vax32(np.fromfile(test_file, dtype='<f4')[1536//4:][:552*4])
+        answer = answer.reshape(552, 4)
+
+        with tempfile.TemporaryDirectory() as tempdir:
+            (status, _, _) = self.run_main('convert', test_file, '--offset', '1536',
+                                           '--count', '552', '--output-dir', tempdir,
+                                           '--fields', 'NS:vax_f4:2,OS:vax_f4,:V4')
+            self.assertEqual(status, 0)
+            result = np.load(os.path.join(tempdir, 'C3490702_GEOMA.npy'))
+            self.assertEqual(result.dtype.names, ('NS', 'OS'))
+            self.assertTrue(np.all(result['NS'] == answer[:, :2]))
+            self.assertTrue(np.all(result['OS'] == answer[:, 2]))
+
+            (status, _, _) = self.run_main('convert', test_file, '--offset', '1536',
+                                           '--count', '276', '--output-dir', tempdir,
+                                           '--fields', 'NL:vax_f4', '--record-bytes',
+                                           '32', '--format', 'raw', '--overwrite')
+            self.assertEqual(status, 0)
+            result = np.fromfile(os.path.join(tempdir, 'C3490702_GEOMA.ieee'),
+                                 dtype=[('NL', '<f4')])
+            self.assertTrue(np.all(result['NL'] == answer[::2, 0]))
+
+            with contextlib.redirect_stderr(io.StringIO()):
+                self.assertRaises(SystemExit, main, ['convert', test_file,
+                                                     '--fields', 'NL'])
+                self.assertRaises(SystemExit, main, ['convert', test_file,
+                                                     '--record-bytes', '8'])
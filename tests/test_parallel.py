@@ -0,0 +1,99 @@
+################################################################################
+# tests/test_parallel.py
+################################################################################
+
+import gc
+import numpy as np
+import os
+import unittest
+
+import vax
+import vax.parallel
+from vax.parallel import convert
+
+
+class Test_Parallel(unittest.TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        vax.parallel.shutdown()
+
+    def test_convert(self):
+
+        # Large enough to be divided between two workers
+        values = np.random.RandomState(21).randn(600_000).astype('<f4')
+        data = vax.to_vax32_bytes(values)
+
+        result = convert(data, 'from_vax32', nprocs=2)
+        self.assertEqual(result.dtype, np.dtype('<f4'))
+        self.assertEqual(result.tobytes(), values.tobytes())
+
+        # A shared result is used in place as the next input
+        vax_values = convert(values.astype('<f8').reshape(600, 1000), 'to_vax32',
+                             nprocs=2)
+        self.assertEqual(vax_values.shape, (600, 1000))
+        self.assertEqual(vax_values.tobytes(), data)
+        self.assertEqual(vax.parallel._shared(vax_values[100:])[1], 100 * 4000)
+
+        result = convert(vax_values, 'from_vax32', nprocs=2, dtype='>f8')
+        self.assertEqual(result.dtype, np.dtype('>f8'))
+        self.assertTrue(np.array_equal(result.ravel(), values))
+
+        doubles = np.random.RandomState(64).randn(600_000).view('<c16')
+        result = convert(convert(doubles, 'to_vax64', nprocs=2), 'from_vax64', nprocs=2)
+        self.assertEqual(result.dtype, np.dtype('<c16'))
+        self.assertTrue(np.array_equal(result, doubles))
+
+        # Small conversions are done in this process
+        for nprocs in (1, 2):
+            result = convert(vax.to_vax64_bytes(doubles[:10].real), 'from_vax64',
+                             nprocs=nprocs)
+            self.assertEqual(result.tolist(), doubles[:10].real.tolist())
+        self.assertEqual(convert(b'', nprocs=2).shape, (0,))
+
+        # Errors in a worker are raised here
+        self.assertRaises(ValueError, convert, b'\0\0\0\x80' * 300_000, nprocs=2,
+                          special='raise')
+        self.assertRaises(ValueError, convert, data, 'from_vax16')
+        self.assertRaises(ValueError, convert, data, special='clip')
+        self.assertRaises(ValueError, convert, data, inplace=True)
+        self.assertRaises(ValueError, convert, values, 'to_vax32', dtype='<f8')
+
+        # Input dtypes are validated as by the conversion function
+        self.assertRaises(ValueError, convert, values.astype('<f8'), 'from_vax32')
+        self.assertRaises(ValueError, convert, doubles.astype('<c8'), 'from_vax64')
+        self.assertRaises(ValueError, convert, values.astype('<f2'), 'from_vax32')
+        result = convert(data[:40].decode('latin8'), 'from_vax32', nprocs=2)
+        self.assertEqual(result.tolist(), values[:10].tolist())
+
+        # A pool held by one call remains usable after another call enlarges it
+        pool = vax.parallel._get_pool(1)
+        self.assertIsNot(vax.parallel._get_pool(pool._max_workers + 1), pool)
+        self.assertEqual(pool.submit(abs, -1).result(), 1)
+
+    def test_segments(self):
+
+        if not os.path.isdir('/dev/shm'):                 # pragma: no cover
+            self.skipTest('shared memory is not visible as files')
+
+        array = vax.parallel.empty((3, 4), '<f4')
+        name = vax.parallel._segment(array).name
+        self.assertTrue(os.path.exists('/dev/shm/' + name))
+
+        # A view keeps the block alive; it is unlinked with the last array using it
+        view = array[1:]
+        del array
+        gc.collect()
+        self.assertTrue(os.path.exists('/dev/shm/' + name))
+        view[...] = 1.
+        del view
+        gc.collect()
+        self.assertFalse(os.path.exists('/dev/shm/' + name))
+
+        before = set(os.listdir('/dev/shm'))
+        try:
+            convert(b'\0\0\0\x80' * 300_000, nprocs=2, special='raise')
+        except ValueError:
+            pass
+        gc.collect()
+        self.assertEqual(set(os.listdir('/dev/shm')) - before, set())
@@ -0,0 +1,81 @@
+################################################################################
+# tests/test_scalar.py
+################################################################################
+
+import numpy as np
+import struct
+import unittest
+
+import vax
+from vax import (vax32_to_float, vax64_to_float, float_to_vax32, float_to_vax64,
+                 from_vax32, from_vax64, to_vax32_bytes, to_vax64_bytes)
+
+
+class Test_Scalar(unittest.TestCase):
+
+    def test_vax32(self):
+
+        # Every exponent and sign, with assorted mantissas, compared with the array path
+        fractions = [0, 1, 2, 3, 5, 6, 0x3fffff, 0x400000, 0x7ffffe, 0x7fffff]
+        fractions += list(np.random.RandomState(16).randint(0, 1 << 23, 10))
+        ieee_bits = (np.arange(512, dtype='u8')[:, np.newaxis] << 23
+                     | np.array(fractions, dtype='u8')).ravel().astype('<u4')
+        data = ieee_bits.view('<u2').reshape(-1, 2)[:, ::-1].tobytes()
+
+        with np.errstate(invalid='ignore'):
+            expected = from_vax32(data)
+        for (k, value) in enumerate(expected):
+            result = vax32_to_float(data, 4 * k)
+            self.assertIsInstance(result, float)
+            if np.isnan(value):
+                self.assertTrue(np.isnan(result))
+            else:
+                self.assertEqual(struct.pack('<f', result), value.tobytes())
+
+        self.assertEqual(vax32_to_float(bytearray(data[:4])), float(expected[0]))
+        self.assertEqual(vax32_to_float(memoryview(data), 8), float(expected[2]))
+        self.assertRaises(ValueError, vax32_to_float, data[:3])
+        self.assertRaises(ValueError, vax32_to_float, data, len(data) - 2)
+
+        # Encoding, including values outside the VAX and IEEE single-precision ranges
+        values = list(ieee_bits.view('<f4'))
+        values += [0., -0., 1., -2.5, 1.e-45, 2.**126, 2.**127, 1.e39, -1.e300, np.inf,
+                   -np.inf, np.nan]
+        with np.errstate(over='ignore', invalid='ignore'):
+            for value in values:
+                self.assertEqual(float_to_vax32(float(value)), to_vax32_bytes(value))
+        self.assertEqual(float_to_vax32(3), to_vax32_bytes(3.))
+
+        # Negative zero and magnitudes below 2**-128 are a clean zero, never the reserved
+        # operand or a dirty zero
+        for value in (-0., 1.e-45, -1.e-45, 1.e-40, -2.**-129, 1.e-50, -1.e-300):
+            self.assertEqual(float_to_vax32(value), b'\0\0\0\0')
+            self.assertEqual(float_to_vax32(value), to_vax32_bytes(value))
+        self.assertEqual(float_to_vax32(2.**-128), b'\x80\0\0\0')
+        self.assertEqual(float_to_vax32(-2.**-128), b'\x80\x80\0\0')
+        self.assertEqual(vax32_to_float(float_to_vax32(-2.**-128)), -2.**-128)
+        self.assertEqual(vax32_to_float(float_to_vax32(0.1)), float(np.float32(0.1)))
+
+    def test_vax64(self):
+
+        # Random bit patterns, every exponent, and ties in the rounding
+        words = np.random.RandomState(64).randint(0, 1 << 16, (2000, 4)).astype('<u2')
+        words[:512, 0] = np.arange(512) << 7
+        words[512:520, 3] = 4
+        data = words.tobytes()
+
+        expected = from_vax64(data)
+        for (k, value) in enumerate(expected):
+            result = vax64_to_float(data, 8 * k)
+            self.assertIsInstance(result, float)
+            self.assertEqual(struct.pack('<d', result), value.tobytes())
+
+        self.assertRaises(ValueError, vax64_to_float, data[:7])
+        self.assertRaises(ValueError, vax64_to_float, data, len(data) - 4)
+
+        values = list(expected) + [0., -0., 1., -2.5, 1.e-300, 1.e-40, 1.e38, 1.e39,
+                                   -1.e300, np.inf, -np.inf, np.nan, 5e-324]
+        for value in values:
+            self.assertEqual(float_to_vax64(float(value)), to_vax64_bytes(value))
+        self.assertEqual(vax64_to_float(float_to_vax64(0.1)), 0.1)
+        self.assertEqual(vax.from_vax64(float_to_vax64(-1.5)), -1.5)
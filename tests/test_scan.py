@@ -0,0 +1,114 @@
+################################################################################
+# tests/test_scan.py
+################################################################################
+
+import numpy as np
+import os
+import tempfile
+import unittest
+
+import vax
+from vax import scan_vax32, scan_vax64, to_vax32_bytes, to_vax64_bytes
+
+
+class Test_Scan(unittest.TestCase):
+
+    def test_scan_vax32(self):
+
+        # Special values are placed on both sides of block boundaries
+        size = 2 * vax._BLOCK + 100
+        words = np.frombuffer(to_vax32_bytes(np.random.RandomState(32).randn(size)
+                                             .astype('f4')), dtype='<u2').copy()
+        words = words.reshape(-1, 2)
+        words[0] = 0                                    # true zero, not counted
+        words[1] = (0x8000, 0)                          # reserved operand
+        words[vax._BLOCK] = (0x807f, 0x1234)            # reserved operand
+        words[2] = (0x0000, 0x0001)                     # dirty zero
+        words[vax._BLOCK - 1] = (0x0040, 0)             # dirty zero
+        words[size - 1] = (0x007f, 0xffff)              # dirty zero
+        words[3] = (0x7f80, 0)                          # exponent 255
+        words[2 * vax._BLOCK] = (0xffff, 0xffff)        # exponent 255, negative
+        data = words.tobytes()
+
+        result = scan_vax32(data, indices=True)
+        self.assertEqual(result['count'], size)
+        self.assertEqual(result['reserved'], 2)
+        self.assertEqual(result['dirty_zero'], 3)
+        self.assertEqual(result['overflow'], 2)
+        self.assertIsInstance(result['reserved'], int)
+        self.assertEqual(list(result['reserved_indices']), [1, vax._BLOCK])
+        self.assertEqual(list(result['dirty_zero_indices']),
+                         [2, vax._BLOCK - 1, size - 1])
+        self.assertEqual(list(result['overflow_indices']), [3, 2 * vax._BLOCK])
+        self.assertEqual(result['reserved_indices'].dtype, np.dtype('int64'))
+
+        # Overflow values are those that convert to infinity or NaN
+        ieee = vax.from_vax32(data)
+        self.assertEqual(list(np.flatnonzero(~np.isfinite(ieee))),
+                         list(result['overflow_indices']))
+
+        # Other input types give the same counts
+        counts = {key: result[key] for key in ('count', 'reserved', 'dirty_zero',
+                                               'overflow')}
+        for other in (bytearray(data), memoryview(data), data.decode('latin8'),
+                      words, words.view('<u4'), np.frombuffer(data, dtype='<f4'),
+                      np.frombuffer(data, dtype='i1').reshape(-1, 8)):
+            self.assertEqual(scan_vax32(other), counts)
+
+        # Complex values count each component
+        result = scan_vax32(np.frombuffer(data, dtype='<c8'), indices=True)
+        self.assertEqual(result['count'], size)
+        self.assertEqual(result['dirty_zero'], 3)
+        self.assertEqual(list(result['overflow_indices'] // 2), [1, vax._BLOCK])
+
+        # Memory-mapped file
+        with tempfile.TemporaryDirectory() as tempdir:
+            path = os.path.join(tempdir, 'data.dat')
+            with open(path, 'wb') as f:
+                f.write(data)
+            mmap = np.memmap(path, dtype='u1', mode='r')
+            self.assertEqual(scan_vax32(mmap), counts)
+            del mmap
+
+        # No special values, and empty data
+        clean = scan_vax32(to_vax32_bytes([0., 1., -2.]), indices=True)
+        self.assertEqual(clean['reserved'] + clean['dirty_zero'] + clean['overflow'], 0)
+        self.assertEqual(len(clean['overflow_indices']), 0)
+        self.assertEqual(scan_vax32(b'')['count'], 0)
+        self.assertEqual(scan_vax32([0., 1.])['count'], 2)
+
+        self.assertRaises(ValueError, scan_vax32, b'123')
+        self.assertRaises(ValueError, scan_vax32, np.zeros(3, dtype='u1'))
+        self.assertRaises(ValueError, scan_vax32, np.zeros(3, dtype='f8'))
+
+    def test_scan_vax64(self):
+
+        size = vax._BLOCK + 10
+        words = np.frombuffer(to_vax64_bytes(np.random.RandomState(64).randn(size)),
+                              dtype='<u2').copy().reshape(-1, 4)
+        words[0] = 0                                    # true zero, not counted
+        words[5] = (0x8000, 0, 0, 0)                    # reserved operand
+        words[vax._BLOCK + 1] = (0x8000, 0, 0, 1)       # reserved operand
+        words[6] = (0x0000, 0, 0, 1)                    # dirty zero
+        words[7] = (0x0001, 0, 0, 0)                    # dirty zero
+        words[8] = (0x7fff, 0xffff, 0xffff, 0xffff)     # largest value, not counted
+        data = words.tobytes()
+
+        result = scan_vax64(data, indices=True)
+        self.assertEqual(result['count'], size)
+        self.assertEqual(result['reserved'], 2)
+        self.assertEqual(result['dirty_zero'], 2)
+        self.assertEqual(result['overflow'], 0)
+        self.assertEqual(list(result['reserved_indices']), [5, vax._BLOCK + 1])
+        self.assertEqual(list(result['dirty_zero_indices']), [6, 7])
+        self.assertEqual(len(result['overflow_indices']), 0)
+        self.assertTrue(np.all(np.isfinite(vax.from_vax64(data))))
+
+        counts = scan_vax64(data)
+        self.assertEqual(set(counts), {'count', 'reserved', 'dirty_zero', 'overflow'})
+        for other in (words, words.view('<u8'), np.frombuffer(data, dtype='<f8'),
+                      np.frombuffer(data, dtype='<c16')):
+            self.assertEqual(scan_vax64(other)['reserved'], 2)
+
+        self.assertRaises(ValueError, scan_vax64, b'1234')
+        self.assertRaises(ValueError, scan_vax64, np.zeros(4, dtype='f4'))
@@ -0,0 +1,264 @@
+################################################################################
+# tests/test_stream.py
+################################################################################
+
+import asyncio
+import io
+import numpy as np
+import os
+import sys
+import tempfile
+import unittest
+
+from vax import (from_vax32, to_vax32_bytes, from_vax64, to_vax64_bytes,
+                 iter_from_vax32, iter_from_vax64, aiter_from_vax32, aiter_from_vax64,
+                 VaxWriter)
+
+
+class _Trickle(io.RawIOBase):
+    """A non-seekable stream that returns at most a few bytes per read."""
+
+    def __init__(self, data, step=3):
+        self.data = data
+        self.pos = 0
+        self.step = step
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        n = min(len(b), self.step, len(self.data) - self.pos)
+        b[:n] = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+
+class _ReadOnly(object):
+    """A minimal file-like object providing only read()."""
+
+    def __init__(self, data):
+        self.stream = io.BytesIO(data)
+
+    def read(self, n):
+        return self.stream.read(n)
+
+
+def _aread(function, data, step=None, **kwargs):
+    """The list of blocks from an asyncio decoder reading the given data from an
+    asyncio.StreamReader, which receives it in pieces of `step` bytes."""
+
+    async def collect():
+        reader = asyncio.StreamReader()
+        for start in range(0, len(data), step or max(1, len(data))):
+            reader.feed_data(data[start:start + (step or len(data))])
+        reader.feed_eof()
+        return [block async for block in function(reader, **kwargs)]
+
+    return asyncio.run(collect())
+
+
+class Test_Stream(unittest.TestCase):
+
+    def test_iter_from_vax32(self):
+
+        vax_dir = os.path.split(sys.modules['vax'].__file__)[0]
+        parent = os.path.split(vax_dir)[0]
+        test_file = os.path.join(parent, 'test_files', 'C3490702_GEOMA.DAT')
+        answer = from_vax32(np.fromfile(test_file, dtype='<f4')[1536//4:])
+
+        # Path, whole file after the header
+        blocks = [b.copy() for b in iter_from_vax32(test_file, offset=1536,
+                                                    chunk_items=1000)]
+        self.assertEqual([len(b) for b in blocks], [1000, 1000, 560])
+        self.assertTrue(np.all(np.concatenate(blocks) == answer))
+
+        # Path, limited count
+        blocks = [b.copy() for b in iter_from_vax32(test_file, offset=1536,
+                                                    count=552*4, chunk_items=100)]
+        self.assertEqual(blocks[0].dtype, np.dtype('<f4'))
+        self.assertTrue(all(len(b) <= 100 for b in blocks))
+        self.assertTrue(np.all(np.concatenate(blocks) == answer[:552*4]))
+
+        # Open file, with the offset relative to the current position
+        with open(test_file, 'rb') as f:
+            f.seek(1000)
+            blocks = [b.copy() for b in iter_from_vax32(f, offset=536, count=40)]
+        self.assertEqual(len(blocks), 1)
+        self.assertTrue(np.all(blocks[0] == answer[:40]))
+
+        # Complex values
+        ieee = (np.arange(20.) - 3.5).view('<c16').astype('<c8')
+        stream = io.BytesIO(to_vax32_bytes(ieee))
+        blocks = [b.copy() for b in iter_from_vax32(stream, kind='c8', chunk_items=3)]
+        self.assertEqual(blocks[0].dtype, np.dtype('<c8'))
+        self.assertTrue(np.all(np.concatenate(blocks) == ieee))
+
+        # Reads that split a value
+        ieee = np.arange(1000.).astype('<f4')
+        stream = _Trickle(to_vax32_bytes(ieee), step=7)
+        blocks = [b.copy() for b in iter_from_vax32(stream, offset=8, chunk_items=64)]
+        self.assertTrue(np.all(np.concatenate(blocks) == ieee[2:]))
+
+        # A file object without readinto
+        blocks = [b.copy() for b in iter_from_vax32(_ReadOnly(to_vax32_bytes(ieee)),
+                                                    offset=4, chunk_items=300)]
+        self.assertTrue(np.all(np.concatenate(blocks) == ieee[1:]))
+
+        # The internal buffer is reused
+        blocks = list(iter_from_vax32(io.BytesIO(to_vax32_bytes(ieee)), chunk_items=10))
+        self.assertTrue(np.shares_memory(blocks[0], blocks[1]))
+
+        # Errors
+        data = to_vax32_bytes(ieee)
+        self.assertRaises(ValueError, list, iter_from_vax32(io.BytesIO(data[:-1])))
+        self.assertRaises(ValueError, list, iter_from_vax32(io.BytesIO(data),
+                                                            count=1001))
+        self.assertRaises(ValueError, iter_from_vax32, io.BytesIO(data), kind='d8')
+        self.assertRaises(ValueError, iter_from_vax32, io.BytesIO(data), chunk_items=0)
+        self.assertRaises(ValueError, list, iter_from_vax32(_Trickle(data),
+                                                            offset=5000))
+
+    def test_iter_from_vax64(self):
+
+        ieee = np.linspace(-1.e30, 1.e30, 1002)
+        data = to_vax64_bytes(ieee)
+
+        blocks = [b.copy() for b in iter_from_vax64(io.BytesIO(data), chunk_items=100)]
+        self.assertEqual(len(blocks), 11)
+        self.assertEqual(blocks[0].dtype, np.dtype('<f8'))
+        self.assertTrue(np.all(np.concatenate(blocks) == ieee))
+        self.assertTrue(np.all(np.concatenate(blocks) == from_vax64(data)))
+
+        blocks = [b.copy() for b in iter_from_vax64(_Trickle(data, step=5), offset=16,
+                                                    count=500, kind='dc16')]
+        self.assertEqual(blocks[0].dtype, np.dtype('<c16'))
+        self.assertTrue(np.all(np.concatenate(blocks) == ieee[2:1002].view('<c16')))
+
+        self.assertRaises(ValueError, list, iter_from_vax64(io.BytesIO(data[:-4])))
+        self.assertRaises(ValueError, iter_from_vax64, io.BytesIO(data), kind='f4')
+
+    def test_aiter_from_vax32(self):
+
+        ieee = np.arange(200000.).astype('<f4')
+        data = to_vax32_bytes(ieee)
+
+        # A local server that writes the data in pieces that split values; the largest
+        # blocks are converted in the executor
+        async def serve(reader, writer):
+            for start in range(0, len(data), 70001):
+                writer.write(data[start:start + 70001])
+                await writer.drain()
+                await asyncio.sleep(0)
+            writer.close()
+
+        async def fetch(**kwargs):
+            server = await asyncio.start_server(serve, '127.0.0.1', 0)
+            port = server.sockets[0].getsockname()[1]
+            try:
+                (reader, writer) = await asyncio.open_connection('127.0.0.1', port)
+                blocks = [block async for block in aiter_from_vax32(reader, **kwargs)]
+                writer.close()
+            finally:
+                server.close()
+                await server.wait_closed()
+            return blocks
+
+        blocks = asyncio.run(fetch(chunk_items=100000))
+        self.assertEqual([len(b) for b in blocks], [100000, 100000])
+        self.assertEqual(blocks[0].dtype, np.dtype('<f4'))
+        self.assertTrue(np.all(np.concatenate(blocks) == ieee))
+        self.assertFalse(np.shares_memory(blocks[0], blocks[1]))
+
+        blocks = asyncio.run(fetch(offset=12, count=1000, chunk_items=300))
+        self.assertEqual([len(b) for b in blocks], [300, 300, 300, 100])
+        self.assertTrue(np.all(np.concatenate(blocks) == ieee[3:1003]))
+
+        # Complex values, from a reader fed one byte at a time
+        ieee = (np.arange(20.) - 3.5).view('<c16').astype('<c8')
+        blocks = _aread(aiter_from_vax32, to_vax32_bytes(ieee), 1, kind='c8',
+                        chunk_items=3)
+        self.assertEqual(blocks[0].dtype, np.dtype('<c8'))
+        self.assertTrue(np.all(np.concatenate(blocks) == ieee))
+
+        # Errors
+        data = to_vax32_bytes(ieee)
+        self.assertRaises(ValueError, _aread, aiter_from_vax32, data[:-1])
+        self.assertRaises(ValueError, _aread, aiter_from_vax32, data, count=41)
+        self.assertRaises(ValueError, _aread, aiter_from_vax32, data, offset=500)
+        self.assertRaises(ValueError, aiter_from_vax32, None, kind='d8')
+        self.assertRaises(ValueError, aiter_from_vax32, None, chunk_items=0)
+
+    def test_aiter_from_vax64(self):
+
+        ieee = np.linspace(-1.e30, 1.e30, 1002)
+        data = to_vax64_bytes(ieee)
+
+        blocks = _aread(aiter_from_vax64, data, 13, chunk_items=100)
+        self.assertEqual(len(blocks), 11)
+        self.assertEqual(blocks[0].dtype, np.dtype('<f8'))
+        self.assertTrue(np.all(np.concatenate(blocks) == ieee))
+
+        blocks = _aread(aiter_from_vax64, data, 5, offset=16, count=500, kind='dc16')
+        self.assertEqual(blocks[0].dtype, np.dtype('<c16'))
+        self.assertTrue(np.all(np.concatenate(blocks) == ieee[2:1002].view('<c16')))
+
+        self.assertRaises(ValueError, _aread, aiter_from_vax64, data[:-4])
+        self.assertRaises(ValueError, aiter_from_vax64, None, kind='f4')
+
+    def test_vax_writer(self):
+
+        ieee = np.random.RandomState(22).randn(1000).astype('<f4')
+
+        # Several writes, including non-contiguous and f8 inputs, into 512-byte records
+        f = io.BytesIO()
+        with VaxWriter(f, record_bytes=512, chunk_items=100) as writer:
+            writer.write(ieee[:250])
+            writer.write(ieee[250:].astype('<f8')[::2])
+            writer.write(ieee[251::2].reshape(25, 15).T)
+            writer.write([])
+            self.assertEqual(writer.count, 1000)
+            self.assertEqual(writer.nbytes, 4000)
+        self.assertTrue(writer.closed)
+        self.assertFalse(f.closed)
+
+        data = f.getvalue()
+        self.assertEqual(len(data), 4096)
+        self.assertEqual(writer.nbytes, 4096)
+        self.assertEqual(data[4000:], bytes(96))
+        expected = np.concatenate([ieee[:250], ieee[250::2],
+                                   ieee[251::2].reshape(25, 15).T.ravel()])
+        self.assertEqual(data[:4000], to_vax32_bytes(expected))
+
+        # Real and complex values as kind "c8", through a non-buffered file
+        c = (ieee[:300] + 1j * ieee[300:600]).astype('<c8')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'test.dat')
+            with VaxWriter(path, kind='c8', chunk_items=64) as writer:
+                writer.write(c)
+                writer.write(ieee[:5])
+            with open(path, 'rb') as f:
+                data = f.read()
+            self.assertEqual(len(data), 305 * 8)
+            self.assertTrue(np.all(from_vax32(data[:2400]).view('<c8') == c))
+            self.assertTrue(np.all(from_vax32(data[2400:]).view('<c8') == ieee[:5]))
+
+            with open(path, 'wb', buffering=0) as f:
+                writer = VaxWriter(f, kind='dc16', record_bytes=100)
+                writer.write(c)
+                writer.close()
+                writer.close()
+            self.assertEqual(os.path.getsize(path), 4800)
+            blocks = list(iter_from_vax64(path, kind='dc16'))
+            self.assertTrue(np.all(blocks[0] == c))
+
+        writer = VaxWriter(io.BytesIO(), kind='d8')
+        self.assertRaises(ValueError, writer.write, c)
+        writer.close()
+        self.assertRaises(ValueError, writer.write, ieee)
+        self.assertRaises(ValueError, VaxWriter, io.BytesIO(), kind='f8')
+        self.assertRaises(ValueError, VaxWriter, io.BytesIO(), record_bytes=0)
+        self.assertRaises(ValueError, VaxWriter, io.BytesIO(), chunk_items=0)
+        self.assertRaises(ValueError, VaxWriter, io.BytesIO(), kind='d8',
+                          overflow='raise')
+        writer = VaxWriter(io.BytesIO(), overflow='raise')
+        self.assertRaises(ValueError, writer.write, [1., 2e38])
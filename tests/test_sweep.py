@@ -0,0 +1,106 @@
+################################################################################
+# tests/test_sweep.py
+################################################################################
+
+import json
+import numpy as np
+import os
+import tempfile
+import unittest
+
+import vax
+from tests.sweep_vax import CLASSES, classify, main, sample64, sweep32
+
+
+def _from_vax32_zero(values):
+    """A faulty candidate, which zeroes dirty zeros and reserved operands."""
+    return vax.from_vax32(values, special='zero')
+
+
+class Test_Sweep(unittest.TestCase):
+
+    def test_sweep32(self):
+
+        # The low 16 bits of a VAX pattern hold the sign and exponent
+        report = sweep32('from_vax32', stop=1 << 16, chunk=1 << 14, nprocs=1)
+        self.assertEqual(report['patterns'], 1 << 16)
+        self.assertEqual(report['mismatches'], 0)
+        classes = report['classes']
+        self.assertEqual([classes[name]['count'] for name in CLASSES['from_vax32']],
+                         [1, 127, 128, 512, 256, 64512])
+
+        report = sweep32('from_vax32', start=(1 << 32) - 1000, nprocs=1)
+        self.assertEqual((report['patterns'], report['mismatches']), (1000, 0))
+
+        # The high bits of an IEEE pattern hold the sign and exponent
+        counts = dict.fromkeys(CLASSES['to_vax32'], 0)
+        for start in (0, 0x00800000, 0x7f000000, 0x7f800000, 0xff7ff800):
+            for overflow in ('saturate', 'wrap'):
+                report = sweep32('to_vax32', options={'overflow': overflow},
+                                 start=start - 2048 if start else 0,
+                                 stop=start + 2048, nprocs=1)
+                self.assertEqual(report['mismatches'], 0)
+            for (name, result) in report['classes'].items():
+                counts[name] += result['count']
+        self.assertTrue(all(counts.values()))
+
+        # Mismatches are found and classified
+        report = sweep32('from_vax32', candidate='tests.test_sweep:_from_vax32_zero',
+                         stop=1 << 16, nprocs=1, examples=3)
+        classes = report['classes']
+        self.assertEqual(report['mismatches'], 127 + 128)
+        self.assertEqual(classes['dirty zero']['mismatches'], 127)
+        self.assertEqual(classes['reserved']['mismatches'], 128)
+        self.assertEqual(classes['normal']['mismatches'], 0)
+        self.assertEqual(classes['reserved']['examples'][0],
+                         {'input': '0x00008000', 'expected': '0x80000000',
+                          'actual': '0x00000000'})
+        self.assertEqual(len(classes['dirty zero']['examples']), 3)
+
+        self.assertRaises(ValueError, sweep32, 'from_vax64')
+        self.assertRaises(ValueError, sweep32, candidate='nonsense', stop=10)
+
+    def test_sample64(self):
+
+        report = sample64('from_vax64', samples=2, nprocs=1)
+        self.assertEqual(report['patterns'], 512 * 5)
+        self.assertEqual(report['mismatches'], 0)
+        self.assertEqual(report['classes']['zero']['count'], 1)
+
+        report = sample64('to_vax64', samples=2, nprocs=1)
+        self.assertEqual(report['patterns'], 4096 * 5)
+        self.assertEqual(report['mismatches'], 0)
+        self.assertEqual(report['classes']['infinity']['count'], 2)
+
+        # The sample is the same when the work is divided among processes
+        self.assertEqual(sample64('to_vax64', samples=2, nprocs=2, seed=5)['classes'],
+                         sample64('to_vax64', samples=2, nprocs=1, seed=5)['classes'])
+        self.assertRaises(ValueError, sample64, 'to_vax64', reference='int')
+
+    def test_classify(self):
+
+        bits = np.array([0, 0x7f800000, 0xff800000, 0x7f800001, 0x80000000, 1,
+                         0x7f000000, 0x3f800000], dtype='<u4')
+        names = [CLASSES['to_vax32'][code] for code in classify('to_vax32', bits)]
+        self.assertEqual(names, ['zero', 'infinity', 'infinity', 'nan', 'zero',
+                                 'denormal', 'overflow', 'normal'])
+
+        bits = np.array([0, 0x8000, 0x0001, 0x0080, 0x0100, 0x0180, 0x7f80, 0x4080],
+                        dtype='<u4')
+        names = [CLASSES['from_vax32'][code] for code in classify('from_vax32', bits)]
+        self.assertEqual(names, ['zero', 'reserved', 'dirty zero', 'denormal-producing',
+                                 'denormal-producing', 'normal', 'overflow', 'normal'])
+
+    def test_main(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'sweep.json')
+            status = main(['from_vax32', '--stop', '0x1000', '-j', '1', '--json', path])
+            self.assertEqual(status, 0)
+            with open(path) as f:
+                report = json.load(f)
+            self.assertEqual(report['patterns'], 0x1000)
+
+            status = main(['from_vax32', '--stop', '0x10000', '-j', '1', '--json', path,
+                           '--candidate', 'tests.test_sweep:_from_vax32_zero'])
+            self.assertEqual(status, 1)
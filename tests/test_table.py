@@ -0,0 +1,217 @@
+################################################################################
+# tests/test_table.py
+################################################################################
+
+import numpy as np
+import os
+import sys
+import tempfile
+import unittest
+
+from vax import (from_vax32, from_vax_records, read_table, table_params, to_vax32,
+                 to_vax64)
+
+
+GEOMA_COLUMNS = [('OUTPUT_LINE',  'vax_f4'),
+                 ('OUTPUT_SAMPLE', 'vax_f4'),
+                 ('INPUT_LINE',   'vax_f4'),
+                 ('INPUT_SAMPLE', 'vax_f4')]
+
+
+class Test_Table(unittest.TestCase):
+
+    def test_from_vax_records(self):
+
+        vax_dir = os.path.split(sys.modules['vax'].__file__)[0]
+        parent = os.path.split(vax_dir)[0]
+        test_file = os.path.join(parent, 'test_files', 'C3490702_GEOMA.DAT')
+        with open(test_file, 'rb') as f:
+            data = f.read()
+        answer = from_vax32(data[1536:1536 + 552*16]).reshape(552, 4)
+
+        # Structured result
+        table = from_vax_records(data, GEOMA_COLUMNS, offset=1536, count=552)
+        self.assertEqual(table.shape, (552,))
+        self.assertEqual(table.dtype.names, tuple(c[0] for c in GEOMA_COLUMNS))
+        for k, (name, _) in enumerate(GEOMA_COLUMNS):
+            self.assertEqual(table.dtype[name], np.dtype('<f4'))
+            self.assertTrue(np.all(table[name] == answer[:, k]))
+
+        # Columnar result from a memmap, with padding and a subarray field
+        memmap = np.memmap(test_file, dtype='u1', mode='r')
+        spec = [('OUTPUT', 'vax_f4', (2,)), ('', 'V4'), ('INPUT_SAMPLE', 'vax_f4')]
+        columns = from_vax_records(memmap, spec, offset=1536, count=552, columns=True)
+        self.assertEqual(set(columns), {'OUTPUT', 'INPUT_SAMPLE'})
+        self.assertEqual(columns['OUTPUT'].shape, (552, 2))
+        self.assertTrue(columns['OUTPUT'].flags.c_contiguous)
+        self.assertTrue(np.all(columns['OUTPUT'] == answer[:, :2]))
+        self.assertTrue(np.all(columns['INPUT_SAMPLE'] == answer[:, 3]))
+        del memmap
+
+        # Whole 512-byte file records, described with offsets
+        spec = {'names': ['LINE', 'SAMPLE'], 'formats': ['vax_f4', 'vax_f4'],
+                'offsets': [0, 4], 'itemsize': 512}
+        table = from_vax_records(data[1536:1536 + 18*512], spec)
+        self.assertEqual(table.shape, (18,))
+        self.assertEqual(table.dtype.itemsize, 8)
+        self.assertTrue(np.all(table['LINE'] == answer[::32, 0]))
+        self.assertTrue(np.all(table['SAMPLE'] == answer[::32, 1]))
+
+        self.assertRaises(ValueError, from_vax_records, data[:-1], GEOMA_COLUMNS)
+        self.assertRaises(ValueError, from_vax_records, data, [('A', 'vax_f9')])
+        self.assertRaises(ValueError, from_vax_records, data, '<f4')
+        self.assertRaises(ValueError, from_vax_records, data, {'names': ['A']})
+        self.assertRaises(ValueError, from_vax_records, data, [])
+
+    def test_mixed_records(self):
+
+        np.random.seed(1865)
+        count = 100_000
+        raw = np.zeros(count, dtype=[('id', '<i4'), ('flag', 'u1'), ('pad', 'V3'),
+                                     ('f', '<f4'), ('c', '<c8'), ('d', '<f8', (2,)),
+                                     ('dc', '<c16'), ('name', 'S6')])
+        values = {
+            'id': np.arange(count, dtype='<i4'),
+            'flag': np.random.randint(0, 256, count).astype('u1'),
+            'f': np.random.randn(count).astype('<f4'),
+            'c': np.random.randn(count, 2).astype('<f4').view('<c8')[:, 0],
+            'd': np.random.randn(count, 2),
+            'dc': np.random.randn(count, 2).view('<c16')[:, 0],
+            'name': np.array([b'row%03d' % (k % 1000) for k in range(count)]),
+        }
+        raw['id'] = values['id']
+        raw['flag'] = values['flag']
+        raw['f'] = to_vax32(values['f'])
+        raw['c'] = to_vax32(values['c'])
+        raw['d'] = to_vax64(values['d'])
+        raw['dc'] = to_vax64(values['dc'])
+        raw['name'] = values['name']
+
+        spec = [('id', '<i4'), ('flag', 'u1'), ('pad', 'V3'), ('f', 'vax_f4'),
+                ('c', 'vax_c8'), ('d', 'vax_d8', (2,)), ('dc', 'vax_dc16'),
+                ('name', 'S6')]
+
+        table = from_vax_records(raw.tobytes(), spec)
+        self.assertNotIn('pad', table.dtype.names)
+        for name, value in values.items():
+            self.assertTrue(np.all(table[name] == value))
+
+        columns = from_vax_records(bytearray(raw.tobytes()), spec, offset=raw.itemsize,
+                                   columns=True)
+        for name, value in values.items():
+            self.assertTrue(np.all(columns[name] == value[1:]))
+
+    def test_read_table(self):
+
+        vax_dir = os.path.split(sys.modules['vax'].__file__)[0]
+        parent = os.path.split(vax_dir)[0]
+        label = os.path.join(parent, 'test_files', 'C3490702_GEOMA.LBL')
+        with open(label.replace('.LBL', '.DAT'), 'rb') as f:
+            data = f.read()
+        answer = from_vax32(data[1536:1536 + 552*16]).reshape(552, 4)
+
+        # The label's pointer is wrong by 20 bytes, and its 8-byte columns are 4 bytes
+        params = table_params(label)
+        self.assertEqual(params['path'], label.replace('.LBL', '.DAT'))
+        self.assertEqual(params['offset'], 1556)
+        self.assertEqual(params['rows'], 552)
+        self.assertEqual(params['record']['names'], [c[0] for c in GEOMA_COLUMNS])
+        self.assertEqual(params['record']['formats'], ['vax_f4'] * 4)
+        self.assertEqual(params['record']['offsets'], [0, 4, 8, 12])
+        params['offset'] = 1536
+
+        table = read_table(params)
+        self.assertEqual(list(table), [c[0] for c in GEOMA_COLUMNS])
+        for k, (name, _) in enumerate(GEOMA_COLUMNS):
+            self.assertEqual(table[name].dtype, np.dtype('<f4'))
+            self.assertTrue(np.all(table[name] == answer[:, k]))
+        self.assertAlmostEqual(table['INPUT_SAMPLE'][0], 15.8628, places=4)
+
+        table = read_table(params, columns=['INPUT_LINE', 'OUTPUT_SAMPLE'],
+                           rows=slice(500, None, 7))
+        self.assertEqual(list(table), ['INPUT_LINE', 'OUTPUT_SAMPLE'])
+        self.assertTrue(table['INPUT_LINE'].flags.c_contiguous)
+        self.assertTrue(np.all(table['INPUT_LINE'] == answer[500::7, 2]))
+        self.assertTrue(np.all(table['OUTPUT_SAMPLE'] == answer[500::7, 1]))
+
+        table = read_table(params, columns=['OUTPUT_LINE'], rows=[3, 0, 551])
+        self.assertTrue(np.all(table['OUTPUT_LINE'] == answer[[3, 0, 551], 0]))
+        self.assertEqual(read_table(params, rows=slice(0, 0))['OUTPUT_LINE'].shape, (0,))
+
+        self.assertRaises(ValueError, read_table, params, columns=['LINE'])
+        params['rows'] = 1000
+        self.assertRaises(ValueError, read_table, params)
+
+        # An attached label, with a record pointer and several column types
+        rows = 5
+        raw = np.zeros(rows, dtype=[('ID', '>i2'), ('NAME', 'S6'), ('POS', '<f8', (3,)),
+                                    ('', 'V2'), ('C', '<c8')])
+        raw['ID'] = np.arange(rows) - 2
+        raw['NAME'] = [b'row%d' % k for k in range(rows)]
+        pos = np.arange(rows * 3.).reshape(rows, 3) / 7.
+        raw['POS'] = to_vax64(pos)
+        c = (np.arange(rows) + 1j * np.arange(rows)[::-1]).astype('<c8') / 3
+        raw['C'] = to_vax32(c)
+
+        text = ('PDS_VERSION_ID = PDS3\r\n'
+                'RECORD_TYPE = FIXED_LENGTH\r\n'
+                'RECORD_BYTES = 1024\r\n'
+                '^TABLE = 2  /* second record */\r\n'
+                'OBJECT = TABLE\r\n'
+                '  ROWS = 5\r\n'
+                '  COLUMNS = 4\r\n'
+                '  ROW_BYTES = 42\r\n'
+                '  DESCRIPTION = "A table with\r\n    several \'columns\'."\r\n'
+                '  OBJECT = COLUMN\r\n'
+                '    NAME = ID\r\n'
+                '    DATA_TYPE = MSB_INTEGER\r\n'
+                '    START_BYTE = 1\r\n'
+                '    BYTES = 2\r\n'
+                '  END_OBJECT = COLUMN\r\n'
+                '  OBJECT = COLUMN\r\n'
+                '    NAME = "NAME"\r\n'
+                '    DATA_TYPE = CHARACTER\r\n'
+                '    START_BYTE = 3\r\n'
+                '    BYTES = 6\r\n'
+                '  END_OBJECT = COLUMN\r\n'
+                '  OBJECT = COLUMN\r\n'
+                '    NAME = POS\r\n'
+                '    DATA_TYPE = VAX_DOUBLE\r\n'
+                '    START_BYTE = 9\r\n'
+                '    BYTES = 24\r\n'
+                '    ITEMS = 3\r\n'
+                '    ITEM_BYTES = 8 <BYTES>\r\n'
+                '    UNIT = (KM, KM, KM)\r\n'
+                '  END_OBJECT = COLUMN\r\n'
+                '  OBJECT = COLUMN\r\n'
+                '    NAME = C\r\n'
+                '    DATA_TYPE = VAX_COMPLEX\r\n'
+                '    START_BYTE = 35\r\n'
+                '    BYTES = 8\r\n'
+                '  END_OBJECT = COLUMN\r\n'
+                'END_OBJECT = TABLE\r\n'
+                'END\r\n').encode('ascii')
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'attached.img')
+            with open(path, 'wb') as f:
+                f.write(text.ljust(1024, b' ') + raw.tobytes())
+
+            params = table_params(path, table='TABLE')
+            self.assertEqual(params['path'], path)
+            self.assertEqual(params['offset'], 1024)
+            self.assertEqual(params['record']['formats'],
+                             ['>i2', 'S6', ('vax_d8', (3,)), 'vax_c8'])
+
+            table = read_table(path, rows=slice(1, None), table='TABLE')
+            self.assertEqual(table['ID'].dtype, np.dtype('>i2'))
+            self.assertEqual(list(table['ID']), [-1, 0, 1, 2])
+            self.assertEqual(list(table['NAME']), [b'row1', b'row2', b'row3', b'row4'])
+            self.assertEqual(table['POS'].shape, (4, 3))
+            self.assertTrue(np.all(table['POS'] == pos[1:]))
+            self.assertTrue(np.all(table['C'] == c[1:]))
+
+            self.assertRaises(ValueError, table_params, path)
+            with open(path, 'wb') as f:
+                f.write(text.replace(b'^TABLE = 2', b'^TABLE = ("MISSING.DAT", 2)'))
+            self.assertRaises(ValueError, table_params, path, table='TABLE')
@@ -2,11 +2,16 @@
 # tests/test_vax.py
 ################################################################################
 
+import math
 import numpy as np
 import os
 import unittest
+import struct
 import sys
-from vax import from_vax32, to_vax32, from_vax64
+import tempfile
+import vax
+from vax import (from_vax32, to_vax32, to_vax32_bytes,
+                 from_vax64, to_vax64, to_vax64_bytes)
 
 
 PYTHON2 = sys.version_info.major <= 2
@@ -20,7 +25,7 @@ class Test_Vax(unittest.TestCase):
 
         BIGINT = 2**24      # all conversions should be good to at least 24 bits
         SCALE = 1. / BIGINT
-        EXPMIN = -125
+        EXPMIN = -104      # smaller magnitudes than 2**-24 * 2**-104 become VAX zeros
         EXPMAX = 127
 
         # Single-value inversion tests
@@ -474,3 +479,674 @@ class Test_Vax(unittest.TestCase):
         self.assertRaises(ValueError, from_vax64, ['123', '456'])
         self.assertRaises(ValueError, from_vax64, vax_d8.reshape(-1)[:7])
         self.assertRaises(ValueError, from_vax64, vax_d8[:,:4])
+
+    def test_vax64_blocks(self):
+
+        def reference(word):
+            w = struct.unpack('<4H', word)
+            bits = (w[0] << 48) | (w[1] << 32) | (w[2] << 16) | w[3]
+            sign = -1. if bits >> 63 else 1.
+            exponent = (bits >> 55) & 0xff
+            if exponent == 0:
+                return sign * 0.
+            fraction = ((bits & ((1 << 55) - 1)) + 4) >> 3    # rounded, ties up
+            return sign * math.ldexp(1. + fraction / 2.**52, exponent - 129)
+
+        # Random bit patterns spanning several blocks, including zero and maximum
+        # exponents, all-ones and all-zeros words, and ties in the rounding
+        size = 2 * vax._BLOCK + 3
+        raw = np.random.RandomState(6464).randint(0, 1 << 16, (size, 4)).astype('<u2')
+        raw[:3000, 0] &= 0x807f
+        raw[3000:6000, 0] |= 0x7f80
+        raw[6000:7000] = 0xffff
+        raw[7000:8000] = 0
+        raw[8000:9000, 3] = (raw[8000:9000, 3] & 0xfff8) | 4
+        data = raw.tobytes()
+
+        result = from_vax64(data)
+        self.assertEqual(result.shape, (size,))
+        for k in list(range(0, 10000, 7)) + list(range(size - 3000, size, 11)):
+            expected = reference(data[8*k:8*k+8])
+            self.assertEqual(result[k], expected)
+            self.assertEqual(math.copysign(1., result[k]), math.copysign(1., expected))
+
+        # Other paths give identical bits
+        for other in (from_vax64(bytearray(data), inplace=True),
+                      from_vax64(raw, nthreads=2),
+                      from_vax64(np.frombuffer(data, dtype='u1'))):
+            self.assertEqual(other.tobytes(), result.tobytes())
+
+        other = from_vax64(np.frombuffer(data[:-8], dtype='<c16'))
+        self.assertEqual(other.tobytes(), result[:-1].tobytes())
+
+    def test_out_inplace(self):
+
+        np.random.seed(3917)
+        ieee = np.random.randn(100_003).astype('<f4')
+        vax32 = to_vax32_bytes(ieee)
+
+        # from_vax32 into a preallocated array
+        out = np.empty(ieee.shape, dtype='<f4')
+        result = from_vax32(vax32, out=out)
+        self.assertIs(result, out)
+        self.assertTrue(np.all(out == ieee))
+
+        out = np.empty((1,), dtype='<f4')
+        self.assertIs(from_vax32(vax32[:4], out=out), out)
+        self.assertEqual(out[0], ieee[0])
+
+        # from_vax32 in place
+        buffer = bytearray(vax32)
+        result = from_vax32(buffer, inplace=True)
+        self.assertTrue(np.all(result == ieee))
+        self.assertTrue(np.shares_memory(result, np.frombuffer(buffer, dtype='u1')))
+
+        result = from_vax32(memoryview(bytearray(vax32)), inplace=True)
+        self.assertTrue(np.all(result == ieee))
+
+        array = np.frombuffer(bytearray(vax32), dtype='<u2').reshape(-1, 2)
+        result = from_vax32(array, inplace=True)
+        self.assertTrue(np.all(result == ieee))
+        self.assertTrue(np.shares_memory(result, array))
+
+        comps = ieee[:-1].view('<c8')
+        array = to_vax32(comps)
+        result = from_vax32(array, inplace=True)
+        self.assertEqual(result.dtype, np.dtype('<c8'))
+        self.assertTrue(np.all(result == comps))
+
+        # to_vax32 into a preallocated array and in place
+        out = np.empty(ieee.shape, dtype='<f4')
+        self.assertIs(to_vax32(ieee, out=out), out)
+        self.assertEqual(out.tobytes(), vax32)
+
+        array = ieee.copy()
+        self.assertIs(to_vax32(array, inplace=True), array)
+        self.assertEqual(array.tobytes(), vax32)
+
+        buffer = bytearray(len(vax32))
+        self.assertIs(to_vax32_bytes(ieee, out=buffer), buffer)
+        self.assertEqual(bytes(buffer), vax32)
+
+        # from_vax64 into a preallocated array and in place
+        vax_d8 = np.array([0x80, 0x40, 0, 0, 0, 0, 0, 0,
+                           0x49, 0xC1, 0xDA, 0x0F, 0x21, 0xA2, 0xBE, 0x68], dtype='uint8')
+        ieee_f8 = np.array([1., -3.141592653589793])
+
+        out = np.empty(2, dtype='<f8')
+        self.assertIs(from_vax64(vax_d8, out=out), out)
+        self.assertTrue(np.all(out == ieee_f8))
+
+        array = vax_d8.copy()
+        result = from_vax64(array, inplace=True)
+        self.assertTrue(np.all(result == ieee_f8))
+        self.assertTrue(np.shares_memory(result, array))
+
+        buffer = bytearray(np.tile(vax_d8, 50_000).data)
+        result = from_vax64(buffer, inplace=True)
+        self.assertTrue(np.all(result == np.tile(ieee_f8, 50_000)))
+
+        # Errors
+        self.assertRaises(ValueError, from_vax32, vax32, inplace=True)
+        self.assertRaises(ValueError, from_vax32, list(ieee[:4]), inplace=True)
+        self.assertRaises(ValueError, from_vax32, np.frombuffer(vax32, dtype='u1')[::2],
+                          inplace=True)
+        self.assertRaises(ValueError, from_vax32, vax32, out=np.empty(3, dtype='<f4'))
+        self.assertRaises(ValueError, from_vax32, vax32,
+                          out=np.empty(ieee.shape, dtype='<f8'))
+        self.assertRaises(ValueError, from_vax32, bytearray(vax32),
+                          out=np.empty(ieee.shape, dtype='<f4'), inplace=True)
+        self.assertRaises(ValueError, to_vax32, ieee.astype('f8'), inplace=True)
+        self.assertRaises(ValueError, to_vax32, list(ieee[:4]), inplace=True)
+        self.assertRaises(ValueError, to_vax32_bytes, ieee, out=bytearray(4))
+        self.assertRaises(ValueError, to_vax32_bytes, ieee, out=bytes(len(vax32)))
+        self.assertRaises(ValueError, from_vax64, bytes(vax_d8.data), inplace=True)
+
+    def test_to_vax64(self):
+
+        np.random.seed(2112)
+
+        # Round trips over the full D-floating range
+        mantissa = np.random.randn(100_001)
+        exponent = np.random.randint(-126, 126, size=mantissa.shape)
+        ieee = mantissa * 2.**exponent
+        ieee[np.abs(ieee) < 2.**-128] = 0.
+        ieee[np.abs(ieee) >= 2.**127] = 0.
+
+        self.assertTrue(np.all(from_vax64(to_vax64(ieee)) == ieee))
+        self.assertTrue(np.all(from_vax64(to_vax64_bytes(ieee)) == ieee))
+
+        comps = ieee[:-1].view('<c16').reshape(100, -1)
+        result = to_vax64(comps)
+        self.assertEqual(result.shape, comps.shape)
+        self.assertEqual(result.dtype, np.dtype('<c16'))
+        self.assertTrue(np.all(from_vax64(result) == comps))
+
+        # Scalars and shapes
+        result = to_vax64(3.5)
+        self.assertEqual(result.shape, ())
+        self.assertEqual(from_vax64(result), 3.5)
+        self.assertEqual(from_vax64(to_vax64(np.array([[3.5]]))).shape, (1, 1))
+        self.assertEqual(list(from_vax64(to_vax64([1, 2, 3]))), [1., 2., 3.])
+
+        # Exactly representable values from libvaxdata
+        vax_d8 = bytes(bytearray([0x80, 0x40, 0, 0, 0, 0, 0, 0,
+                                  0x80, 0xC0, 0, 0, 0, 0, 0, 0,
+                                  0x60, 0x41, 0, 0, 0, 0, 0, 0,
+                                  0x60, 0xC1, 0, 0, 0, 0, 0, 0]))
+        self.assertEqual(to_vax64_bytes([1., -1., 3.5, -3.5]), vax_d8)
+        self.assertEqual(to_vax64([1., -1., 3.5, -3.5]).tobytes(), vax_d8)
+
+        # Zeros and values outside the D-floating range
+        self.assertEqual(to_vax64_bytes([0., -0., 1.e-300]), bytes(24))
+        self.assertEqual(from_vax64(bytes(8)), 0.)
+
+        dmax = 2.**127
+        result = from_vax64(to_vax64([1.e300, -1.e300, np.inf, -np.inf]))
+        self.assertTrue(np.all(result == [dmax, -dmax, dmax, -dmax]))
+        self.assertEqual(to_vax64_bytes(np.inf), b'\xff\x7f' + 6 * b'\xff')
+        self.assertEqual(to_vax64_bytes(np.nan), b'\x00\x80' + bytes(6))
+
+        # out and inplace
+        out = np.empty(ieee.shape, dtype='<f8')
+        self.assertIs(to_vax64(ieee, out=out), out)
+        self.assertTrue(np.all(from_vax64(out) == ieee))
+
+        array = ieee.copy()
+        self.assertIs(to_vax64(array, inplace=True), array)
+        self.assertTrue(np.all(from_vax64(array, inplace=True) == ieee))
+
+        buffer = bytearray(ieee.nbytes)
+        self.assertIs(to_vax64_bytes(ieee, out=buffer), buffer)
+        self.assertTrue(np.all(from_vax64(buffer) == ieee))
+
+        self.assertRaises(ValueError, to_vax64, ieee.astype('f4'), inplace=True)
+        self.assertRaises(ValueError, to_vax64, ieee, out=np.empty(3))
+        self.assertRaises(ValueError, to_vax64_bytes, ieee, out=bytearray(8))
+
+    def test_nthreads(self):
+
+        np.random.seed(8118)
+        size = 5 * vax._BLOCK + 7
+        ieee32 = np.random.randn(size).astype('<f4')
+        ieee64 = np.random.randn(size)
+        vax32 = to_vax32_bytes(ieee32, nthreads=1)
+        vax64 = to_vax64_bytes(ieee64, nthreads=1)
+
+        for nthreads in (None, 0, 2, 3, 16):
+            self.assertEqual(to_vax32_bytes(ieee32, nthreads=nthreads), vax32)
+            self.assertEqual(to_vax32(ieee32, nthreads=nthreads).tobytes(), vax32)
+            self.assertEqual(to_vax64_bytes(ieee64, nthreads=nthreads), vax64)
+            self.assertEqual(to_vax64(ieee64, nthreads=nthreads).tobytes(), vax64)
+
+            self.assertTrue(np.all(from_vax32(vax32, nthreads=nthreads) == ieee32))
+            self.assertTrue(np.all(from_vax64(vax64, nthreads=nthreads) == ieee64))
+
+            result = from_vax32(bytearray(vax32), inplace=True, nthreads=nthreads)
+            self.assertTrue(np.all(result == ieee32))
+            result = from_vax64(bytearray(vax64), inplace=True, nthreads=nthreads)
+            self.assertTrue(np.all(result == ieee64))
+
+        # Module default
+        self.assertEqual(vax.get_nthreads(), 1)
+        previous = vax.set_nthreads(4)
+        try:
+            self.assertEqual(previous, 1)
+            self.assertEqual(vax.get_nthreads(), 4)
+            self.assertTrue(np.all(from_vax32(vax32) == ieee32))
+        finally:
+            vax.set_nthreads(previous)
+
+        # A pool held by one call remains usable after another call enlarges it
+        pool = vax._get_pool(1)
+        self.assertIsNot(vax._get_pool(pool._max_workers + 1), pool)
+        self.assertEqual(pool.submit(abs, -1).result(), 1)
+
+    def test_engine(self):
+
+        # Every sign and exponent, with mantissas that exercise rounding to denormals,
+        # NaN quieting, and the boundaries of the special cases
+        fractions = [0, 1, 2, 3, 4, 5, 6, 7, 0x1ffffe, 0x1fffff, 0x200000, 0x3ffffd,
+                     0x3ffffe, 0x3fffff, 0x400000, 0x400001, 0x400002, 0x5ffffe,
+                     0x7ffffc, 0x7ffffd, 0x7ffffe, 0x7fffff]
+        fractions += list(np.random.RandomState(9).randint(0, 1 << 23, 20))
+        bits = (np.arange(512, dtype='u8')[:, np.newaxis] << 23
+                | np.array(fractions, dtype='u8')).ravel().astype('<u4')
+        self.assertGreater(bits.size, vax._INT_MIN_SIZE)
+
+        # Results of the float engine are the reference, under every policy
+        with np.errstate(invalid='ignore', over='ignore'):
+            for engine in ('int', 'float'):
+                for data in (bits, bits[:100], bits.view('<c8')):
+                    for special in ('ieee-compatible', 'zero', 'nan'):
+                        expected = from_vax32(data.view(data.dtype
+                                                        if data.dtype.kind == 'c'
+                                                        else '<f4'),
+                                              engine='float', special=special)
+                        result = from_vax32(data, engine=engine, special=special)
+                        self.assertEqual(result.dtype, expected.dtype)
+                        self.assertEqual(result.tobytes(), expected.tobytes())
+
+                    ieee = data.view(expected.dtype)
+                    for overflow in ('saturate', 'wrap'):
+                        expected = to_vax32(ieee, engine='float', overflow=overflow)
+                        self.assertEqual(to_vax32(ieee, engine=engine,
+                                                  overflow=overflow).tobytes(),
+                                         expected.tobytes())
+                        self.assertEqual(to_vax32_bytes(ieee, engine=engine,
+                                                        overflow=overflow),
+                                         expected.tobytes())
+
+            # In place, from either end
+            expected = from_vax32(bits, engine='float')
+            self.assertEqual(from_vax32(bits.copy(), inplace=True,
+                                        engine='int').tobytes(), expected.tobytes())
+            expected = to_vax32(bits.view('<f4'), engine='float')
+            self.assertEqual(to_vax32(bits.view('<f4').copy(), inplace=True,
+                                      engine='int').tobytes(), expected.tobytes())
+
+        # Selected cases, as bit patterns
+        def decode(word):
+            vax_word = ((word & 0xffff) << 16) | (word >> 16)
+            return int(from_vax32(np.array([vax_word] * 2000, dtype='<u4'),
+                                  engine='int').view('<u4')[0])
+
+        self.assertEqual(decode(0x00000000), 0x00000000)
+        self.assertEqual(decode(0x80000000), 0x80000000)
+        self.assertEqual(decode(0x01800000), 0x00800000)    # smallest normal
+        self.assertEqual(decode(0x00800003), 0x00200001)    # rounded down
+        self.assertEqual(decode(0x00800006), 0x00200002)    # tie, rounded to even
+        self.assertEqual(decode(0x01000003), 0x00400002)    # tie, rounded to even
+        self.assertEqual(decode(0x00000006), 0x00000002)    # tie, rounded to even
+        self.assertEqual(decode(0x017fffff), 0x00800000)    # carry into the exponent
+        self.assertEqual(decode(0x7f800000), 0x7f800000)
+        self.assertEqual(decode(0x7f800001), 0x7fc00001)    # signaling NaN quieted
+
+        # Module default
+        self.assertEqual(vax.get_engine(), 'int')
+        previous = vax.set_engine('float')
+        try:
+            self.assertEqual(previous, 'int')
+            self.assertEqual(vax.get_engine(), 'float')
+            with np.errstate(invalid='ignore'):
+                self.assertEqual(from_vax32(bits[:2000]).tobytes(),
+                                 from_vax32(bits[:2000], engine='int').tobytes())
+        finally:
+            vax.set_engine(previous)
+
+        self.assertRaises(ValueError, vax.set_engine, 'simd')
+        self.assertRaises(ValueError, from_vax32, bits, engine='simd')
+        self.assertRaises(ValueError, to_vax32, 1., engine='simd')
+        self.assertEqual(vax.get_engine(), 'int')
+
+    def test_order(self):
+
+        values = np.random.RandomState(15).randn(300, 500)
+        single = to_vax32(values.astype('<f4'))
+        double = to_vax64(values)
+        complex_ = to_vax32(values.view('<c16').astype('<c8'))
+
+        def layouts(array):
+            return [array, np.asfortranarray(array), array.T, array[:, 3:40],
+                    array[::-2, ::3], np.broadcast_to(array[0], (4,) + array.shape[1:]),
+                    array[:0]]
+
+        # Decoding, compared with the conversion of a C-contiguous copy
+        for (data, decode) in [(single, from_vax32), (complex_, from_vax32),
+                               (double, from_vax64)]:
+            for view in layouts(data):
+                expected = decode(np.ascontiguousarray(view))
+                for order in ('C', 'F', 'K'):
+                    result = decode(view, order=order)
+                    self.assertEqual(result.shape, expected.shape)
+                    self.assertTrue(np.all(result == expected))
+                    if order == 'C':
+                        self.assertTrue(result.flags.c_contiguous)
+                    elif order == 'F' or view.flags.f_contiguous:
+                        self.assertTrue(result.flags.f_contiguous)
+
+                result = np.empty(expected.shape, dtype=expected.dtype)
+                self.assertIs(decode(view, out=result), result)
+                self.assertTrue(np.all(result == expected))
+
+        # Encoding
+        for (data, encode, encode_bytes) in [(values.astype('<f4'), to_vax32,
+                                              to_vax32_bytes),
+                                             (values, to_vax64, to_vax64_bytes)]:
+            for view in layouts(data):
+                expected = encode(np.ascontiguousarray(view)).tobytes()
+                self.assertEqual(encode_bytes(view), expected)
+                for order in ('C', 'F', 'K'):
+                    result = encode(view, order=order)
+                    self.assertEqual(result.tobytes(order='C'), expected)
+                    if order == 'F' or (order == 'K' and view.flags.f_contiguous):
+                        self.assertTrue(result.flags.f_contiguous)
+
+        self.assertRaises(ValueError, from_vax32, single, order='A')
+        self.assertRaises(ValueError, from_vax64, double, order='A')
+        self.assertRaises(ValueError, to_vax32, values, order='A')
+        self.assertRaises(ValueError, to_vax64, values, order='A')
+
+    def test_special(self):
+
+        # VAX single-precision words for 1, a dirty zero, a reserved operand, and zero
+        words = np.array([0x00004080, 0x00000001, 0x00008000, 0x00000000], dtype='<u4')
+        for engine in ('int', 'float'):
+            for data in (words, np.tile(words, 1000)):
+                result = from_vax32(data, engine=engine)
+                self.assertEqual(result[0], 1.)
+                self.assertLess(abs(result[1]), 1.e-38)
+                self.assertTrue(np.signbit(result[2]))
+                self.assertEqual(result[3], 0.)
+
+                result = from_vax32(data, engine=engine, special='zero')
+                self.assertEqual(list(result[:4].view('<u4')), [0x3f800000, 0, 0, 0])
+
+                result = from_vax32(data, engine=engine, special='nan')
+                self.assertEqual(result[0], 1.)
+                self.assertTrue(np.isnan(result[1]))
+                self.assertTrue(np.isnan(result[2]))
+                self.assertEqual(result[3], 0.)
+
+                self.assertRaises(ValueError, from_vax32, data, engine=engine,
+                                  special='raise')
+                self.assertEqual(from_vax32(data[:1], engine=engine, special='raise'), 1.)
+
+        # The same values in double precision
+        words = np.array([0x4080, 0, 0, 0, 0, 0, 1, 0, 0x8000, 0, 0, 0, 0, 0, 0, 0],
+                         dtype='<u2')
+        for data in (words, np.tile(words, 1000)):
+            result = from_vax64(data)
+            self.assertEqual(list(result[:4]), [1., 0., 0., 0.])
+            self.assertTrue(np.signbit(result[2]))
+
+            result = from_vax64(data, special='zero')
+            self.assertEqual(list(result[:4].view('<u8')), [0x3ff0000000000000, 0, 0, 0])
+
+            result = from_vax64(data, special='nan')
+            self.assertEqual(result[0], 1.)
+            self.assertTrue(np.isnan(result[1]))
+            self.assertTrue(np.isnan(result[2]))
+            self.assertEqual(result[3], 0.)
+
+            self.assertRaises(ValueError, from_vax64, data, special='raise')
+            self.assertEqual(from_vax64(data[:4], special='raise'), 1.)
+
+        self.assertRaises(ValueError, from_vax32, words, special='ignore')
+        self.assertRaises(ValueError, from_vax64, words, special='ignore')
+
+    def test_overflow(self):
+
+        # VAX exponent 255 has no IEEE single-precision equivalent, so compare the bits
+        values = np.array([2.**126, -1.5 * 2.**126, 2.**127, np.inf, -np.inf, np.nan,
+                           -3.e38, 1.e38, 1.], dtype='<f4')
+        ieee_bits = [int(x) for x in values.view('<u4')]
+        expected = [ieee_bits[0] + 0x01000000, ieee_bits[1] + 0x01000000,
+                    0x7fffffff, 0x7fffffff, 0xffffffff, 0x80000000, 0xffffffff,
+                    ieee_bits[7] + 0x01000000, ieee_bits[8] + 0x01000000]
+        expected = [((x & 0xffff) << 16) | (x >> 16) for x in expected]
+
+        for engine in ('int', 'float'):
+            for data in (values, np.tile(values, 1000)):
+                vax_values = to_vax32(data, engine=engine)
+                self.assertEqual(list(vax_values[:9].view('<u4')), expected)
+
+                self.assertEqual(to_vax32_bytes(data, engine=engine),
+                                 vax_values.tobytes())
+
+                # "wrap" gives the results of the plain multiplication by 4
+                with np.errstate(over='ignore'):
+                    wrapped = to_vax32(data, engine=engine, overflow='wrap')
+                    scaled = data * np.float32(4.)
+                legacy = scaled.view('<u2').reshape(-1, 2)[:, ::-1].copy()
+                self.assertEqual(wrapped.tobytes(), legacy.tobytes())
+
+                self.assertRaises(ValueError, to_vax32, data, engine=engine,
+                                  overflow='raise')
+                self.assertRaises(ValueError, to_vax32_bytes, data, engine=engine,
+                                  overflow='raise')
+                self.assertEqual(to_vax32(data[:2], engine=engine,
+                                          overflow='raise').tobytes(),
+                                 vax_values[:2].tobytes())
+
+        self.assertRaises(ValueError, to_vax32, values, overflow='clip')
+        self.assertRaises(ValueError, to_vax32_bytes, values, overflow='clip')
+
+    def test_underflow(self):
+
+        # Negative zero and magnitudes below 2**-128 become a clean zero, never a dirty
+        # zero or the reserved operand; 2**-128 itself is the smallest VAX value
+        values = np.array([-0., 1.e-45, -1.e-45, 1.e-40, -2.**-129, 2.**-128,
+                           -2.**-128, 0., 1.], dtype='<f4')
+        expected = [0, 0, 0, 0, 0, 0x00000080, 0x00008080, 0, 0x00004080]
+
+        for engine in ('int', 'float'):
+            for data in (values, np.tile(values, 1000)):
+                for overflow in ('saturate', 'raise'):
+                    vax_values = to_vax32(data, engine=engine, overflow=overflow)
+                    self.assertEqual(list(vax_values[:9].view('<u4')), expected)
+                    self.assertEqual(to_vax32_bytes(data, engine=engine,
+                                                    overflow=overflow),
+                                     vax_values.tobytes())
+
+                report = vax.scan_vax32(vax_values)
+                self.assertEqual((report['reserved'], report['dirty_zero']), (0, 0))
+                result = from_vax32(vax_values, special='raise')
+                self.assertEqual(list(result[:9]),
+                                 [0., 0., 0., 0., 0., 2.**-128, -2.**-128, 0., 1.])
+
+                # Each part of a complex value is flushed separately
+                pairs = np.stack([data, data[::-1]], axis=-1).view('<c8')[:, 0]
+                encoded = to_vax32(pairs, engine=engine)
+                self.assertEqual(encoded.tobytes(),
+                                 to_vax32(pairs.view('<f4'), engine=engine).tobytes())
+
+                # "wrap" keeps the plain multiplication by 4
+                wrapped = to_vax32(data, engine=engine, overflow='wrap')
+                scaled = data * np.float32(4.)
+                legacy = scaled.view('<u2').reshape(-1, 2)[:, ::-1].copy()
+                self.assertEqual(wrapped.tobytes(), legacy.tobytes())
+
+    def test_stats(self):
+
+        self.assertFalse(vax.get_profiling())
+        vax.stats(reset=True)
+        from_vax32(b'\0' * 8)
+        self.assertEqual(vax.stats(), {})
+
+        calls = []
+        with vax.profiling(hook=lambda *args: calls.append(args)) as report:
+            from_vax32(b'\0' * 8)
+            from_vax32(np.zeros((3, 4), dtype='u2')[:, :2])
+            from_vax32([1., 2., 3.])
+            to_vax32(np.zeros(5))
+            to_vax32_bytes(np.zeros(5, dtype='<f4'))
+            from_vax64(np.zeros(4, dtype='<c16'))
+            to_vax64([1., 2.])
+            to_vax64_bytes(np.ones(2))
+            self.assertFalse(vax.get_profiling())
+
+        from_vax32(b'\0' * 4)
+        self.assertEqual(len(calls), 8)
+        self.assertEqual(calls[0][:5], ('from_vax32', 'bytes', 8, 8, 0))
+
+        self.assertEqual(sorted(report),
+                         ['from_vax32', 'from_vax64', 'to_vax32', 'to_vax32_bytes',
+                          'to_vax64', 'to_vax64_bytes'])
+        self.assertEqual(sorted(report['from_vax32']),
+                         ['array-like', 'bytes', 'small-int array'])
+
+        counters = report['from_vax32']['small-int array']
+        self.assertEqual(counters['calls'], 1)
+        self.assertEqual(counters['bytes_in'], 12)
+        self.assertEqual(counters['bytes_out'], 12)
+        self.assertEqual(counters['copies'], 1)       # made contiguous
+        self.assertGreaterEqual(counters['seconds'], 0.)
+
+        self.assertEqual(report['from_vax32']['array-like']['copies'], 2)
+        self.assertEqual(report['to_vax32']['cast']['copies'], 0)      # cast by block
+        self.assertEqual(report['to_vax32_bytes']['array']['copies'], 1)
+        self.assertEqual(report['from_vax64']['array']['bytes_in'], 64)
+        self.assertEqual(report['from_vax64']['array']['copies'], 0)
+        self.assertEqual(report['to_vax64']['array-like']['bytes_out'], 16)
+
+        # The totals include the same calls; the report stopped at the end of the block
+        totals = vax.stats(reset=True)
+        self.assertEqual(totals, report)
+        self.assertEqual(vax.stats(), {})
+
+        previous = vax.set_profiling(True)
+        try:
+            self.assertFalse(previous)
+            to_vax32(1.)
+            self.assertEqual(vax.stats()['to_vax32']['array-like']['calls'], 1)
+        finally:
+            vax.set_profiling(False)
+            vax.stats(reset=True)
+
+    def test_dtype(self):
+
+        values = np.random.RandomState(20).randn(3000).astype('<f4')
+        values[:4] = [0., -2.e-38, 5.e37, -5.e37]
+        data = to_vax32_bytes(values)
+
+        for engine in ('int', 'float'):
+            for dtype in ('<f8', '>f8', '>f4', 'f4', np.float64):
+                result = from_vax32(data, dtype=dtype, engine=engine)
+                self.assertEqual(result.dtype, np.dtype(dtype))
+                self.assertTrue(np.array_equal(result, values))
+
+            # Strided and complex input
+            vax_values = to_vax32(values, engine=engine).reshape(30, 100)
+            result = from_vax32(vax_values[:, ::7], dtype='<f8', engine=engine)
+            self.assertEqual(result.dtype, np.dtype('<f8'))
+            self.assertTrue(np.array_equal(result, values.reshape(30, 100)[:, ::7]))
+
+            result = from_vax32(vax_values.view('<c8'), dtype='>c16', engine=engine)
+            self.assertEqual(result.shape, (30, 50))
+            self.assertTrue(np.array_equal(result, values.view('<c8').reshape(30, 50)))
+
+            # Encoding reads other numeric types without a full copy
+            self.assertEqual(to_vax32_bytes(values.astype('<f8'), engine=engine), data)
+            self.assertEqual(to_vax32(values.astype('>f4'), engine=engine).tobytes(),
+                             data)
+            wide = values.astype('<f8').reshape(30, 100).T
+            self.assertEqual(to_vax32(wide, engine=engine, order='K').T.tobytes(), data)
+            self.assertEqual(to_vax32(values.view('<c8').astype('<c16'),
+                                      engine=engine).tobytes(), data)
+            self.assertEqual(to_vax32(np.arange(5, dtype='>i2'), engine=engine).tobytes(),
+                             to_vax32_bytes(np.arange(5.)))
+
+        out = np.empty(3000, dtype='>f8')
+        self.assertIs(from_vax32(data, out=out, dtype='>f8'), out)
+        self.assertTrue(np.array_equal(out, values))
+        self.assertRaises(ValueError, from_vax32, data, out=out)
+        self.assertRaises(ValueError, from_vax32, bytearray(data), inplace=True,
+                          dtype='<f8')
+        self.assertRaises(ValueError, from_vax32, data, dtype='<c16')
+        self.assertRaises(ValueError, from_vax32, data, dtype='<i4')
+        self.assertRaises(ValueError, from_vax32, vax_values.view('<c8'), dtype='<f8')
+
+        # Double precision, including rounding to single precision
+        doubles = np.random.RandomState(64).randn(3000)
+        data = to_vax64_bytes(doubles)
+        for dtype in ('<f4', '>f4', '>f8'):
+            result = from_vax64(data, dtype=dtype)
+            self.assertEqual(result.dtype, np.dtype(dtype))
+            self.assertTrue(np.array_equal(result, doubles.astype(dtype)))
+
+        result = from_vax64(to_vax64(doubles.view('<c16')), dtype='<c8')
+        self.assertEqual(result.dtype, np.dtype('<c8'))
+        self.assertTrue(np.array_equal(result, doubles.view('<c16').astype('<c8')))
+
+        self.assertEqual(to_vax64_bytes(doubles.astype('>f8')), data)
+        self.assertEqual(to_vax64(values).tobytes(),
+                         to_vax64_bytes(values.astype('<f8')))
+        self.assertRaises(ValueError, from_vax64, data, dtype='<c8')
+        self.assertRaises(ValueError, from_vax64, bytearray(data), inplace=True,
+                          dtype='<f4')
+
+    def test_indices(self):
+
+        values = np.random.RandomState(25).randn(6000).astype('<f4')
+        values[:4] = [0., -2.e-38, 5.e37, -5.e37]
+        data = to_vax32_bytes(values)
+        picks = [5999, 0, 3, -1, 17, 3]
+
+        for engine in ('int', 'float'):
+            result = from_vax32(data, indices=picks, engine=engine)
+            self.assertEqual(result.dtype, np.dtype('<f4'))
+            self.assertTrue(np.array_equal(result, values[picks]))
+
+        # Indices count values of the result, for every kind of input
+        grid = values.reshape(60, 100)
+        vax_grid = to_vax32(grid)
+        index = np.array([[7, 99], [1234, 5999]])
+        self.assertTrue(np.array_equal(from_vax32(vax_grid, indices=index),
+                                       grid.ravel()[index]))
+        self.assertTrue(np.array_equal(from_vax32(vax_grid[:, ::3], indices=[-1, 2, 40]),
+                                       grid[:, ::3].ravel()[[-1, 2, 40]]))
+        words = np.frombuffer(data, dtype='<u2').reshape(60, 200)
+        self.assertTrue(np.array_equal(from_vax32(words, indices=index),
+                                       grid.ravel()[index]))
+        self.assertTrue(np.array_equal(from_vax32(vax_grid.view('<c8'), indices=[3, 7]),
+                                       grid.view('<c8').ravel()[[3, 7]]))
+        result = from_vax32(data, indices=np.uint32(42))
+        self.assertIsInstance(result, np.float32)
+        self.assertEqual(result, values[42])
+        result = from_vax32(vax_grid[:, ::3], indices=-1, dtype='<f8')
+        self.assertIsInstance(result, np.float64)
+        self.assertEqual(result, grid[:, ::3][-1, -1])
+        result = from_vax64(to_vax64_bytes(values[:8].astype('<f8')), indices=5)
+        self.assertIsInstance(result, np.float64)
+        self.assertEqual(result, values[5])
+        self.assertEqual(from_vax32(data, indices=[[3]]).shape, (1, 1))
+        self.assertEqual(from_vax32(data, indices=[]).shape, (0,))
+        self.assertTrue(np.array_equal(from_vax32(data, indices=picks, dtype='>f8'),
+                                       values[picks]))
+        out = np.empty(6, dtype='<f4')
+        self.assertIs(from_vax32(data, indices=picks, out=out), out)
+        self.assertTrue(np.array_equal(out, values[picks]))
+
+        # Masks, including one over the leading axis
+        mask = grid > 1.
+        self.assertTrue(np.array_equal(from_vax32(vax_grid, mask=mask), grid[mask]))
+        rows = np.arange(60) % 7 == 0
+        self.assertTrue(np.array_equal(from_vax32(vax_grid, mask=rows), grid[rows]))
+        self.assertEqual(from_vax32(vax_grid, mask=rows).shape, (9, 100))
+
+        # A memory-mapped file
+        path = os.path.join(tempfile.mkdtemp(), 'test.dat')
+        try:
+            with open(path, 'wb') as f:
+                f.write(data)
+            memmap = np.memmap(path, dtype='u1', mode='r')
+            self.assertTrue(np.array_equal(from_vax32(memmap, indices=picks),
+                                           values[picks]))
+            del memmap
+        finally:
+            os.remove(path)
+
+        self.assertRaises(IndexError, from_vax32, data, indices=[6000])
+        self.assertRaises(IndexError, from_vax32, vax_grid[:, ::3], indices=[-3401])
+        self.assertRaises(ValueError, from_vax32, data, indices=[1.])
+        self.assertRaises(ValueError, from_vax32, data, indices=[1], mask=[True])
+        self.assertRaises(ValueError, from_vax32, data, mask=[True])
+        self.assertRaises(ValueError, from_vax32, data, mask=np.ones(6000, dtype='u1'))
+        self.assertRaises(ValueError, from_vax32, bytearray(data), inplace=True,
+                          indices=[1])
+
+        # Double precision
+        doubles = np.random.RandomState(64).randn(3000)
+        data = to_vax64_bytes(doubles)
+        self.assertTrue(np.array_equal(from_vax64(data, indices=picks[1:4]),
+                                       doubles[picks[1:4]]))
+        vax_doubles = to_vax64(doubles.reshape(30, 100))
+        mask = doubles.reshape(30, 100) < 0.
+        self.assertTrue(np.array_equal(from_vax64(vax_doubles, mask=mask),
+                                       doubles.reshape(30, 100)[mask]))
+        self.assertTrue(np.array_equal(from_vax64(vax_doubles.T, indices=[1, 2]),
+                                       doubles.reshape(30, 100).T.ravel()[[1, 2]]))
+        result = from_vax64(np.frombuffer(data, dtype='<u2'), indices=[9, 8], dtype='<f4')
+        self.assertTrue(np.array_equal(result, doubles[[9, 8]].astype('<f4')))
+        self.assertRaises(IndexError, from_vax64, data, indices=[3000])
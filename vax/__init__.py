@@ -4,19 +4,33 @@
 """PDS Ring-Moon Systems Node, SETI Institute
 
 Functions to convert between VAX single- and double-precision floats and IEEE floats.
-Conversions to/from VAX single precision are supported. However, only conversion from VAX
-doubles to IEEE doubles is supported, not the reverse.
+Conversions to/from VAX single precision (F-floating) and VAX double precision
+(D-floating) are supported.
 
 This module continues to support Python 2 in addition to Python 3.
-
-Conversions to/from VAX single precision is supported. However, only conversions from VAX
-doubles to IEEE doubles are supported, not the reverse.
 """
 
-__all__ = ['from_vax32', 'to_vax32_bytes', 'to_vax32', 'from_vax64']
-
+__all__ = ['from_vax32', 'to_vax32_bytes', 'to_vax32',
+           'from_vax64', 'to_vax64_bytes', 'to_vax64',
+           'iter_from_vax32', 'iter_from_vax64', 'aiter_from_vax32', 'aiter_from_vax64',
+           'VaxWriter',
+           'VaxArray', 'from_vax_records', 'read_table', 'table_params',
+           'scan_vax32', 'scan_vax64', 'from_vax', 'to_vax', 'F4', 'C8', 'D8', 'DC16',
+           'vax32_to_float', 'vax64_to_float', 'float_to_vax32', 'float_to_vax64',
+           'from_vax32_many', 'from_vax64_many', 'to_vax32_many',
+           'cached_from_vax32', 'cached_from_vax64', 'set_cache', 'get_cache',
+           'clear_cache',
+           'set_nthreads', 'get_nthreads', 'set_engine', 'get_engine',
+           'set_profiling', 'get_profiling', 'stats', 'profiling']
+
+import contextlib
+import functools
 import numpy as np
+import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     from ._version import __version__
@@ -25,8 +39,679 @@ except ImportError:
 
 _PYTHON2 = sys.version_info.major <= 2
 
+# Number of 4- or 8-byte words converted per block. Conversions proceed one block at a
+# time so that temporary arrays stay small and cache-resident, however large the input.
+_BLOCK = 1 << 16
+
+
+def _check_writable(data):
+    """Raise ValueError unless this object can be overwritten in place."""
+
+    if isinstance(data, bytearray):
+        return
+    if isinstance(data, memoryview):
+        ok = not data.readonly and data.c_contiguous
+    elif isinstance(data, np.ndarray):
+        ok = data.flags.writeable and data.flags.c_contiguous
+    else:
+        ok = False
+
+    if not ok:
+        raise ValueError('inplace conversion requires a writable, contiguous buffer')
+
+
+def _flat_out(out, dtype, size):
+    """Validate a user-supplied output array and return a flat view of it."""
+
+    if not (isinstance(out, np.ndarray) and out.dtype == np.dtype(dtype)
+            and out.size == size and out.flags.c_contiguous and out.flags.writeable):
+        raise ValueError('out must be a writable, C-contiguous array of dtype "'
+                         + dtype + '" with ' + str(size) + ' elements')
+    return out.reshape(-1)
+
+
+################################################################################
+# Multithreading support
+################################################################################
+
+_NTHREADS = 1           # default number of threads; see set_nthreads()
+_POOL = None            # shared thread pool, created on first use
+_POOL_LOCK = threading.Lock()
+
+
+def set_nthreads(nthreads):
+    """Set the default number of threads used by the conversion functions.
+
+    Large conversions are divided into contiguous segments of at least `_BLOCK` values,
+    which are converted concurrently into the shared output array. NumPy releases the
+    GIL during the underlying operations, so the threads run in parallel.
+
+    Args:
+        nthreads (int): The default number of threads. Use 0 for one thread per CPU.
+
+    Returns:
+        int: The previous default.
+    """
+
+    global _NTHREADS
+
+    previous = _NTHREADS
+    _NTHREADS = int(nthreads)
+    return previous
+
+
+def get_nthreads():
+    """Return the default number of threads used by the conversion functions.
+
+    Returns:
+        int: The default number of threads, as given to `set_nthreads`; 0 indicates one
+            thread per CPU.
+    """
+
+    return _NTHREADS
+
+
+def _convert(kernel, src, dst, nthreads, *args):
+    """Apply a block conversion kernel to src and dst, possibly using multiple threads.
+
+    Args:
+        kernel (function): The kernel to apply, taking arguments (src, dst, *args).
+        src (np.ndarray): 1-D source array. Its size must be a multiple of the size of
+            `dst`; each element of `dst` corresponds to an equal share of `src`.
+        dst (np.ndarray): 1-D destination array.
+        nthreads (int or None): The number of threads; None for the default; 0 for one
+            per CPU.
+        *args: Additional arguments to the kernel.
+    """
+
+    size = len(dst)
+    nthreads = min(_nthreads(nthreads), size // _BLOCK)
+    if nthreads <= 1:
+        kernel(src, dst, *args)
+        return
+
+    # Segment boundaries are aligned to whole blocks
+    src = src.reshape(size, -1)
+    blocks = -(-size // _BLOCK)
+    bounds = [min(size, ((blocks * k) // nthreads) * _BLOCK) for k in range(nthreads + 1)]
+
+    pool = _get_pool(nthreads)
+    futures = [pool.submit(kernel, src[start:stop].reshape(-1), dst[start:stop], *args)
+               for (start, stop) in zip(bounds[:-1], bounds[1:])]
+    for future in futures:
+        future.result()
+
+
+def _nthreads(nthreads):
+    """The number of threads to use, given the value of an nthreads argument."""
+
+    if nthreads is None:
+        nthreads = _NTHREADS
+    if nthreads <= 0:
+        nthreads = os.cpu_count() or 1
+    return nthreads
+
+
+def _get_pool(nthreads):
+    """Return the shared thread pool, enlarging it if necessary.
+
+    A pool that is too small is replaced but not shut down, because another thread may
+    still be submitting work to it; its threads exit once it is no longer referenced.
+    """
+
+    global _POOL
+
+    with _POOL_LOCK:
+        if _POOL is None or _POOL._max_workers < nthreads:
+            _POOL = ThreadPoolExecutor(max_workers=nthreads,
+                                       thread_name_prefix='vax')
+        return _POOL
+
+
+################################################################################
+# Instrumentation
+################################################################################
+
+_PROFILING = False      # True while statistics are being collected
+_ALWAYS = False         # True if collection was enabled by set_profiling()
+_STATS = {}             # function -> input branch -> counters; see stats()
+_REPORTS = []           # reports of active profiling() blocks
+_HOOKS = []             # callbacks of active profiling() blocks
+_STATS_LOCK = threading.Lock()
+
+
+def set_profiling(enabled):
+    """Enable or disable the collection of conversion statistics; see `stats`.
+
+    While collection is disabled, which is the default, the conversion functions do no
+    more than check a flag.
+
+    Args:
+        enabled (bool): True to collect statistics; False to stop.
+
+    Returns:
+        bool: The previous setting.
+    """
+
+    global _ALWAYS
+
+    with _STATS_LOCK:
+        previous = _ALWAYS
+        _ALWAYS = bool(enabled)
+        _update_profiling()
+
+    return previous
+
+
+def get_profiling():
+    """Return True if the collection of conversion statistics is enabled.
+
+    Returns:
+        bool: The setting made by `set_profiling`. Statistics are also collected within
+            a `profiling` block.
+    """
+
+    return _ALWAYS
+
+
+def stats(reset=False):
+    """Return the conversion statistics collected so far.
+
+    Statistics are collected while enabled by `set_profiling` or within a `profiling`
+    block. They cover `from_vax32`, `to_vax32`, `to_vax32_bytes`, `from_vax64`,
+    `to_vax64`, and `to_vax64_bytes`, including calls made by the other interfaces of
+    this module. Each call is counted under the branch taken for its input:
+
+    - "bytes": bytes, bytearray, memoryview, or str.
+    - "array": an array whose items are whole values, e.g., "<f4" for `from_vax32`.
+    - "small-int array": an array of 1- or 2-byte integers (or, for `from_vax64`, 4-byte
+      ones), several of which make up each value.
+    - "cast": an array of another numeric type or byte order, which is cast to the
+      input type block by block during the conversion, e.g., "<f8" values passed to
+      `to_vax32`.
+    - "array-like": a scalar, list, or other object that is first made into an array.
+
+    Args:
+        reset (bool, optional): True to clear the statistics after returning them.
+
+    Returns:
+        dict: A dictionary keyed by function name, containing dictionaries keyed by
+            branch, each of which has the entries "calls", "bytes_in" (bytes of input
+            values converted), "bytes_out" (bytes of results), "copies" (complete copies
+            made of the input or output, such as a cast or a conversion to bytes), and
+            "seconds" (elapsed time).
+    """
+
+    global _STATS
+
+    with _STATS_LOCK:
+        result = _STATS
+        if reset:
+            _STATS = {}
+        else:
+            result = _copy_stats(result)
+
+    return result
+
+
+@contextlib.contextmanager
+def profiling(hook=None):
+    """Collect conversion statistics for the duration of a with block.
+
+    The block yields a dictionary, in the form returned by `stats`, which holds the
+    statistics of the conversions made within the block, in any thread:
+
+        with vax.profiling() as report:
+            ingest(files)
+        print(report['from_vax32'])
+
+    These conversions are also added to the totals returned by `stats`.
+
+    Args:
+        hook (function, optional): A function to call after each conversion within the
+            block, with arguments (function, branch, bytes_in, bytes_out, copies,
+            seconds), as described for `stats`.
+
+    Yields:
+        dict: The statistics of the block, updated as the conversions occur.
+    """
+
+    report = {}
+    with _STATS_LOCK:
+        _REPORTS.append(report)
+        if hook is not None:
+            _HOOKS.append(hook)
+        _update_profiling()
+
+    try:
+        yield report
+    finally:
+        with _STATS_LOCK:
+            _REPORTS.remove(report)
+            if hook is not None:
+                _HOOKS.remove(hook)
+            _update_profiling()
+
+
+def _update_profiling():
+    """Set _PROFILING to match the current settings; call with _STATS_LOCK held."""
+
+    global _PROFILING
+
+    _PROFILING = _ALWAYS or bool(_REPORTS)
+
+
+def _record(function, branch, bytes_in, bytes_out, copies, start):
+    """Add one conversion to the statistics.
+
+    Args:
+        function (str): The name of the conversion function.
+        branch (str): The branch taken for the input; see `stats`.
+        bytes_in (int): The number of bytes of input values.
+        bytes_out (int): The number of bytes of results.
+        copies (int): The number of complete copies made.
+        start (float): The value of time.perf_counter() at the start of the call.
+    """
+
+    seconds = time.perf_counter() - start
+    with _STATS_LOCK:
+        for table in [_STATS] + _REPORTS:
+            counters = table.setdefault(function, {}).get(branch)
+            if counters is None:
+                counters = {'calls': 0, 'bytes_in': 0, 'bytes_out': 0, 'copies': 0,
+                            'seconds': 0.}
+                table[function][branch] = counters
+            counters['calls'] += 1
+            counters['bytes_in'] += bytes_in
+            counters['bytes_out'] += bytes_out
+            counters['copies'] += copies
+            counters['seconds'] += seconds
+        hooks = list(_HOOKS)
+
+    for hook in hooks:
+        hook(function, branch, bytes_in, bytes_out, copies, seconds)
+
+
+def _copy_stats(table):
+    """A copy of a statistics dictionary that will not change as calls are made."""
+
+    return {function: {branch: dict(counters) for (branch, counters) in branches.items()}
+            for (function, branches) in table.items()}
+
+
+def _input_branch(data, array, dtype):
+    """The branch taken for an input to an encoder, and the number of copies it needed.
+
+    Args:
+        data: The input as given by the caller.
+        array (np.ndarray): The array of IEEE values made from it.
+        dtype (str): The dtype of IEEE values that the encoder converts.
+
+    Returns:
+        tuple: (branch, copies); see `stats`.
+    """
+
+    if array is data:
+        return ('array' if array.dtype == np.dtype(dtype) else 'cast', 0)
+    if isinstance(data, np.ndarray):
+        return ('cast', 1)
+    return ('array-like', int(array.flags.owndata))
+
+
+################################################################################
+# Memory layout
+################################################################################
+
+_ORDERS = ('C', 'F', 'K')
+
+
+def _order(order):
+    """Validate a memory order, raising ValueError if it is not "C", "F", or "K"."""
+
+    if order not in _ORDERS:
+        raise ValueError('invalid order: ' + repr(order))
+    return order
+
+
+def _empty(array, shape, dtype, order):
+    """A new array for the converted values of `array`, in the requested memory order.
+
+    With order "K", the layout of `array` is followed if it has the same shape.
+    """
+
+    if order == 'K' and array.shape == tuple(shape):
+        return np.empty_like(array, dtype=dtype, order='K', subok=False)
+    return np.empty(shape, dtype=dtype, order='F' if order == 'F' else 'C')
+
+
+def _convert_nd(kernel, src, dst, dtypes, nthreads, *args):
+    """Apply a block conversion kernel to N-D arrays of the same shape and any layout.
+
+    The arrays are traversed in the memory order of `dst`, which must be contiguous in
+    some ordering of its axes. If `src` has the same layout, flat views of both are
+    converted directly. Otherwise, `src` is gathered into contiguous buffers a few blocks
+    long as the conversion proceeds, so it is never copied in full.
+
+    Args:
+        kernel (function): The kernel to apply, taking arguments (src, dst, *args).
+        src (np.ndarray): Source array, with one converted value per element.
+        dst (np.ndarray): Destination array, of the same shape as `src`.
+        dtypes (tuple): The dtypes of the 1-D views of `src` and `dst` that the kernel
+            expects.
+        nthreads (int or None): The number of threads; None for the default; 0 for one
+            per CPU.
+        *args: Additional arguments to the kernel.
+    """
+
+    axes = sorted(range(dst.ndim), key=lambda k: -abs(dst.strides[k]))
+    src = src.transpose(axes)
+    dst = dst.transpose(axes).reshape(-1)
+
+    if src.flags.c_contiguous:
+        _convert(kernel, src.reshape(-1).view(dtypes[0]), dst.view(dtypes[1]), nthreads,
+                 *args)
+        return
+
+    buffers = np.nditer(src, flags=['external_loop', 'buffered', 'zerosize_ok'],
+                        op_flags=[['readonly', 'contig']], order='C',
+                        buffersize=_BLOCK * _nthreads(nthreads))
+    start = 0
+    for buffer in buffers:
+        stop = start + len(buffer)
+        _convert(kernel, buffer.view(dtypes[0]), dst[start:stop].view(dtypes[1]),
+                 nthreads, *args)
+        start = stop
+
+
+################################################################################
+# Precision and byte order
+################################################################################
+
+def _result_dtype(dtype, natural):
+    """The dtype of the converted values, given the value of a dtype argument.
+
+    Args:
+        dtype (np.dtype or str or None): The requested dtype; None for the natural one.
+        natural (str): The dtype produced by the kernels: "<f4", "<c8", "<f8", or "<c16".
+
+    Returns:
+        np.dtype: The dtype of the result.
+
+    Raises:
+        ValueError: If the dtype is not a 4- or 8-byte float type for real values, or an
+            8- or 16-byte complex type for complex values.
+    """
+
+    natural = np.dtype(natural)
+    if dtype is None:
+        return natural
+
+    dtype = np.dtype(dtype)
+    if natural.kind == 'f':
+        if dtype.kind != 'f' or dtype.itemsize not in (4, 8):
+            raise ValueError('dtype must be "f4" or "f8" for real values: ' + str(dtype))
+    elif dtype.kind != 'c' or dtype.itemsize not in (8, 16):
+        raise ValueError('dtype must be "c8" or "c16" for complex values: ' + str(dtype))
+
+    return dtype
+
+
+def _component(dtype):
+    """The real dtype of each component of a float, complex, or integer dtype."""
+
+    dtype = np.dtype(dtype)
+    if dtype.kind == 'c':
+        return np.dtype(dtype.byteorder + 'f' + str(dtype.itemsize // 2))
+    return dtype
+
+
+def _cast_output(kernel, dtypes, src, dst, *args):
+    """Apply a block conversion kernel, casting its results into `dst` block by block.
+
+    The kernel writes each block into a temporary array, which stays cache-resident, so
+    the results are converted to another precision or byte order within the same pass
+    and no full-size intermediate array is needed.
+
+    Args:
+        kernel (function): The kernel to apply, taking arguments (src, dst, *args).
+        dtypes (tuple): The dtype of the values the kernel produces, and the dtype of
+            the view of them that it expects as `dst`.
+        src (np.ndarray): 1-D source array, as expected by the kernel.
+        dst (np.ndarray): 1-D destination array of real values, of any float dtype.
+        *args: Additional arguments to the kernel.
+    """
+
+    size = len(dst)
+    if size == 0:
+        return
+
+    ratio = len(src) // size
+    temp = np.empty(min(size, _BLOCK), dtype=dtypes[0])
+    for start in range(0, size, _BLOCK):
+        work = temp[:min(_BLOCK, size - start)]
+        stop = start + len(work)
+        kernel(src[start * ratio:stop * ratio], work.view(dtypes[1]), *args)
+        dst[start:stop] = work
+
+
+def _cast_input(kernel, dtypes, src, dst, *args):
+    """Apply a block conversion kernel to values cast from `src` block by block.
+
+    This is the counterpart of `_cast_output`, for kernels whose input is IEEE values.
+
+    Args:
+        kernel (function): The kernel to apply, taking arguments (src, dst, *args).
+        dtypes (tuple): The dtype of the values the kernel converts, and the dtype of
+            the view of them that it expects as `src`.
+        src (np.ndarray): 1-D source array of real values, of any numeric dtype.
+        dst (np.ndarray): 1-D destination array, as expected by the kernel.
+        *args: Additional arguments to the kernel.
+    """
+
+    size = len(src)
+    temp = np.empty(min(size, _BLOCK), dtype=dtypes[0])
+    for start in range(0, size, _BLOCK):
+        work = temp[:min(_BLOCK, size - start)]
+        stop = start + len(work)
+        work[...] = src[start:stop]
+        kernel(work.view(dtypes[1]), dst[start:stop], *args)
+
+
+def _ieee_input(array, dtype):
+    """The input to an encoder as an array, and whether it must still be cast.
+
+    Arrays of other numeric types are returned as they are, to be cast block by block
+    during the conversion by `_cast_input`; other inputs are converted to `dtype`.
+
+    Returns:
+        tuple: (array, cast), where cast is True if the array still needs to be cast.
+    """
+
+    if isinstance(array, np.ndarray) and array.dtype != np.dtype(dtype):
+        kinds = 'c' if np.dtype(dtype).kind == 'c' else 'fiu'
+        if array.dtype.kind in kinds and not array.dtype.names:
+            return (array, True)
+
+    return (np.asarray(array, dtype=dtype), False)
+
+
+################################################################################
+# Selection of values
+################################################################################
+
+def _select(array, dtype, shape, indices, mask):
+    """Gather the raw values selected by the `indices` or `mask` argument of a decoder.
+
+    Only the selected values are read, so pages of a memory-mapped input that hold no
+    selected value are never touched.
+
+    Args:
+        array (np.ndarray): The validated input array.
+        dtype (str): The dtype of one whole raw value: "<f4", "<c8", "<f8", or "<c16".
+        shape (tuple): The shape of the input in whole values.
+        indices (array-like or None): Indices into the flattened values.
+        mask (array-like or None): A boolean mask of the values.
+
+    Returns:
+        np.ndarray: A new, C-contiguous array of the selected raw values, with the
+            shape of `indices`, or 1-D plus any remaining axes for `mask`.
+
+    Raises:
+        ValueError: If the indices or mask are invalid, or if both are given.
+        IndexError: If an index is out of range.
+    """
+
+    if array.itemsize == np.dtype(dtype).itemsize:
+        values = array.view(dtype)
+    else:
+        values = array.reshape(-1).view(dtype).reshape(shape)
+
+    if mask is not None:
+        if indices is not None:
+            raise ValueError('indices and mask cannot both be specified')
+        mask = np.asarray(mask)
+        if mask.dtype != np.bool_:
+            raise ValueError('mask must be a boolean array')
+        if mask.shape != values.shape[:mask.ndim]:
+            raise ValueError('mask shape ' + str(mask.shape)
+                             + ' does not match data shape ' + str(values.shape))
+        return np.array(values[mask], order='C')
+
+    indices = np.asarray(indices)
+    if indices.size == 0:
+        indices = indices.astype(np.intp)       # an empty list becomes a float array
+    elif indices.dtype.kind not in 'iu':
+        raise ValueError('indices must be integers')
+
+    size = values.size
+    if indices.size and (indices.min() < -size or indices.max() >= size):
+        raise IndexError('index out of range for ' + str(size) + ' values')
+
+    # A flat view requires a contiguous input; otherwise, index each axis. np.array
+    # keeps the shape () of a single index, which np.ascontiguousarray would not.
+    if values.flags.c_contiguous:
+        return np.array(values.reshape(-1)[indices], order='C')
+
+    if indices.dtype.kind == 'i':
+        indices = np.where(indices < 0, indices + size, indices)
+    return np.array(values[np.unravel_index(indices, values.shape)], order='C')
+
+
+################################################################################
+# Special values
+################################################################################
+
+# Policies for VAX reserved operands and dirty zeros in from_vax32 and from_vax64
+_SPECIAL_POLICIES = ('ieee-compatible', 'zero', 'nan', 'raise')
+
+# Policies for IEEE values outside the VAX range in to_vax32 and to_vax32_bytes
+_OVERFLOW_POLICIES = ('saturate', 'raise', 'wrap')
+
+
+def _policy(policy, policies, name):
+    """Validate a policy name, raising ValueError if it is not one of `policies`."""
+
+    if policy not in policies:
+        raise ValueError('invalid ' + name + ' policy: ' + repr(policy))
+    return policy
 
-def from_vax32(data):
+
+def _find_special(bits, exponent_mask, special):
+    """Locate the reserved operands and dirty zeros among VAX values.
+
+    Args:
+        bits (np.ndarray): Unsigned integer bit patterns of the VAX values, in MSB
+            order, i.e., with the sign in the high bit.
+        exponent_mask (int): The mask selecting the exponent bits.
+        special (str): The policy for these values; see `from_vax32`.
+
+    Returns:
+        np.ndarray or None: A boolean mask of the values with a zero exponent that are
+            not true zeros; None if there are none.
+
+    Raises:
+        ValueError: If the policy is "raise" and any such value is present.
+    """
+
+    mask = (bits & exponent_mask) == 0
+    mask &= bits != 0
+    if not mask.any():
+        return None
+
+    if special == 'raise':
+        raise ValueError('VAX data contains a reserved operand or dirty zero')
+    return mask
+
+
+def _replace_special(ieee_bits, mask, special, nan):
+    """Overwrite the IEEE bits at the masked locations according to the policy."""
+
+    np.copyto(ieee_bits, 0 if special == 'zero' else nan, where=mask)
+
+
+################################################################################
+# 32-bit support
+################################################################################
+
+# Default engine for single-precision conversion; see set_engine()
+_ENGINE = 'int'
+
+# Below this number of values, the "int" engine uses the "float" kernels, which have less
+# overhead per call
+_INT_MIN_SIZE = 1024
+
+
+def set_engine(engine):
+    """Set the default engine used for single-precision conversions.
+
+    The "int" engine treats each VAX or IEEE value as a 32-bit integer and converts it
+    with a rotation and an addition to the exponent, with special cases handled
+    separately. The "float" engine swaps the 16-bit halves of each value and then
+    multiplies or divides by 4 in floating point. The results are identical bit for bit;
+    "int" is the default because it is faster, and "float" is retained as a reference.
+    Conversions of fewer than about a thousand values always use the "float" method,
+    because its overhead per call is lower.
+
+    Args:
+        engine (str): "int" or "float".
+
+    Returns:
+        str: The previous default.
+
+    Raises:
+        ValueError: If the engine is invalid.
+    """
+
+    global _ENGINE
+
+    previous = _ENGINE
+    _ENGINE = _engine(engine)
+    return previous
+
+
+def get_engine():
+    """Return the default engine used for single-precision conversions.
+
+    Returns:
+        str: "int" or "float"; see `set_engine`.
+    """
+
+    return _ENGINE
+
+
+def _engine(engine):
+    """Validate an engine name, returning the default if it is None."""
+
+    if engine is None:
+        return _ENGINE
+    if engine not in ('int', 'float'):
+        raise ValueError('invalid engine: ' + repr(engine))
+    return engine
+
+
+def from_vax32(data, out=None, inplace=False, nthreads=None, engine=None,
+               special='ieee-compatible', order='C', dtype=None, indices=None,
+               mask=None):
     """Return equivalent single-precision IEEE value for VAX representation.
 
     Given a byte string, array, or array-like (something that can be converted to a numpy
@@ -39,20 +724,90 @@ def from_vax32(data):
 
             If the input is an array, the shape of that array is preserved except for the
             last axis, which may be modified to account for the new itemsize.
+        out (np.ndarray, optional):
+            A writable, C-contiguous array with the dtype of the result ("<f4" or "<c8")
+            and the same number of elements. If provided, the converted values are
+            written into this array and it is returned.
+        inplace (bool, optional):
+            True to overwrite the input buffer with the converted values, so that no new
+            array is allocated. The input must be a bytearray, a writable memoryview, or a
+            writable, C-contiguous numpy array. The returned value shares memory with the
+            input.
+        nthreads (int, optional):
+            The number of threads over which to divide the conversion of a large array;
+            0 for one thread per CPU. If None, the default set by `set_nthreads` is used.
+        engine (str, optional):
+            "int" or "float", to select the conversion method; see `set_engine`. If
+            None, the default set by `set_engine` is used.
+        special (str, optional):
+            How to convert VAX reserved operands (sign bit set and exponent zero) and
+            dirty zeros (exponent zero with a nonzero mantissa). With "ieee-compatible",
+            they are converted by the same rule as other values, becoming IEEE denormals
+            or -0. With "zero" or "nan", they become zero or NaN. With "raise", a
+            ValueError is raised; because the check is made during the conversion, an
+            input being converted in place may already have been partly overwritten.
+        order (str, optional):
+            The memory layout of a returned array: "C" for C order, "F" for Fortran
+            order, or "K" to follow the layout of the input array as closely as
+            possible. Input arrays of any layout, including strided views, are converted
+            without first being copied in full. Ignored if `out`, `inplace`, `indices`,
+            or `mask` is given.
+        dtype (np.dtype or str, optional):
+            The dtype of the result: "f4" or "f8" for real values, or "c8" or "c16" for
+            complex values, in either byte order. The values are written in this dtype
+            as they are converted, with no intermediate single-precision array. If None,
+            the result has dtype "<f4" or "<c8". Converted values are exact in either
+            precision. Not available with `inplace`.
+        indices (array-like of int, optional):
+            Indices of the values to convert, counted in the result flattened in C
+            order, as for `np.take`; negative indices count from the end. Only the
+            selected values are read and converted, so the cost depends on their number
+            rather than on the size of the input, and pages of an `np.memmap` holding no
+            selected value are never read. The result has the shape of `indices`. Not
+            available with `inplace`.
+        mask (array-like of bool, optional):
+            A boolean array selecting the values to convert, with the shape of the
+            result or of its leading axes, as for indexing a numpy array with a mask.
+            The result holds the selected values in C order. Not available with
+            `inplace` or `indices`.
 
     Returns:
         np.array or np.float32 or np.complex64:
             The interpreted IEEE value. If the input array is complex, the returned array
-            will have dtype "<c8"; otherwise, it will have dtype "<f4".
+            will have dtype "<c8"; otherwise, it will have dtype "<f4"; or, in either
+            case, the dtype given by `dtype`.
+
+    Raises:
+        ValueError: If the input has an invalid size or data type, if `out`, `inplace`,
+            or `dtype` cannot be honored, if `indices` or `mask` is invalid, or if
+            `special` is "raise" and the data contains a reserved operand or dirty zero.
+        IndexError: If an index is out of range.
     """
 
+    start = time.perf_counter() if _PROFILING else None
+    copies = 0                          # complete copies made, for the statistics
+
     # Convert a string to bytes; also handle a Python 2 buffer
     if _PYTHON2:
         if isinstance(data, (str, buffer)):     # pragma: no cover  # noqa: F821
             data = bytes(data)
+            copies = 1
     else:
         if isinstance(data, str):
             data = bytes(data, encoding='latin8')
+            copies = 1
+
+    kernel = _vax32_to_ieee_int if _engine(engine) == 'int' else _vax32_to_ieee
+    _policy(special, _SPECIAL_POLICIES, 'special')
+    _order(order)
+
+    gathered = indices is not None or mask is not None
+    if inplace:
+        if out is not None:
+            raise ValueError('out and inplace cannot both be specified')
+        if gathered:
+            raise ValueError('indices and mask cannot be used with inplace')
+        _check_writable(data)
 
     # Convert the object to a NumPy array with an even number of 2-byte elements
     if isinstance(data, (bytes, bytearray, memoryview)):
@@ -61,14 +816,15 @@ def from_vax32(data):
             raise ValueError('data size is not a multiple of 4 bytes')
 
         array = np.frombuffer(data, dtype='<f4')
+        branch = 'bytes'
         scalar = (nbytes == 4)          # True to convert to scalar at the end
         shapeless = False
         newshape = (nbytes // 4,)       # array shape after conversion
-        dtype = '<f4'
+        natural = '<f4'
 
     else:
         scalar = np.isscalar(data)      # True to return a scalar
-        array = np.asarray(data, order='C')
+        array = np.asarray(data)
         shapeless = array.shape == ()   # True to convert back to shape ()
 
         array = np.atleast_1d(array)    # needed for the view to work below
@@ -79,22 +835,31 @@ def from_vax32(data):
             if key not in {'f4', 'c8', 'u1', 'u2', 'u4', 'i1', 'i2', 'i4'}:
                 raise ValueError('invalid data type for 4-byte array input: '
                                  + str(array.dtype))
-            dtype = '<c8' if key == 'c8' else '<f4'
+            natural = '<c8' if key == 'c8' else '<f4'
+            branch = 'array' if array.itemsize >= 4 else 'small-int array'
 
         else:
             # Conversion of array-like produces arrays with dtype "f8" or "c16"
+            branch = 'array-like'
+            copies += array.flags.owndata
+            original = array
             if array.dtype.kind == 'c':
                 array = np.asarray(array, dtype='<c8')
-                dtype = '<c8'
+                natural = '<c8'
             elif array.dtype.kind in 'uif':
                 array = np.asarray(array, dtype='<' + array.dtype.kind + '4')
-                dtype = '<f4'
+                natural = '<f4'
             else:
                 raise ValueError('invalid data type for 4-byte array-like '
                                  'input: ' + str(array.dtype))
+            copies += array is not original
 
-        # Determine array shape after conversion
+        # Determine array shape after conversion. Values made up of several elements
+        # must be contiguous; other arrays are converted in their own layout.
         if array.itemsize in (1, 2):
+            contiguous = np.ascontiguousarray(array)
+            copies += contiguous is not array
+            array = contiguous
             if (array.shape[-1] * array.itemsize) % 4 != 0:
                 raise ValueError('last axis size is not a multiple of 4 bytes')
 
@@ -107,66 +872,289 @@ def from_vax32(data):
         else:
             newshape = array.shape
 
-    itemsize = 8 if dtype == '<c8' else 4
+    # Gather only the selected values; the gathered copy is then converted in place
+    if gathered:
+        selected = _select(array, natural, newshape, indices, mask)
+        array = np.atleast_1d(selected)
+        newshape = array.shape
+        scalar = selected.ndim == 0
+        shapeless = False
+
+    itemsize = 8 if natural == '<c8' else 4
+    size = array.nbytes // itemsize
+
+    # Cast the results block by block if another dtype is requested
+    target = _result_dtype(dtype, natural)
+    component = _component(target)
+    if target != np.dtype(natural):
+        if inplace:
+            raise ValueError('dtype cannot be changed by an inplace conversion')
+        kernel = functools.partial(_cast_output, kernel, ('<f4', '<f4'))
+
+    if inplace or (gathered and out is None and target == np.dtype(natural)):
+        ieee = array.reshape(-1).view(natural)
+    elif out is not None:
+        ieee = _flat_out(out, target.str, size)
+    elif array.itemsize == itemsize:
+        ieee = _empty(array, newshape, target, order)
+    else:
+        ieee = np.empty(size, dtype=target)
 
     # Convert...
+    if array.itemsize == itemsize:
+        _convert_nd(kernel, array, ieee.reshape(array.shape), ('<u2', component),
+                    nthreads, special)
+    else:
+        _convert(kernel, array.reshape(-1).view('<u2'), ieee.view(component), nthreads,
+                 special)
 
-    # Swap pairs of bytes within words to put everything in LSB order (where the
-    # sign has the highest memory address).
-    #         |31              |15            |1
-    # Before: mmmmmm_m1_mmmmmm seeeeeeeemm_m0_m
-    # After:  seeeeeeeemm_m0_m mmmmmm_m1_mmmmmm
-    # IEEE:   seeeeeeeemm_m0_m mmmmmmm_m1_mmmmm
-    pairs = array.view(dtype='u2')
-    pairs = pairs.reshape(-1, 2)
-    swapped = pairs[:, ::-1].copy()
-    swapped = swapped.reshape(-1, itemsize//2)
-    # The sign, exponent, and mantissa are now aligned with IEEE layout
-
-    # Correct for the different biases of the exponent
-    ieee = swapped.view(dtype=dtype) / 4.
-
-    if scalar:
-        return ieee[0, 0]                # current shape is (1,1)
+    if out is not None:
+        result = out
+    elif scalar:
+        result = ieee[0]
     elif shapeless:
-        return ieee.reshape(())
+        result = ieee.reshape(())
     else:
-        return ieee.reshape(newshape)
+        result = ieee.reshape(newshape)
+
+    if start is not None:
+        _record('from_vax32', branch, array.nbytes, ieee.nbytes, copies, start)
+    return result
+
+
+def _vax32_to_ieee(src, dst, special='ieee-compatible'):
+    """Convert VAX single-precision words to IEEE floats, one block at a time.
 
+    Args:
+        src (np.ndarray): 1-D array of dtype "<u2" containing the VAX representation.
+        dst (np.ndarray): 1-D array of dtype "<f4" to receive the IEEE values. It may
+            share memory with `src`.
+        special (str, optional): The policy for reserved operands and dirty zeros.
+    """
+
+    pairs = src.reshape(-1, 2)
+    swapped = dst.view('<u2').reshape(-1, 2)
+
+    for start in range(0, len(dst), _BLOCK):
+        stop = start + _BLOCK
+
+        # Swap pairs of bytes within words to put everything in LSB order (where the
+        # sign has the highest memory address).
+        #         |31              |15            |1
+        # Before: mmmmmm_m1_mmmmmm seeeeeeeemm_m0_m
+        # After:  seeeeeeeemm_m0_m mmmmmm_m1_mmmmmm
+        # IEEE:   seeeeeeeemm_m0_m mmmmmmm_m1_mmmmm
+        np.copyto(swapped[start:stop], pairs[start:stop, ::-1])
+        # The sign, exponent, and mantissa are now aligned with IEEE layout
+
+        # Locate any special values while the exponents are still those of the VAX
+        block = dst[start:stop]
+        mask = None
+        if special != 'ieee-compatible':
+            mask = _find_special(block.view('<u4'), 0x7f800000, special)
+
+        # Correct for the different biases of the exponent
+        np.divide(block, 4., out=block)
 
-def to_vax32_bytes(array):
+        if mask is not None:
+            _replace_special(block.view('<u4'), mask, special, 0x7fc00000)
+
+
+def _vax32_to_ieee_int(src, dst, special='ieee-compatible'):
+    """Convert VAX single-precision words to IEEE floats using integer operations.
+
+    The result is identical to that of `_vax32_to_ieee`, including the rounding of values
+    that become denormalized and the quieting of signaling NaNs.
+
+    Args:
+        src (np.ndarray): 1-D array of dtype "<u2" containing the VAX representation.
+        dst (np.ndarray): 1-D array of dtype "<f4" to receive the IEEE values. It may
+            share memory with `src`.
+        special (str, optional): The policy for reserved operands and dirty zeros.
+    """
+
+    if len(dst) < _INT_MIN_SIZE:
+        _vax32_to_ieee(src, dst, special)
+        return
+
+    words = src.view('<u4')
+    result = dst.view('<u4')
+    temp = np.empty(min(len(result), _BLOCK), dtype='<u4')
+
+    for start in range(0, len(result), _BLOCK):
+        stop = start + _BLOCK
+        vax = words[start:stop]
+        ieee = result[start:stop]
+        work = temp[:len(ieee)]
+
+        # Rotate each word by 16 bits to put the sign in the high bit (see
+        # _vax32_to_ieee); the right shift is done first in case ieee is vax.
+        np.right_shift(vax, 16, out=work)
+        np.left_shift(vax, 16, out=ieee)
+        np.bitwise_or(ieee, work, out=ieee)
+
+        # Exponents 0, 1, 2, and 255 need special handling; these are the ones that
+        # remain below 4 when incremented modulo 256. This includes all reserved
+        # operands and dirty zeros.
+        np.add(ieee, 0x00800000, out=work)
+        np.bitwise_and(work, 0x7f800000, out=work)
+        unusual = work < 0x02000000
+
+        # Dividing by 4 subtracts 2 from the exponent
+        np.subtract(ieee, 0x01000000, out=ieee)
+
+        if unusual.any():
+            indices = np.flatnonzero(unusual)
+            bits = ieee[indices] + 0x01000000
+            values = _f4_bits_divided_by_4(bits)
+            if special != 'ieee-compatible':
+                mask = _find_special(bits, 0x7f800000, special)
+                if mask is not None:
+                    _replace_special(values, mask, special, 0x7fc00000)
+            ieee[indices] = values
+
+
+def _f4_bits_divided_by_4(bits):
+    """IEEE float32 bits divided by 4, for exponents of 0, 1, 2, or 255.
+
+    This matches floating-point division with rounding to nearest even.
+    """
+
+    bits = bits.astype('i8')
+    sign = bits & 0x80000000
+    exponent = (bits >> 23) & 0xff
+    fraction = bits & 0x007fffff
+
+    # Infinities are unchanged; NaNs become quiet
+    result = np.where(fraction == 0, bits, bits | 0x00400000)
+
+    # Small values become denormals; shift the significand right by 3 minus the
+    # exponent, or by 2 for a denormal input, rounding to nearest even. A carry out of
+    # the fraction correctly produces the smallest normal value.
+    significand = np.where(exponent == 0, fraction, fraction | 0x00800000)
+    shift = np.clip(3 - exponent, 1, 2)
+    half = (1 << (shift - 1)) - 1 + ((significand >> shift) & 1)
+    rounded = (significand + half) >> shift
+    result = np.where(exponent == 0xff, result, sign | rounded)
+
+    return result.astype('<u4')
+
+
+def to_vax32_bytes(array, out=None, nthreads=None, engine=None, overflow='saturate'):
     """Return equivalent VAX representation for value(s) as bytes.
 
     Convert this number, array, or array-like into a byte string containing the binary
     representation of the equivalent VAX float32 or complex64 value(s).
 
     Args:
-        array (numpy array-like): The input data.
+        array (numpy array-like): The input data. Arrays of other numeric types or byte
+            orders, such as "<f8" values, are cast as they are converted, without a
+            full-size intermediate copy.
+        out (bytearray or memoryview or np.ndarray, optional):
+            A writable, contiguous buffer of exactly the required number of bytes. If
+            provided, the VAX representation is written into this buffer and it is
+            returned in place of a new bytes object.
+        nthreads (int, optional):
+            The number of threads over which to divide the conversion of a large array;
+            0 for one thread per CPU. If None, the default set by `set_nthreads` is used.
+        engine (str, optional):
+            "int" or "float", to select the conversion method; see `set_engine`. If
+            None, the default set by `set_engine` is used.
+        overflow (str, optional):
+            How to convert values outside the range of VAX single precision, i.e., with
+            magnitudes of 2**127 (about 1.7e38) or more. With "saturate", they become the
+            largest VAX value of the same sign, and NaNs become the VAX reserved operand.
+            With "raise", a ValueError is raised for any such value or NaN. With "wrap",
+            every magnitude of 2**126 or more becomes 2**126, and NaNs become other
+            values with the largest VAX exponent; for real values, this matches the bit
+            patterns of earlier versions of this module. (For complex values, earlier
+            versions could also spread an infinity or NaN in one part to the other.)
+            Except with "wrap", magnitudes below 2**-128 (about 2.9e-39), the smallest
+            VAX value, and negative zero become zero, as in `to_vax64`; "wrap" leaves
+            them as the dirty zeros and reserved operands of earlier versions.
 
     Returns:
         bytes: The VAX representation for the value(s).
+
+    Raises:
+        ValueError: If `out` is not a writable buffer of the correct size, or if
+            `overflow` is "raise" and a value is out of range.
     """
 
-    # Make array contiguous, with C index order, containing 4-byte IEEE floats
+    # Make an array containing 4-byte IEEE floats, in any memory layout
+    start = time.perf_counter() if _PROFILING else None
     dtype = '<c8' if np.iscomplexobj(array) else '<f4'
-    array = np.asarray(array, dtype=dtype, order='C')
-
-    # Conversion involves multiplication by 4 and then a pairwise byte swap
-    paired_view = (4. * np.atleast_1d(array)).view('u2')
-    paired_view = paired_view.reshape(-1, 2)
-    swapped = paired_view[:, ::-1].copy()
-
-    return swapped.tobytes()
-
+    original = array
+    (array, cast) = _ieee_input(array, dtype)
+    nbytes = array.size * np.dtype(dtype).itemsize
 
-def to_vax32(array):
+    if out is None:
+        result = np.empty(array.size, dtype=dtype)
+    else:
+        result = np.frombuffer(out, dtype='u1')
+        if result.size != nbytes or not result.flags.writeable:
+            raise ValueError('out must be a writable buffer of ' + str(nbytes) + ' bytes')
+
+    kernel = _ieee_to_vax32_int if _engine(engine) == 'int' else _ieee_to_vax32
+    _policy(overflow, _OVERFLOW_POLICIES, 'overflow')
+    if cast:
+        kernel = functools.partial(_cast_input, kernel, ('<f4', '<f4'))
+    _convert_nd(kernel, array, result.view(dtype).reshape(array.shape),
+                (_component(array.dtype), '<f4'), nthreads, overflow)
+
+    copies = 0
+    if out is None:
+        out = result.tobytes()
+        copies = 1
+
+    if start is not None:
+        (branch, made) = _input_branch(original, array, dtype)
+        _record('to_vax32_bytes', branch, array.nbytes, nbytes, copies + made, start)
+    return out
+
+
+def to_vax32(array, out=None, inplace=False, nthreads=None, engine=None,
+             overflow='saturate', order='C'):
     """Return equivalent VAX representation for value(s) as numpy array.
 
     Convert this number, array, or array-like into an array of VAX float32 or complex64
     values with the same shape.
 
     Args:
-        array (numpy array-like): The input data
+        array (numpy array-like): The input data. Arrays of other numeric types or byte
+            orders, such as "<f8" values, are cast as they are converted, without a
+            full-size intermediate copy.
+        out (np.ndarray, optional):
+            A writable, C-contiguous array with the dtype of the result ("<f4" or "<c8")
+            and the same number of elements. If provided, the VAX values are written into
+            this array and it is returned.
+        inplace (bool, optional):
+            True to overwrite the input with its VAX representation, so that no new array
+            is allocated. The input must be a writable, C-contiguous numpy array of dtype
+            "<f4" or "<c8"; it is returned.
+        nthreads (int, optional):
+            The number of threads over which to divide the conversion of a large array;
+            0 for one thread per CPU. If None, the default set by `set_nthreads` is used.
+        engine (str, optional):
+            "int" or "float", to select the conversion method; see `set_engine`. If
+            None, the default set by `set_engine` is used.
+        overflow (str, optional):
+            How to convert values outside the range of VAX single precision, i.e., with
+            magnitudes of 2**127 (about 1.7e38) or more. With "saturate", they become the
+            largest VAX value of the same sign, and NaNs become the VAX reserved operand.
+            With "raise", a ValueError is raised for any such value or NaN. With "wrap",
+            every magnitude of 2**126 or more becomes 2**126, and NaNs become other
+            values with the largest VAX exponent; for real values, this matches the bit
+            patterns of earlier versions of this module. (For complex values, earlier
+            versions could also spread an infinity or NaN in one part to the other.)
+            Except with "wrap", magnitudes below 2**-128 (about 2.9e-39), the smallest
+            VAX value, and negative zero become zero, as in `to_vax64`; "wrap" leaves
+            them as the dirty zeros and reserved operands of earlier versions.
+        order (str, optional):
+            The memory layout of a returned array: "C" for C order, "F" for Fortran
+            order, or "K" to follow the layout of the input array as closely as
+            possible. Input arrays of any layout, including strided views, are converted
+            without first being copied in full. Ignored if `out` or `inplace` is given.
 
     Returns:
         np.array: The VAX representation of the value(s) stored in a numpy array.
@@ -178,28 +1166,215 @@ def to_vax32(array):
 
             Note that this object will not be usable for arithmetic operations in its
             returned form.
+
+    Raises:
+        ValueError: If `out` or `inplace` cannot be honored, or if `overflow` is "raise"
+            and a value is out of range.
     """
 
-    # Make array contiguous, with C index order, containing 4-byte IEEE floats
+    # Make an array containing 4-byte IEEE floats, in any memory layout
+    start = time.perf_counter() if _PROFILING else None
     dtype = '<c8' if np.iscomplexobj(array) else '<f4'
     scalar = np.isscalar(array)
-    array = np.asarray(array, dtype=dtype, order='C')
+    original = array
+    kernel = _ieee_to_vax32_int if _engine(engine) == 'int' else _ieee_to_vax32
+    _policy(overflow, _OVERFLOW_POLICIES, 'overflow')
+    _order(order)
+
+    if inplace:
+        if out is not None:
+            raise ValueError('out and inplace cannot both be specified')
+        if not isinstance(array, np.ndarray) or array.dtype != np.dtype(dtype):
+            raise ValueError('inplace conversion requires an array of dtype "'
+                             + dtype + '"')
+        _check_writable(array)
+        result = array
+    else:
+        (array, cast) = _ieee_input(array, dtype)
+        if out is None:
+            result = _empty(array, array.shape, dtype, order)
+        else:
+            _flat_out(out, dtype, array.size)
+            result = out
 
-    # Construct array from converted buffer
-    buffer = to_vax32_bytes(array)
-    result = np.frombuffer(buffer, dtype=dtype).reshape(array.shape)
+    view = '<f4'
+    if not inplace and cast:
+        kernel = functools.partial(_cast_input, kernel, ('<f4', '<f4'))
+        view = _component(array.dtype)
+    _convert_nd(kernel, array, result.reshape(array.shape), (view, '<f4'), nthreads,
+                overflow)
 
-    if scalar:
+    if start is not None:
+        (branch, copies) = _input_branch(original, array, dtype)
+        _record('to_vax32', branch, array.nbytes, result.nbytes, copies, start)
+
+    if scalar and out is None:
         return result[()]
     else:
         return result
 
 
+def _ieee_to_vax32(src, dst, overflow='saturate'):
+    """Convert IEEE floats to VAX single-precision words, one block at a time.
+
+    Args:
+        src (np.ndarray): 1-D array of dtype "<f4" containing the IEEE values.
+        dst (np.ndarray): 1-D array of dtype "<f4" to receive the VAX representation. It
+            may share memory with `src`.
+        overflow (str, optional): The policy for values outside the VAX range.
+    """
+
+    src_bits = src.view('<u4')
+    dst_bits = dst.view('<u4')
+    swapped = dst.view('<u2').reshape(-1, 2)
+
+    for start in range(0, len(dst), _BLOCK):
+        stop = start + _BLOCK
+
+        # Magnitudes of 2**126 and above, which overflow when multiplied by 4, and those
+        # below 2**-128, which are VAX zeros, are converted separately unless the policy
+        # is "wrap". The subtraction wraps the small magnitudes around to the top.
+        indices = None
+        if overflow != 'wrap':
+            bits = src_bits[start:stop]
+            unusual = ((bits & 0x7fffffff) - 0x00200000) >= 0x7e600000
+            if unusual.any():
+                indices = np.flatnonzero(unusual)
+                values = _f4_bits_out_of_range(bits[indices], overflow)
+
+        # Conversion involves multiplication by 4 and then a pairwise byte swap
+        if indices is None:
+            np.multiply(src[start:stop], 4., out=dst[start:stop])
+        else:
+            with np.errstate(over='ignore', invalid='ignore'):
+                np.multiply(src[start:stop], 4., out=dst[start:stop])
+            dst_bits[start:stop][indices] = values
+
+        pairs = swapped[start:stop]
+        np.copyto(pairs, pairs[:, ::-1])
+
+
+def _ieee_to_vax32_int(src, dst, overflow='saturate'):
+    """Convert IEEE floats to VAX single-precision words using integer operations.
+
+    The result is identical to that of `_ieee_to_vax32` for every overflow policy,
+    including, with "wrap", overflow to infinity and the quieting of signaling NaNs.
+
+    Args:
+        src (np.ndarray): 1-D array of dtype "<f4" containing the IEEE values.
+        dst (np.ndarray): 1-D array of dtype "<f4" to receive the VAX representation. It
+            may share memory with `src`.
+        overflow (str, optional): The policy for values outside the VAX range.
+    """
+
+    if len(dst) < _INT_MIN_SIZE:
+        _ieee_to_vax32(src, dst, overflow)
+        return
+
+    words = src.view('<u4')
+    result = dst.view('<u4')
+    temp = np.empty(min(len(result), _BLOCK), dtype='<u4')
+
+    for start in range(0, len(result), _BLOCK):
+        stop = start + _BLOCK
+        ieee = words[start:stop]
+        vax = result[start:stop]
+        work = temp[:len(vax)]
+
+        # Exponents 0, 253, 254, and 255 need special handling; these are the ones that
+        # remain below 4 when incremented by 3 modulo 256.
+        np.add(ieee, 0x01800000, out=work)
+        np.bitwise_and(work, 0x7f800000, out=work)
+        unusual = work < 0x02000000
+
+        # Multiplying by 4 adds 2 to the exponent
+        np.add(ieee, 0x01000000, out=work)
+
+        if unusual.any():
+            indices = np.flatnonzero(unusual)
+            work[indices] = _f4_bits_times_4(ieee[indices], overflow)
+
+        # Rotate each word by 16 bits to put the sign in the second pair of bytes
+        np.right_shift(work, 16, out=vax)
+        np.left_shift(work, 16, out=work)
+        np.bitwise_or(vax, work, out=vax)
+
+
+def _f4_bits_times_4(bits, overflow):
+    """IEEE float32 bits multiplied by 4, for exponents of 0, 253, 254, or 255.
+
+    With the "wrap" overflow policy, this matches floating-point multiplication, which is
+    exact unless it overflows; otherwise, exponents above 252 and magnitudes below
+    2**-128 are handled by `_f4_bits_out_of_range`.
+    """
+
+    bits = bits.astype('i8')
+    sign = bits & 0x80000000
+    exponent = (bits >> 23) & 0xff
+    fraction = bits & 0x007fffff
+
+    # Infinities are unchanged; NaNs become quiet; large values overflow to infinity
+    result = np.where(fraction == 0, bits, bits | 0x00400000)
+    result = np.where(exponent == 0xff, result, sign | 0x7f800000)
+
+    # Denormals are scaled exactly. Up to 2**22, the fraction shifted left by 2 is the
+    # bit pattern of the result, even when it becomes normalized; above that, the
+    # exponent is 2 and the fraction must be shifted left by only 1.
+    scaled = np.where(fraction < 0x00400000, fraction << 2, 0x00800000 + (fraction << 1))
+    result = np.where(exponent == 0, sign | scaled, result)
+
+    if overflow != 'wrap':
+        result = np.where((exponent == 0) & (fraction >= 0x00200000), result,
+                          _f4_bits_out_of_range(bits, overflow))
+
+    return result.astype('<u4')
+
+
+def _f4_bits_out_of_range(bits, overflow):
+    """VAX bits for IEEE float32 bits with exponents of 253 or more, or with magnitudes
+    below 2**-128.
+
+    The VAX bits are returned in IEEE word order, i.e., before the 16-bit rotation.
+    Exponent 253 converts exactly to the largest VAX exponent, 255. Larger magnitudes and
+    infinities saturate to the largest VAX magnitude, and NaNs become the reserved
+    operand; with the "raise" policy, any of these raises ValueError instead. Magnitudes
+    below 2**-128, including negative zero, become a clean VAX zero, as in `to_vax64`,
+    rather than a dirty zero or the reserved operand.
+    """
+
+    bits = bits.astype('i8')
+    sign = bits & 0x80000000
+    magnitude = bits & 0x7fffffff
+
+    if overflow == 'raise' and np.any(magnitude >= 0x7f000000):
+        raise ValueError('value out of range for VAX single precision')
+
+    result = np.where(magnitude < 0x7f000000, bits + 0x01000000, sign | 0x7fffffff)
+    result = np.where(magnitude > 0x7f800000, 0x80000000, result)
+    result = np.where(magnitude < 0x00200000, 0, result)
+
+    return result.astype('<u4')
+
+
 ################################################################################
-# 64-bit support: read-only
+# 64-bit support
 ################################################################################
 
-def from_vax64(data):
+# Bit patterns used by the D-floating conversions, all as IEEE double magnitudes (sign
+# bit excluded). D-floating values are 2**(e-129) * 1.m for exponents e = 1 to 255,
+# whereas IEEE doubles are 2**(E-1023) * 1.m, so e = E - 0x37e.
+_D_BIAS = 0x37e << 52                       # exponent offset between the formats
+_D_MIN = 0x37f << 52                        # smallest D-floating magnitude (e = 1)
+_D_OVERFLOW = 0x47e << 52                   # first magnitude above the range (e = 256)
+_IEEE_INF = 0x7ff << 52                     # IEEE infinity; NaNs lie above this
+_D_MAX = 0x7fffffffffffffff                 # largest D-floating magnitude, MSB order
+_D_RESERVED = 0x8000000000000000            # VAX reserved operand, MSB order
+_D_ZERO = 1 << 55                           # D-floating magnitudes below this have e = 0
+
+
+def from_vax64(data, out=None, inplace=False, nthreads=None,
+               special='ieee-compatible', order='C', dtype=None, indices=None,
+               mask=None):
     """Return equivalent double-precision IEEE value for VAX representation.
 
     Given a byte string, array, or array-like (something that can be converted to a numpy
@@ -212,20 +1387,88 @@ def from_vax64(data):
 
             If the input is an array, the shape of that array is preserved except for the
             last axis, which may be modified to account for the new itemsize.
+        out (np.ndarray, optional):
+            A writable, C-contiguous array with the dtype of the result ("<f8" or "<c16")
+            and the same number of elements. If provided, the converted values are
+            written into this array and it is returned.
+        inplace (bool, optional):
+            True to overwrite the input buffer with the converted values, so that no new
+            array is allocated. The input must be a bytearray, a writable memoryview, or a
+            writable, C-contiguous numpy array. The returned value shares memory with the
+            input.
+        nthreads (int, optional):
+            The number of threads over which to divide the conversion of a large array;
+            0 for one thread per CPU. If None, the default set by `set_nthreads` is used.
+        special (str, optional):
+            How to convert VAX reserved operands (sign bit set and exponent zero) and
+            dirty zeros (exponent zero with a nonzero mantissa). With "ieee-compatible",
+            they are converted by the same rule as other values, becoming zero with the
+            sign of the input. With "zero" or "nan", they become zero or NaN. With
+            "raise", a ValueError is raised; because the check is made during the
+            conversion, an input being converted in place may already have been partly
+            overwritten.
+        order (str, optional):
+            The memory layout of a returned array: "C" for C order, "F" for Fortran
+            order, or "K" to follow the layout of the input array as closely as
+            possible. Input arrays of any layout, including strided views, are converted
+            without first being copied in full. Ignored if `out`, `inplace`, `indices`,
+            or `mask` is given.
+        dtype (np.dtype or str, optional):
+            The dtype of the result: "f4" or "f8" for real values, or "c8" or "c16" for
+            complex values, in either byte order. The values are written in this dtype
+            as they are converted, with no intermediate double-precision array. If None,
+            the result has dtype "<f8" or "<c16". Conversion to single precision rounds
+            to nearest; every D-floating magnitude is within its range, although the
+            smallest become denormal. Not available with `inplace`.
+        indices (array-like of int, optional):
+            Indices of the values to convert, counted in the result flattened in C
+            order, as for `np.take`; negative indices count from the end. Only the
+            selected values are read and converted, so the cost depends on their number
+            rather than on the size of the input, and pages of an `np.memmap` holding no
+            selected value are never read. The result has the shape of `indices`. Not
+            available with `inplace`.
+        mask (array-like of bool, optional):
+            A boolean array selecting the values to convert, with the shape of the
+            result or of its leading axes, as for indexing a numpy array with a mask.
+            The result holds the selected values in C order. Not available with
+            `inplace` or `indices`.
 
     Returns:
         np.array or np.float64 or np.complex128:
             The interpreted IEEE value. If the input array is complex, the returned array
-            will have dtype "<c16"; otherwise, it will have dtype "<f8".
+            will have dtype "<c16"; otherwise, it will have dtype "<f8"; or, in either
+            case, the dtype given by `dtype`.
+
+    Raises:
+        ValueError: If the input has an invalid size or data type, if `out`, `inplace`,
+            or `dtype` cannot be honored, if `indices` or `mask` is invalid, or if
+            `special` is "raise" and the data contains a reserved operand or dirty zero.
+        IndexError: If an index is out of range.
     """
 
+    _policy(special, _SPECIAL_POLICIES, 'special')
+    _order(order)
+
+    start = time.perf_counter() if _PROFILING else None
+    copies = 0                          # complete copies made, for the statistics
+
     # Convert a string to bytes; also handle a Python 2 buffer
     if _PYTHON2:
         if isinstance(data, (str, buffer)):     # pragma: no cover  # noqa: F821
             data = bytes(data)
+            copies = 1
     else:
         if isinstance(data, str):
             data = bytes(data, encoding='latin8')
+            copies = 1
+
+    gathered = indices is not None or mask is not None
+    if inplace:
+        if out is not None:
+            raise ValueError('out and inplace cannot both be specified')
+        if gathered:
+            raise ValueError('indices and mask cannot be used with inplace')
+        _check_writable(data)
 
     # Convert the object to a NumPy array
     if isinstance(data, (bytes, bytearray, memoryview)):
@@ -234,14 +1477,15 @@ def from_vax64(data):
             raise ValueError('data size is not a multiple of 8 bytes')
 
         array = np.frombuffer(data)
+        branch = 'bytes'
         scalar = (nbytes == 8)          # True to convert to scalar at the end
         shapeless = False
         newshape = (nbytes // 8,)       # array shape after conversion
-        dtype = '<f8'
+        natural = '<f8'
 
     else:
         scalar = np.isscalar(data)      # True to return a scalar
-        array = np.asarray(data, order='C')
+        array = np.asarray(data)
         shapeless = array.shape == ()   # True to convert back to shape ()
 
         array = np.atleast_1d(array)    # needed for the view to work below
@@ -252,10 +1496,19 @@ def from_vax64(data):
                                     'i1', 'i2', 'i4', 'i8'}:
             raise ValueError('invalid data type for 8-byte array input: '
                              + str(array.dtype))
-        dtype = '<c16' if key[0] == 'c' else '<f8'
+        natural = '<c16' if key[0] == 'c' else '<f8'
+        if not isinstance(data, np.ndarray):
+            branch = 'array-like'
+            copies += array.flags.owndata
+        else:
+            branch = 'array' if array.itemsize >= 8 else 'small-int array'
 
-        # Determine array shape after conversion
+        # Determine array shape after conversion. Values made up of several elements
+        # must be contiguous; other arrays are converted in their own layout.
         if array.itemsize <= 4:
+            contiguous = np.ascontiguousarray(array)
+            copies += contiguous is not array
+            array = contiguous
             if (array.shape[-1] * array.itemsize) % 8 != 0:
                 raise ValueError('last axis size is not a multiple of 8 bytes')
 
@@ -268,9 +1521,67 @@ def from_vax64(data):
         else:
             newshape = array.shape
 
-    itemsize = 16 if dtype == '<c16' else 8
+    # Gather only the selected values; the gathered copy is then converted in place
+    if gathered:
+        selected = _select(array, natural, newshape, indices, mask)
+        array = np.atleast_1d(selected)
+        newshape = array.shape
+        scalar = selected.ndim == 0
+        shapeless = False
+
+    itemsize = 16 if natural == '<c16' else 8
+    size = array.nbytes // itemsize
+
+    # Cast the results block by block if another dtype is requested
+    kernel = _vax64_to_ieee
+    view = '<i8'
+    target = _result_dtype(dtype, natural)
+    if target != np.dtype(natural):
+        if inplace:
+            raise ValueError('dtype cannot be changed by an inplace conversion')
+        kernel = functools.partial(_cast_output, kernel, ('<f8', '<i8'))
+        view = _component(target)
+
+    if inplace or (gathered and out is None and target == np.dtype(natural)):
+        ieee = array.reshape(-1).view(natural)
+    elif out is not None:
+        ieee = _flat_out(out, target.str, size)
+    elif array.itemsize == itemsize:
+        ieee = _empty(array, newshape, target, order)
+    else:
+        ieee = np.empty(size, dtype=target)
 
     # Convert...
+    if array.itemsize == itemsize:
+        _convert_nd(kernel, array, ieee.reshape(array.shape), ('u1', view), nthreads,
+                    special)
+    else:
+        _convert(kernel, array.reshape(-1).view('u1'), ieee.view(view), nthreads,
+                 special)
+
+    if out is not None:
+        result = out
+    elif scalar:
+        result = ieee[0]
+    elif shapeless:
+        result = ieee.reshape(())
+    else:
+        result = ieee.reshape(newshape)
+
+    if start is not None:
+        _record('from_vax64', branch, array.nbytes, ieee.nbytes, copies, start)
+    return result
+
+
+def _vax64_to_ieee(src, dst, special='ieee-compatible'):
+    """Convert VAX double-precision words to IEEE doubles, one block at a time.
+
+    Args:
+        src (np.ndarray): 1-D array of dtype "u1" containing the VAX representation.
+        dst (np.ndarray): 1-D array of dtype "<i8" to receive the bits of the IEEE
+            values. It may share memory with `src`.
+        special (str, optional): The policy for reserved operands and dirty zeros.
+    """
 
     #             |31              |15            |1
     # D-floating: mmmmmm_m1_mmmmmm seeeeeeeemm_m0_m
@@ -278,33 +1589,280 @@ def from_vax64(data):
     # IEEE:       seeeeeeeeeee_m0_ mmmmmmm_m1_mmmmm
     #             mmmmmm_m2_mmmmmm mmmmmmm_m3_mmmmm
 
-    # Pairwise swap puts bytes in standard MSB order, with the sign in the byte
-    # having the lowest memory address
-    pairs = array.view(dtype='uint8')
-    pairs = pairs.reshape(-1, 2)
-    swapped = pairs[:, ::-1].copy()
-    # Now we can treat each value as an 8-byte item in MSB order
-
-    # IEEE has three extra bits of exponent, so we need to shift these values to
-    # align the fields properly
-    vals = swapped.reshape(-1, 8).view('>i8')
-    vals = (vals + 4) >> 3  # add 4 first so rounding is not always toward zero
-    # Sign, exponent, and mantissa are now positioned properly. However, the
-    # exponents are wrong.
-
-    # Correct the exponent's biases
-    mask = (vals >= 0)
-    vals[ mask] += 0x37e0000000000000  # noqa: E201
-    vals[~mask] -= 0x3820000000000000
-
-    vals = vals.reshape(-1, itemsize//8)
-    ieee = vals.view(dtype)
-
-    if scalar:
-        return ieee[0, 0]                # current shape is (1,1)
-    elif shapeless:
-        return ieee.reshape(())
+    words = src.view('<u2').reshape(-1, 4)
+    result = dst.view('<u8')
+    temp = np.empty(min(len(result), _BLOCK), dtype='<u8')
+    zeros = np.empty(len(temp), dtype='bool')
+
+    for start in range(0, len(result), _BLOCK):
+        stop = start + _BLOCK
+        ieee = result[start:stop]
+        vax = temp[:len(ieee)]
+        zero = zeros[:len(ieee)]
+
+        # Reverse the order of the four 16-bit words, so that each value becomes a native
+        # 64-bit integer with the sign in the high bit. The words are copied into a
+        # temporary array, which is safe when dst shares memory with src.
+        vax_words = vax.view('<u2').reshape(-1, 4)
+        for k in range(4):
+            np.copyto(vax_words[:, 3-k], words[start:stop, k])
+
+        # Work on the magnitude; an exponent of zero is a VAX zero
+        np.bitwise_and(vax, 0x7fffffffffffffff, out=ieee)
+        np.less(ieee, _D_ZERO, out=zero)
+
+        # IEEE has three extra bits of exponent, so shift right by three, rounding to
+        # nearest by adding back the last bit shifted out, and rebias the exponent. With
+        # the bias folded into the addition, this is ((mag >> 2) + 1 + 2 * bias) >> 1,
+        # which cannot overflow an unsigned integer.
+        np.right_shift(ieee, 2, out=ieee)
+        np.add(ieee, 1 + 2 * _D_BIAS, out=ieee)
+        np.right_shift(ieee, 1, out=ieee)
+        np.copyto(ieee, 0, where=zero)
+
+        # Locate any special values before the sign is isolated
+        mask = None
+        if special != 'ieee-compatible':
+            mask = _find_special(vax, 0x7f80000000000000, special)
+
+        # Restore the sign
+        np.bitwise_and(vax, 0x8000000000000000, out=vax)
+        np.bitwise_or(ieee, vax, out=ieee)
+
+        if mask is not None:
+            _replace_special(ieee, mask, special, 0x7ff8000000000000)
+
+
+def to_vax64_bytes(array, out=None, nthreads=None):
+    """Return equivalent VAX D-floating representation for value(s) as bytes.
+
+    Convert this number, array, or array-like into a byte string containing the binary
+    representation of the equivalent VAX float64 or complex128 value(s).
+
+    Args:
+        array (numpy array-like): The input data. Arrays of other numeric types or byte
+            orders, such as "<f4" values, are cast as they are converted, without a
+            full-size intermediate copy.
+        out (bytearray or memoryview or np.ndarray, optional):
+            A writable, contiguous buffer of exactly the required number of bytes. If
+            provided, the VAX representation is written into this buffer and it is
+            returned in place of a new bytes object.
+        nthreads (int, optional):
+            The number of threads over which to divide the conversion of a large array;
+            0 for one thread per CPU. If None, the default set by `set_nthreads` is used.
+
+    Returns:
+        bytes: The VAX representation for the value(s).
+
+    Raises:
+        ValueError: If `out` is not a writable buffer of the correct size.
+
+    Notes:
+        Values too large in magnitude for D-floating, including infinities, saturate to
+        the largest D-floating value of the same sign. Values too small in magnitude
+        become zero. NaNs become the VAX reserved operand (sign bit set, exponent zero).
+    """
+
+    # Make an array containing 8-byte IEEE floats, in any memory layout
+    start = time.perf_counter() if _PROFILING else None
+    dtype = '<c16' if np.iscomplexobj(array) else '<f8'
+    original = array
+    (array, cast) = _ieee_input(array, dtype)
+    nbytes = array.size * np.dtype(dtype).itemsize
+
+    if out is None:
+        result = np.empty(array.size, dtype=dtype)
+    else:
+        result = np.frombuffer(out, dtype='u1')
+        if result.size != nbytes or not result.flags.writeable:
+            raise ValueError('out must be a writable buffer of ' + str(nbytes) + ' bytes')
+
+    kernel = _ieee_to_vax64
+    view = '<u8'
+    if cast:
+        kernel = functools.partial(_cast_input, kernel, ('<f8', '<u8'))
+        view = _component(array.dtype)
+    _convert_nd(kernel, array, result.view(dtype).reshape(array.shape), (view, '<u8'),
+                nthreads)
+
+    copies = 0
+    if out is None:
+        out = result.tobytes()
+        copies = 1
+
+    if start is not None:
+        (branch, made) = _input_branch(original, array, dtype)
+        _record('to_vax64_bytes', branch, array.nbytes, nbytes, copies + made, start)
+    return out
+
+
+def to_vax64(array, out=None, inplace=False, nthreads=None, order='C'):
+    """Return equivalent VAX D-floating representation for value(s) as numpy array.
+
+    Convert this number, array, or array-like into an array of VAX float64 or complex128
+    values with the same shape.
+
+    Args:
+        array (numpy array-like): The input data. Arrays of other numeric types or byte
+            orders, such as "<f4" values, are cast as they are converted, without a
+            full-size intermediate copy.
+        out (np.ndarray, optional):
+            A writable, C-contiguous array with the dtype of the result ("<f8" or "<c16")
+            and the same number of elements. If provided, the VAX values are written into
+            this array and it is returned.
+        inplace (bool, optional):
+            True to overwrite the input with its VAX representation, so that no new array
+            is allocated. The input must be a writable, C-contiguous numpy array of dtype
+            "<f8" or "<c16"; it is returned.
+        nthreads (int, optional):
+            The number of threads over which to divide the conversion of a large array;
+            0 for one thread per CPU. If None, the default set by `set_nthreads` is used.
+        order (str, optional):
+            The memory layout of a returned array: "C" for C order, "F" for Fortran
+            order, or "K" to follow the layout of the input array as closely as
+            possible. Input arrays of any layout, including strided views, are converted
+            without first being copied in full. Ignored if `out` or `inplace` is given.
+
+    Returns:
+        np.array: The VAX representation of the value(s) stored in a numpy array.
+
+            If the input is a scalar, the returned object is an array of shape ().
+
+            If the input is complex, the returned array will be of dtype "<c16";
+            otherwise, it will be of dtype "<f8".
+
+            Note that this object will not be usable for arithmetic operations in its
+            returned form.
+
+    Raises:
+        ValueError: If `out` or `inplace` cannot be honored.
+
+    Notes:
+        Values too large in magnitude for D-floating, including infinities, saturate to
+        the largest D-floating value of the same sign. Values too small in magnitude
+        become zero. NaNs become the VAX reserved operand (sign bit set, exponent zero).
+    """
+
+    # Make an array containing 8-byte IEEE floats, in any memory layout
+    start = time.perf_counter() if _PROFILING else None
+    dtype = '<c16' if np.iscomplexobj(array) else '<f8'
+    scalar = np.isscalar(array)
+    original = array
+    _order(order)
+
+    if inplace:
+        if out is not None:
+            raise ValueError('out and inplace cannot both be specified')
+        if not isinstance(array, np.ndarray) or array.dtype != np.dtype(dtype):
+            raise ValueError('inplace conversion requires an array of dtype "'
+                             + dtype + '"')
+        _check_writable(array)
+        result = array
+    else:
+        (array, cast) = _ieee_input(array, dtype)
+        if out is None:
+            result = _empty(array, array.shape, dtype, order)
+        else:
+            _flat_out(out, dtype, array.size)
+            result = out
+
+    kernel = _ieee_to_vax64
+    view = '<u8'
+    if not inplace and cast:
+        kernel = functools.partial(_cast_input, kernel, ('<f8', '<u8'))
+        view = _component(array.dtype)
+    _convert_nd(kernel, array, result.reshape(array.shape), (view, '<u8'), nthreads)
+
+    if start is not None:
+        (branch, copies) = _input_branch(original, array, dtype)
+        _record('to_vax64', branch, array.nbytes, result.nbytes, copies, start)
+
+    if scalar and out is None:
+        return result[()]
     else:
-        return ieee.reshape(newshape)
+        return result
+
+
+def _ieee_to_vax64(src, dst):
+    """Convert IEEE doubles to VAX D-floating words, one block at a time.
+
+    Args:
+        src (np.ndarray): 1-D array of dtype "<u8" containing the bits of IEEE values.
+        dst (np.ndarray): 1-D array of dtype "<u8" to receive the VAX representation. It
+            may share memory with `src`.
+    """
+
+    #             |31              |15            |1
+    # IEEE:       seeeeeeeeeee_m0_ mmmmmmm_m1_mmmmm
+    #             mmmmmm_m2_mmmmmm mmmmmmm_m3_mmmmm
+    # D-floating: mmmmmm_m1_mmmmmm seeeeeeeemm_m0_m
+    #             mmmmmm_m3_mmmmmm mmmmmm_m2_mmmmmm
+
+    dst_words = dst.view('<u2').reshape(-1, 4)
+
+    for start in range(0, len(dst), _BLOCK):
+        stop = start + _BLOCK
+        bits = src[start:stop]
+        mag = bits & 0x7fffffffffffffff
+        sign = bits ^ mag
+
+        # Rebias the exponent, then shift left so that the eight-bit exponent sits just
+        # below the sign bit. D-floating has three more mantissa bits than IEEE, so this
+        # shift is exact and no rounding is needed.
+        vals = ((mag - _D_BIAS) << 3) | sign
+
+        # Handle magnitudes outside the D-floating range
+        np.putmask(vals, mag < _D_MIN, 0)
+        np.putmask(vals, mag >= _D_OVERFLOW, sign | _D_MAX)
+        np.putmask(vals, mag > _IEEE_INF, _D_RESERVED)
+
+        # Values are now in MSB order; the VAX stores the four 16-bit words in reverse
+        np.copyto(dst_words[start:stop], vals.view('<u2').reshape(-1, 4)[:, ::-1])
+
+
+################################################################################
+# Interfaces built on the converters above
+################################################################################
+
+# Kinds of VAX data accepted by the file-based interfaces:
+#   kind -> (numpy dtype of both the raw and the converted values, converter)
+_KINDS = {'f4': ('<f4', from_vax32),
+          'c8': ('<c8', from_vax32),
+          'd8': ('<f8', from_vax64),
+          'dc16': ('<c16', from_vax64)}
+
+# NumPy dtypes that mark arrays and record fields as holding VAX data. Each is a void
+# type with the itemsize of the raw values, so that numpy refuses to cast the raw bits
+# to numbers or do arithmetic on them, and records the kind in its metadata, which numpy
+# keeps through views, slices, copies, np.fromfile, np.memmap, and structured dtypes.
+F4 = np.dtype('V4', metadata={'vax': 'f4'})
+C8 = np.dtype('V8', metadata={'vax': 'c8'})
+D8 = np.dtype('V8', metadata={'vax': 'd8'})
+DC16 = np.dtype('V16', metadata={'vax': 'dc16'})
+
+
+def _vax_kind(dtype):
+    """The kind of VAX data marked by this dtype, or None if it is not a VAX dtype."""
+
+    base = np.dtype(dtype).base
+    kind = base.metadata.get('vax') if base.metadata else None
+    if kind not in _KINDS or base.itemsize != np.dtype(_KINDS[kind][0]).itemsize:
+        return None
+    return kind
+
+
+from vax._stream import (iter_from_vax32, iter_from_vax64,  # noqa: E402
+                         aiter_from_vax32, aiter_from_vax64, VaxWriter)
+from vax._array import VaxArray                             # noqa: E402
+from vax._table import (from_vax_records, read_table,      # noqa: E402
+                        table_params)
+from vax._scan import scan_vax32, scan_vax64                # noqa: E402
+from vax._dtypes import from_vax, to_vax                    # noqa: E402
+from vax._scalar import (vax32_to_float, vax64_to_float,    # noqa: E402
+                         float_to_vax32, float_to_vax64)
+from vax._batch import (from_vax32_many, from_vax64_many,   # noqa: E402
+                        to_vax32_many)
+from vax._cache import (cached_from_vax32,                  # noqa: E402
+                        cached_from_vax64, set_cache, get_cache, clear_cache)
 
 ################################################################################
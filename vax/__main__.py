@@ -0,0 +1,357 @@
+################################################################################
+# vax/__main__.py
+################################################################################
+"""Command-line interface for batch conversion of VAX-format files.
+
+Usage:
+    python -m vax convert [options] FILE_OR_GLOB ...
+
+Each input file is converted to IEEE format and written as a ".npy" file or as raw
+little-endian IEEE values. Files are distributed across a pool of worker processes.
+Outputs are written under a temporary name and renamed when complete, so an interrupted
+run can be resumed; existing complete outputs are skipped unless --overwrite is given.
+"""
+
+import argparse
+import glob
+import numpy as np
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import vax
+from vax import _KINDS
+from vax._table import _is_padding, _parse_spec
+
+_SUFFIXES = {'npy': '.npy', 'raw': '.ieee'}
+
+
+def main(argv=None):
+    """Run the command-line interface.
+
+    Args:
+        argv (list, optional): The command-line arguments, excluding the program name.
+            If None, sys.argv is used.
+
+    Returns:
+        int: The exit status: 0 if every file was converted or skipped, 1 if any
+            conversion failed, 2 if there were no input files or two inputs would be
+            written to the same output file.
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m vax',
+                                     description='Convert VAX-format binary files.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    convert = subparsers.add_parser(
+        'convert', help='convert VAX-format files to IEEE format',
+        description='Convert VAX-format files to IEEE .npy or raw files. By default, '
+                    'each whole file (after OFFSET bytes) is treated as an array of '
+                    'values of the given KIND; with --fields, it is treated as a table '
+                    'of fixed-length records.')
+    convert.add_argument('inputs', nargs='*', metavar='FILE_OR_GLOB',
+                         help='input files or glob patterns ("**" is recursive)')
+    convert.add_argument('--file-list', metavar='PATH',
+                         help='file containing input paths, one per line; "-" for stdin')
+    convert.add_argument('--kind', choices=sorted(_KINDS), default='f4',
+                         help='type of the VAX values (default f4)')
+    convert.add_argument('--offset', type=int, default=0, metavar='BYTES',
+                         help='byte offset of the data in each file (default 0)')
+    convert.add_argument('--count', type=int, default=None, metavar='N',
+                         help='number of values or records to convert (default: all '
+                              'through the end of the file)')
+    convert.add_argument('--fields', metavar='SPEC',
+                         help='record layout as comma-separated NAME:FORMAT[:SHAPE] '
+                              'items, e.g. "LINE:vax_f4,SAMP:vax_f4,ID:<i4,:V4"; '
+                              'FORMAT is vax_f4, vax_c8, vax_d8, vax_dc16, or a numpy '
+                              'dtype, and SHAPE is an "x"-separated list of integers')
+    convert.add_argument('--record-bytes', type=int, metavar='BYTES',
+                         help='record length, if longer than the fields given')
+    convert.add_argument('--format', choices=sorted(_SUFFIXES), default='npy',
+                         help='output format (default npy)')
+    convert.add_argument('--output-dir', metavar='DIR',
+                         help='directory for output files (default: beside each input)')
+    convert.add_argument('--jobs', '-j', type=int, default=0, metavar='N',
+                         help='number of worker processes (default: one per CPU)')
+    convert.add_argument('--overwrite', action='store_true',
+                         help='convert files even if a complete output exists')
+    convert.add_argument('--quiet', '-q', action='store_true',
+                         help='report only the summary and any errors')
+
+    args = parser.parse_args(argv)
+
+    if args.record_bytes is not None and not args.fields:
+        parser.error('--record-bytes requires --fields')
+
+    spec = None
+    if args.fields:
+        try:
+            spec = _parse_fields(args.fields, args.record_bytes)
+        except ValueError as e:
+            parser.error(str(e))
+
+    paths = _expand_inputs(args.inputs, args.file_list)
+    if not paths:
+        print('no input files', file=sys.stderr)
+        return 2
+
+    # Outputs under --output-dir keep their paths relative to the inputs' common
+    # directory, so that inputs with the same name in different directories never
+    # share an output file
+    base = _common_dir(paths) if args.output_dir else None
+    tasks = []
+    sources = {}
+    for path in paths:
+        dest = _output_path(path, args.output_dir, _SUFFIXES[args.format], base)
+        key = os.path.normcase(os.path.abspath(dest))
+        if key in sources:
+            print(sources[key] + ' and ' + path + ' would both be written to ' + dest,
+                  file=sys.stderr)
+            return 2
+        sources[key] = path
+        tasks.append((path, dest, args.kind, args.offset, args.count, spec, args.format,
+                      args.overwrite))
+
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    jobs = min(jobs, len(tasks))
+
+    start = time.perf_counter()
+    if jobs == 1:
+        results = map(_run_task, tasks)
+        return _report(results, start, args.quiet)
+
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        results = executor.map(_run_task, tasks)
+        return _report(results, start, args.quiet)
+
+
+def _report(results, start, quiet):
+    """Print the outcome of each conversion and a summary; return the exit status."""
+
+    converted = skipped = failed = 0
+    total_bytes = 0
+    for (path, dest, status, nbytes, message) in results:
+        if status == 'converted':
+            converted += 1
+            total_bytes += nbytes
+            if not quiet:
+                print(path + ' -> ' + dest)
+        elif status == 'skipped':
+            skipped += 1
+            if not quiet:
+                print(path + ': skipped; ' + dest + ' is complete')
+        else:
+            failed += 1
+            print(path + ': ' + message, file=sys.stderr)
+
+    elapsed = max(time.perf_counter() - start, 1.e-9)
+    print('%d converted, %d skipped, %d failed in %.2f s; %.1f MB/s, %.1f files/s'
+          % (converted, skipped, failed, elapsed, total_bytes / elapsed / 1.e6,
+             converted / elapsed))
+
+    return 1 if failed else 0
+
+
+def _run_task(task):
+    """Convert one file in a worker; return (path, dest, status, nbytes, message)."""
+
+    (path, dest, kind, offset, count, spec, fmt, overwrite) = task
+    try:
+        layout = _layout(path, kind, offset, count, spec)
+        if not overwrite and _is_complete(dest, fmt, layout):
+            return (path, dest, 'skipped', 0, '')
+
+        nbytes = _convert_file(path, dest, fmt, layout)
+        return (path, dest, 'converted', nbytes, '')
+
+    except Exception as e:
+        return (path, dest, 'failed', 0, type(e).__name__ + ': ' + str(e))
+
+
+def _layout(path, kind, offset, count, spec):
+    """Determine the dtype, shape, and location of the data to convert in a file.
+
+    Returns:
+        tuple: (kind, spec, dtype, count, offset), where dtype is the numpy dtype of the
+            output (a structured dtype for records), and count is the number of values or
+            records.
+    """
+
+    if spec is None:
+        dtype = np.dtype(_KINDS[kind][0])
+        raw_itemsize = dtype.itemsize
+    else:
+        raw_dtype, _ = _parse_spec(spec)
+        raw_itemsize = raw_dtype.itemsize
+        dtype = np.dtype([(name, raw_dtype.fields[name][0]) for name in raw_dtype.names
+                          if not _is_padding(raw_dtype.fields[name][0])])
+
+    available = os.path.getsize(path) - offset
+    if count is None:
+        if available < 0 or available % raw_itemsize != 0:
+            raise ValueError('data size after offset is not a multiple of '
+                             + str(raw_itemsize) + ' bytes')
+        count = available // raw_itemsize
+    elif count * raw_itemsize > available:
+        raise ValueError('file is too short for ' + str(count) + ' items')
+
+    return (kind, spec, dtype, count, offset)
+
+
+def _convert_file(path, dest, fmt, layout):
+    """Convert one file, writing the output atomically; return the bytes converted."""
+
+    (kind, spec, dtype, count, offset) = layout
+    partial = dest + '.part'
+    os.makedirs(os.path.dirname(dest) or os.curdir, exist_ok=True)
+
+    try:
+        if fmt == 'npy':
+            output = np.lib.format.open_memmap(partial, mode='w+', dtype=dtype,
+                                               shape=(count,))
+        else:
+            output = np.memmap(partial, mode='w+', dtype=dtype, shape=(count,)) \
+                if count else None
+
+        if spec is not None:
+            records = np.memmap(path, dtype='u1', mode='r')
+            nbytes = count * _parse_spec(spec)[0].itemsize
+            if count:
+                output[...] = vax.from_vax_records(records, spec, offset=offset,
+                                                   count=count)
+            del records
+        else:
+            nbytes = count * dtype.itemsize
+            stream = (vax.iter_from_vax32 if kind in ('f4', 'c8')
+                      else vax.iter_from_vax64)
+            filled = 0
+            for block in stream(path, offset=offset, count=count, kind=kind):
+                output[filled:filled + len(block)] = block
+                filled += len(block)
+
+        if output is not None:
+            output.flush()
+            del output
+        else:
+            open(partial, 'wb').close()
+
+        os.replace(partial, dest)
+
+    except BaseException:
+        if os.path.exists(partial):
+            os.remove(partial)
+        raise
+
+    return nbytes
+
+
+def _is_complete(dest, fmt, layout):
+    """True if the output file exists and has the expected type and size."""
+
+    (kind, spec, dtype, count, offset) = layout
+    if not os.path.exists(dest):
+        return False
+
+    if fmt == 'raw':
+        return os.path.getsize(dest) == count * dtype.itemsize
+
+    try:
+        with open(dest, 'rb') as f:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                header = np.lib.format.read_array_header_1_0(f)
+            else:
+                header = np.lib.format.read_array_header_2_0(f)
+            data_offset = f.tell()
+    except (ValueError, OSError):
+        return False
+
+    (shape, _, file_dtype) = header
+    return (shape == (count,) and file_dtype == dtype
+            and os.path.getsize(dest) == data_offset + count * dtype.itemsize)
+
+
+def _parse_fields(text, record_bytes=None):
+    """Parse a --fields specification into a list of fields for from_vax_records."""
+
+    spec = []
+    for k, item in enumerate(text.split(',')):
+        parts = item.strip().split(':')
+        if len(parts) not in (2, 3) or not parts[1]:
+            raise ValueError('invalid field specification: ' + repr(item))
+
+        name = parts[0] or ('_pad%d' % k)
+        field = (name, parts[1])
+        if len(parts) == 3:
+            try:
+                field += (tuple(int(n) for n in parts[2].split('x')),)
+            except ValueError:
+                raise ValueError('invalid field shape: ' + repr(item))
+        spec.append(field)
+
+    itemsize = _parse_spec(spec)[0].itemsize
+    if record_bytes is not None:
+        if record_bytes < itemsize:
+            raise ValueError('--record-bytes is smaller than the fields ('
+                             + str(itemsize) + ' bytes)')
+        if record_bytes > itemsize:
+            spec.append(('_pad', 'V' + str(record_bytes - itemsize)))
+
+    return spec
+
+
+def _expand_inputs(patterns, file_list):
+    """Return the sorted, de-duplicated list of input files."""
+
+    names = list(patterns)
+    if file_list:
+        if file_list == '-':
+            names += [line.strip() for line in sys.stdin]
+        else:
+            with open(file_list) as f:
+                names += [line.strip() for line in f]
+
+    paths = []
+    for name in names:
+        if not name:
+            continue
+        if glob.has_magic(name):
+            paths += glob.glob(name, recursive=True)
+        else:
+            paths.append(name)
+
+    paths = [path for path in paths if not os.path.isdir(path)]
+    return sorted(set(paths))
+
+
+def _common_dir(paths):
+    """The deepest directory containing every input file, or None if there is none."""
+
+    try:
+        return os.path.commonpath([os.path.dirname(os.path.abspath(path))
+                                   for path in paths])
+    except ValueError:          # pragma: no cover; e.g., inputs on different drives
+        return None
+
+
+def _output_path(path, output_dir, suffix, base=None):
+    """Return the output path for an input file.
+
+    With an output directory, the output keeps the input's path relative to `base`, or
+    only its name if `base` is None.
+    """
+
+    root = os.path.splitext(path)[0] + suffix
+    if not output_dir:
+        return root
+    if base is None:
+        return os.path.join(output_dir, os.path.basename(root))
+    return os.path.join(output_dir, os.path.relpath(os.path.abspath(root), base))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
+
+################################################################################
@@ -0,0 +1,103 @@
+################################################################################
+# vax/_array.py
+################################################################################
+"""Lazy, memory-mapped access to VAX-format arrays stored in files."""
+
+import numpy as np
+import os
+
+from vax import _KINDS
+
+
+class VaxArray(object):
+    """A read-only array of VAX-format values in a file, decoded on access.
+
+    The file is memory-mapped, and indexing the object converts only the elements
+    selected, so reading a small window of a large image or cube touches only the
+    corresponding parts of the file. Any index accepted by a numpy array may be used; the
+    result is a numpy array of IEEE values (or a numpy scalar, for a single element).
+
+    The object also supports `np.asarray` and other numpy functions, which decode the
+    entire array.
+
+    Attributes:
+        path (str): The path to the file.
+        offset (int): The byte offset of the first value in the file.
+        kind (str): "f4", "c8", "d8", or "dc16"; see the constructor.
+        raw (np.memmap): The memory-mapped VAX values. Its dtype has the same itemsize as
+            the decoded values, but its contents are not usable for arithmetic.
+    """
+
+    def __init__(self, path, offset=0, shape=None, kind='f4'):
+        """Constructor for a VaxArray.
+
+        Args:
+            path (str or os.PathLike): The path to the file.
+            offset (int, optional): The byte offset of the first value in the file.
+            shape (int or tuple, optional): The shape of the array, in C index order. If
+                None, the array is 1-D and extends to the end of the file.
+            kind (str, optional): The type of the VAX values: "f4" for single precision
+                (F-floating), "c8" for single-precision complex, "d8" for double
+                precision (D-floating), or "dc16" for double-precision complex.
+
+        Raises:
+            ValueError: If the kind is invalid or the file is too small for the shape.
+        """
+
+        if kind not in _KINDS:
+            raise ValueError('invalid kind for VAX data: ' + repr(kind))
+
+        dtype, self._converter = _KINDS[kind]
+        self.path = os.fspath(path)
+        self.offset = offset
+        self.kind = kind
+
+        if shape is None:
+            itemsize = np.dtype(dtype).itemsize
+            shape = ((os.path.getsize(self.path) - offset) // itemsize,)
+
+        self.raw = np.memmap(self.path, dtype=dtype, mode='r', offset=offset,
+                             shape=shape)
+
+    @property
+    def shape(self):
+        """The shape of the array."""
+        return self.raw.shape
+
+    @property
+    def dtype(self):
+        """The dtype of the decoded IEEE values."""
+        return self.raw.dtype
+
+    @property
+    def ndim(self):
+        """The number of dimensions of the array."""
+        return self.raw.ndim
+
+    @property
+    def size(self):
+        """The number of elements in the array."""
+        return self.raw.size
+
+    def __len__(self):
+        return len(self.raw)
+
+    def __getitem__(self, index):
+        return self._converter(self.raw[index])
+
+    def __array__(self, dtype=None, copy=None):
+        if copy is False:
+            raise ValueError('VaxArray cannot be converted to an array without '
+                             'decoding a copy')
+
+        array = np.atleast_1d(self._converter(self.raw[...]))
+        array = array.reshape(self.shape)
+        if dtype is not None:
+            array = array.astype(dtype, copy=False)
+        return array
+
+    def __repr__(self):
+        return ('VaxArray(' + repr(self.path) + ', offset=' + str(self.offset)
+                + ', shape=' + str(self.shape) + ', kind=' + repr(self.kind) + ')')
+
+################################################################################
@@ -0,0 +1,179 @@
+################################################################################
+# vax/_batch.py
+################################################################################
+"""Conversion of many small buffers or arrays in a single call."""
+
+import numpy as np
+
+from vax import from_vax32, from_vax64, to_vax32
+
+
+def from_vax32_many(buffers, flat=False, nthreads=None, engine=None,
+                    special='ieee-compatible'):
+    """Convert a sequence of buffers of VAX single-precision values in one pass.
+
+    Converting many small buffers, such as one per record or packet, with separate
+    calls to `from_vax32` is dominated by the fixed cost of each call. This function
+    gathers the buffers into one contiguous array, converts it with a single call, and
+    divides the result again.
+
+    Args:
+        buffers (iterable): The buffers, each a bytes, bytearray, memoryview, or other
+            object supporting the buffer protocol, containing a whole number of 4-byte
+            values.
+        flat (bool, optional): True to return one array of all the values, along with
+            the offset of each buffer's values within it; False to return a list of
+            arrays, one per buffer.
+        nthreads (int, optional):
+            The number of threads over which to divide the conversion of a large array;
+            0 for one thread per CPU. If None, the default set by `set_nthreads` is used.
+        engine (str, optional):
+            "int" or "float", to select the conversion method; see `set_engine`. If
+            None, the default set by `set_engine` is used.
+        special (str, optional):
+            How to convert VAX reserved operands and dirty zeros; see `from_vax32`.
+
+    Returns:
+        list or tuple: If `flat` is False, a list of 1-D arrays of dtype "<f4", one per
+            buffer. These are views of a single array, so they share its memory, and
+            no further copies are made. If `flat` is True, a tuple (values, offsets),
+            where values is a 1-D array of dtype "<f4" and offsets is an integer array
+            of one more element than there are buffers, such that the values of buffer
+            i are values[offsets[i]:offsets[i+1]].
+
+    Raises:
+        ValueError: If a buffer's size is not a multiple of 4 bytes, or as described for
+            `from_vax32`.
+    """
+
+    (data, offsets) = _gather(buffers, 4)
+    values = from_vax32(np.frombuffer(data, dtype='<f4'), inplace=True,
+                        nthreads=nthreads, engine=engine, special=special)
+    return _divide(values, offsets, flat)
+
+
+def from_vax64_many(buffers, flat=False, nthreads=None, special='ieee-compatible'):
+    """Convert a sequence of buffers of VAX double-precision values in one pass.
+
+    This is the double-precision (D-floating) counterpart of `from_vax32_many`.
+
+    Args:
+        buffers (iterable): The buffers, each a bytes, bytearray, memoryview, or other
+            object supporting the buffer protocol, containing a whole number of 8-byte
+            values.
+        flat (bool, optional): True to return one array of all the values, along with
+            the offset of each buffer's values within it; False to return a list of
+            arrays, one per buffer.
+        nthreads (int, optional):
+            The number of threads over which to divide the conversion of a large array;
+            0 for one thread per CPU. If None, the default set by `set_nthreads` is used.
+        special (str, optional):
+            How to convert VAX reserved operands and dirty zeros; see `from_vax64`.
+
+    Returns:
+        list or tuple: If `flat` is False, a list of 1-D arrays of dtype "<f8", one per
+            buffer, all views of a single array. If `flat` is True, a tuple (values,
+            offsets), as described for `from_vax32_many`.
+
+    Raises:
+        ValueError: If a buffer's size is not a multiple of 8 bytes, or as described for
+            `from_vax64`.
+    """
+
+    (data, offsets) = _gather(buffers, 8)
+    values = from_vax64(np.frombuffer(data, dtype='<f8'), inplace=True,
+                        nthreads=nthreads, special=special)
+    return _divide(values, offsets, flat)
+
+
+def to_vax32_many(arrays, flat=False, nthreads=None, engine=None, overflow='saturate'):
+    """Convert a sequence of small arrays to VAX single precision in one pass.
+
+    This is the counterpart of `from_vax32_many`, converting many arrays with a single
+    call to `to_vax32`.
+
+    Args:
+        arrays (iterable): The real values to convert, as arrays, array-likes, or
+            scalars. Each is flattened and cast to "<f4".
+        flat (bool, optional): True to return one array of all the VAX values, along
+            with the offset of each input's values within it; False to return a list of
+            arrays, one per input.
+        nthreads (int, optional):
+            The number of threads over which to divide the conversion of a large array;
+            0 for one thread per CPU. If None, the default set by `set_nthreads` is used.
+        engine (str, optional):
+            "int" or "float", to select the conversion method; see `set_engine`. If
+            None, the default set by `set_engine` is used.
+        overflow (str, optional):
+            How to convert values outside the range of VAX single precision; see
+            `to_vax32`.
+
+    Returns:
+        list or tuple: If `flat` is False, a list of 1-D arrays of dtype "<f4"
+            containing the VAX representation of each input, all views of a single
+            array; `tobytes` gives the bytes of each. If `flat` is True, a tuple
+            (values, offsets), as described for `from_vax32_many`.
+
+    Raises:
+        ValueError: If an input is complex, or as described for `to_vax32`.
+    """
+
+    arrays = list(arrays)
+    sizes = [array.size if isinstance(array, np.ndarray) else np.size(array)
+             for array in arrays]
+    offsets = np.zeros(len(arrays) + 1, dtype='int64')
+    np.cumsum(sizes, out=offsets[1:])
+
+    if not arrays:
+        values = np.empty(0, dtype='<f4')
+    else:
+        try:
+            values = np.concatenate(arrays, axis=None, dtype='<f4', casting='same_kind')
+        except TypeError as e:
+            raise ValueError('inputs must be real values: ' + str(e))
+
+    values = to_vax32(values, inplace=True, nthreads=nthreads, engine=engine,
+                      overflow=overflow)
+    return _divide(values, offsets, flat)
+
+
+def _gather(buffers, itemsize):
+    """Join buffers into one writable bytearray.
+
+    Returns:
+        tuple: (data, offsets), where offsets gives the starting index of each buffer's
+            values in units of `itemsize` bytes, followed by the total number of values.
+    """
+
+    buffers = list(buffers)
+    data = bytearray().join(buffers)
+
+    sizes = [len(buffer) if type(buffer) in (bytes, bytearray)
+             else memoryview(buffer).nbytes for buffer in buffers]
+    sizes = np.array(sizes, dtype='int64')
+
+    if np.any(sizes % itemsize):
+        k = int(np.argmax(sizes % itemsize != 0))
+        raise ValueError('size of buffer ' + str(k) + ' is not a multiple of '
+                         + str(itemsize) + ' bytes')
+
+    offsets = np.zeros(len(buffers) + 1, dtype='int64')
+    np.cumsum(sizes // itemsize, out=offsets[1:])
+    return (data, offsets)
+
+
+def _divide(values, offsets, flat):
+    """Return the converted values as a flat array and offsets, or a list of views."""
+
+    if flat:
+        return (values, offsets)
+
+    # Rows of a 2-D view are quicker to make than slices, if the sizes are all equal
+    sizes = np.diff(offsets)
+    if len(sizes) and np.all(sizes == sizes[0]) and sizes[0]:
+        return list(values.reshape(len(sizes), sizes[0]))
+
+    bounds = offsets.tolist()
+    return [values[start:stop] for (start, stop) in zip(bounds[:-1], bounds[1:])]
+
+################################################################################
@@ -0,0 +1,358 @@
+################################################################################
+# vax/_cache.py
+################################################################################
+"""A persistent on-disk cache of VAX data decoded from files."""
+
+import hashlib
+import numpy as np
+import os
+import re
+import tempfile
+import threading
+import time
+
+from vax import _KINDS, _SPECIAL_POLICIES, _policy, __version__
+from vax._stream import _readinto
+
+_CACHE_DIR = None       # cache directory; see set_cache()
+_CACHE_BYTES = 1 << 32  # size limit of the cache directory; see set_cache()
+_CACHE_LOCK = threading.Lock()
+
+# Bytes read from each of the start, middle, and end of the data for its content hash
+_HASH_BYTES = 1 << 16
+
+# Values decoded per block when filling a cache file
+_CHUNK_ITEMS = 1 << 20
+
+# Temporary files older than this many seconds were left by a process that failed
+_STALE_SECONDS = 3600
+
+# True if a file can be renamed while it is memory-mapped, which Windows does not allow
+_RENAME_MAPPED = os.name != 'nt'
+
+# Names of the files this module creates: cache files are named by their 40-digit key;
+# temporary files add a random part to the key. No other file is ever removed.
+_ENTRY_NAME = re.compile(r'[0-9a-f]{40}\.npy')
+_TEMP_NAME = re.compile(r'[0-9a-f]{40}\.\w+\.tmp')
+
+
+def cached_from_vax32(path, offset=0, count=None, kind='f4', special='ieee-compatible',
+                      cache_dir=None):
+    """Return IEEE values decoded from VAX single-precision data in a file, using the
+    decoded values cached by an earlier call if they are available.
+
+    The decoded values are stored in a ".npy" file in the cache directory, named by a
+    key made from the file's path, size, and modification time, the offset, count,
+    kind, and `special` policy, and a hash of sampled bytes of the data. A later call
+    with the same arguments, in any process, memory-maps that file instead of decoding
+    the data again. Cache files are written under temporary names and renamed when
+    complete, so concurrent processes never read a partial file, and the least recently
+    used files are removed when the cache exceeds its size limit; see `set_cache`.
+
+    Args:
+        path (str or os.PathLike): The path to the file of VAX data.
+        offset (int, optional): The byte offset of the first value in the file.
+        count (int, optional): Number of values to read. If None, values are read until
+            the end of the file.
+        kind (str, optional): "f4" to interpret the data as VAX float32 values; "c8" to
+            interpret it as complex64 values.
+        special (str, optional): How to convert VAX reserved operands and dirty zeros;
+            see `from_vax32`.
+        cache_dir (str or os.PathLike, optional): The cache directory; None for the
+            directory given to `set_cache`.
+
+    Returns:
+        np.memmap: A read-only, 1-D array of dtype "<f4" or "<c8", memory-mapped from
+            the cache file.
+
+    Raises:
+        ValueError: If the file is too small for `count` values, if the data ends with a
+            partial value, or if the kind or policy is invalid.
+    """
+
+    if kind not in ('f4', 'c8'):
+        raise ValueError('invalid kind for 4-byte VAX data: ' + repr(kind))
+
+    return _cached(path, offset, count, kind, special, cache_dir)
+
+
+def cached_from_vax64(path, offset=0, count=None, kind='d8', special='ieee-compatible',
+                      cache_dir=None):
+    """Return IEEE values decoded from VAX double-precision data in a file, using the
+    decoded values cached by an earlier call if they are available.
+
+    This is the double-precision (D-floating) counterpart of `cached_from_vax32`.
+
+    Args:
+        path (str or os.PathLike): The path to the file of VAX data.
+        offset (int, optional): The byte offset of the first value in the file.
+        count (int, optional): Number of values to read. If None, values are read until
+            the end of the file.
+        kind (str, optional): "d8" to interpret the data as VAX D-floating values; "dc16"
+            to interpret it as D-floating complex values.
+        special (str, optional): How to convert VAX reserved operands and dirty zeros;
+            see `from_vax64`.
+        cache_dir (str or os.PathLike, optional): The cache directory; None for the
+            directory given to `set_cache`.
+
+    Returns:
+        np.memmap: A read-only, 1-D array of dtype "<f8" or "<c16", memory-mapped from
+            the cache file.
+
+    Raises:
+        ValueError: If the file is too small for `count` values, if the data ends with a
+            partial value, or if the kind or policy is invalid.
+    """
+
+    if kind not in ('d8', 'dc16'):
+        raise ValueError('invalid kind for 8-byte VAX data: ' + repr(kind))
+
+    return _cached(path, offset, count, kind, special, cache_dir)
+
+
+def set_cache(directory=None, max_bytes=None):
+    """Set the default directory and size limit of the cache of decoded files.
+
+    Args:
+        directory (str or os.PathLike, optional): The cache directory, which is created
+            if necessary. If None, the environment variable VAX_CACHE_DIR is used if it
+            is set; otherwise, "rms-vax" in the user's cache directory, "~/.cache".
+        max_bytes (int, optional): The size limit of the cache files in the directory;
+            None to leave the limit unchanged. The least recently used files are
+            removed when a new file would exceed it.
+
+    Returns:
+        tuple: The previous (directory, max_bytes), where the directory is None if it
+            was not set.
+    """
+
+    global _CACHE_DIR, _CACHE_BYTES
+
+    with _CACHE_LOCK:
+        previous = (_CACHE_DIR, _CACHE_BYTES)
+        _CACHE_DIR = None if directory is None else os.fspath(directory)
+        if max_bytes is not None:
+            _CACHE_BYTES = int(max_bytes)
+
+    return previous
+
+
+def get_cache():
+    """Return the directory and size limit of the cache of decoded files.
+
+    Returns:
+        tuple: (directory, max_bytes), where the directory is the one in use, as
+            determined by `set_cache`.
+    """
+
+    return (_cache_dir(None), _CACHE_BYTES)
+
+
+def clear_cache(cache_dir=None):
+    """Remove every file from the cache of decoded files.
+
+    Only the cache files written by this module are removed; other files in the
+    directory are left alone.
+
+    Args:
+        cache_dir (str or os.PathLike, optional): The cache directory; None for the
+            directory given to `set_cache`.
+    """
+
+    directory = _cache_dir(cache_dir)
+    for path in _files(directory, _ENTRY_NAME):
+        _remove(path)
+
+
+def _cache_dir(cache_dir):
+    """The cache directory to use, given the value of a cache_dir argument."""
+
+    if cache_dir is not None:
+        return os.fspath(cache_dir)
+    if _CACHE_DIR is not None:
+        return _CACHE_DIR
+    if os.environ.get('VAX_CACHE_DIR'):
+        return os.environ['VAX_CACHE_DIR']
+    return os.path.join(os.path.expanduser('~'), '.cache', 'rms-vax')
+
+
+def _cached(path, offset, count, kind, special, cache_dir):
+    """Shared by cached_from_vax32 and cached_from_vax64."""
+
+    _policy(special, _SPECIAL_POLICIES, 'special')
+    (dtype, converter) = _KINDS[kind]
+    itemsize = np.dtype(dtype).itemsize
+
+    path = os.path.realpath(os.fspath(path))
+    status = os.stat(path)
+    available = status.st_size - offset
+    if count is None:
+        if available % itemsize != 0:
+            raise ValueError('data size is not a multiple of ' + str(itemsize)
+                             + ' bytes')
+        count = max(available, 0) // itemsize
+    elif count * itemsize > available:
+        raise ValueError('file is too small for ' + str(count) + ' values')
+
+    directory = _cache_dir(cache_dir)
+    with open(path, 'rb') as f:
+        key = _key(f, path, status, offset, count, kind, special)
+        filename = os.path.join(directory, key + '.npy')
+
+        result = _load(filename)
+        if result is not None:
+            return result
+
+        # The new entry is not loaded again by name, because another process may evict
+        # it as soon as it is in place
+        os.makedirs(directory, exist_ok=True)
+        result = _fill(f, filename, offset, count, dtype, converter, special)
+        if result is None:          # mapped files cannot be renamed on this system
+            result = _load(filename)
+            if result is None:      # already evicted by another process
+                result = np.empty(count, dtype=dtype)
+                _decode(f, result, offset, converter, special)
+                result.flags.writeable = False
+
+    _evict(directory, filename)
+    return result
+
+
+def _key(f, path, status, offset, count, kind, special):
+    """The cache key of the data, as a hexadecimal string.
+
+    The content hash covers up to _HASH_BYTES from each of the start, middle, and end of
+    the data, so that it is quick to compute for any size of file.
+    """
+
+    nbytes = count * np.dtype(_KINDS[kind][0]).itemsize
+    h = hashlib.blake2b(digest_size=20)
+    h.update(repr((__version__, path, status.st_size, status.st_mtime_ns, offset,
+                   count, kind, special)).encode('utf-8'))
+
+    starts = {0, max(nbytes // 2 - _HASH_BYTES // 2, 0), max(nbytes - _HASH_BYTES, 0)}
+    for start in sorted(starts):
+        f.seek(offset + start)
+        h.update(f.read(min(_HASH_BYTES, nbytes - start)))
+
+    return h.hexdigest()
+
+
+def _load(filename):
+    """Memory-map a cache file and mark it as recently used; None if it is missing."""
+
+    try:
+        result = np.load(filename, mmap_mode='r')
+    except FileNotFoundError:
+        return None
+    except ValueError:          # pragma: no cover; unreadable, so decode again
+        _remove(filename)
+        return None
+
+    try:
+        os.utime(filename)
+    except OSError:             # pragma: no cover; evicted by another process
+        pass
+
+    return result
+
+
+def _fill(f, filename, offset, count, dtype, converter, special):
+    """Decode the data into a new cache file, renamed to its final name when complete.
+
+    Returns:
+        np.memmap or None: The decoded values, read-only and mapped from the cache file;
+            or None on systems where the mapping must be released before the rename.
+    """
+
+    directory = os.path.dirname(filename)
+    prefix = os.path.basename(filename)[:-len('.npy')] + '.'
+    (handle, temp) = tempfile.mkstemp(suffix='.tmp', prefix=prefix, dir=directory)
+    os.close(handle)
+
+    try:
+        array = np.lib.format.open_memmap(temp, mode='w+', dtype=dtype, shape=(count,))
+        _decode(f, array, offset, converter, special)
+        array.flush()
+
+        if _RENAME_MAPPED:
+            os.replace(temp, filename)
+            array.flags.writeable = False
+            array.filename = os.path.abspath(filename)
+            return array
+
+        array = None
+        os.replace(temp, filename)
+        return None
+
+    except BaseException:
+        _remove(temp)
+        raise
+
+
+def _decode(f, array, offset, converter, special):
+    """Read the data at an offset in a file into a 1-D array and decode it in place."""
+
+    f.seek(offset)
+    for start in range(0, len(array), _CHUNK_ITEMS):
+        block = array[start:start + _CHUNK_ITEMS]
+        nbytes = _readinto(f, memoryview(block.view('u1')))
+        if nbytes < block.nbytes:
+            raise ValueError('end of file reached after '
+                             + str(start + nbytes // block.itemsize)
+                             + ' of ' + str(len(array)) + ' values')
+        converter(block, inplace=True, special=special)
+
+
+def _evict(directory, keep):
+    """Remove the least recently used cache files until the total is within the limit.
+
+    The file `keep` is not removed. Temporary files abandoned by failed processes are
+    also removed. Files removed by another process in the meantime are skipped.
+    """
+
+    entries = []
+    for path in _files(directory, _ENTRY_NAME):
+        try:
+            status = os.stat(path)
+        except FileNotFoundError:
+            continue
+        entries.append((status.st_mtime, status.st_size, path))
+
+    total = sum(entry[1] for entry in entries)
+    for (_, size, path) in sorted(entries):
+        if total <= _CACHE_BYTES:
+            break
+        if path != keep:
+            _remove(path)
+            total -= size
+
+    stale = time.time() - _STALE_SECONDS
+    for path in _files(directory, _TEMP_NAME):
+        try:
+            if os.stat(path).st_mtime < stale:
+                _remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _files(directory, pattern):
+    """The paths of the files in a directory whose names match a compiled pattern."""
+
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+
+    return [os.path.join(directory, name) for name in names if pattern.fullmatch(name)]
+
+
+def _remove(path):
+    """Remove a file, ignoring one already removed or still in use."""
+
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+################################################################################
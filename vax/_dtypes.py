@@ -0,0 +1,112 @@
+################################################################################
+# vax/_dtypes.py
+################################################################################
+"""Conversion of arrays identified as VAX-format data by their dtypes."""
+
+import numpy as np
+
+from vax import _KINDS, _vax_kind, to_vax32, to_vax64
+from vax._table import _convert_records, _parse_spec
+
+
+def from_vax(data, dtype=None, nthreads=None):
+    """Convert an array marked by its dtype as VAX-format data to IEEE values.
+
+    The dtypes `vax.F4`, `vax.C8`, `vax.D8`, and `vax.DC16` identify VAX single
+    precision, single-precision complex, double precision (D-floating), and
+    double-precision complex values. They are void dtypes of the same size as the raw
+    values, so the raw bits cannot be mistaken for IEEE numbers. The mark travels with
+    the data through views, slices, `np.fromfile`, `np.memmap`, and structured dtypes,
+    so a pipeline can read and pass along raw VAX data and convert it only where IEEE
+    values are needed:
+
+        raw = np.fromfile(path, dtype=vax.F4, offset=1536)
+        values = vax.from_vax(raw[100:200])
+
+    A structured array is converted as by `from_vax_records`: every field with a VAX
+    dtype is converted, other fields are copied, and padding fields are dropped.
+
+    Args:
+        data (np.ndarray or bytes or bytearray or memoryview):
+            The VAX data. Unless `dtype` is given, it must be a numpy array with a VAX
+            dtype or a structured dtype containing VAX fields.
+        dtype (np.dtype, optional):
+            A VAX dtype, or a structured dtype containing VAX fields, with which to
+            interpret `data`, which is then viewed rather than copied.
+        nthreads (int, optional):
+            The number of threads over which to divide the conversion of a large array;
+            0 for one thread per CPU. If None, the default set by `set_nthreads` is used.
+
+    Returns:
+        np.ndarray or np.floating or np.complexfloating:
+            The IEEE values, with dtype "<f4", "<c8", "<f8", or "<c16" and the shape of
+            the input array; or a structured array with such fields.
+
+    Raises:
+        ValueError: If the dtype does not identify VAX data, or the input has an invalid
+            size.
+    """
+
+    if dtype is not None:
+        dtype = np.dtype(dtype)
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = np.frombuffer(data, dtype=dtype)
+        else:
+            data = np.asarray(data).view(dtype)
+    elif not isinstance(data, np.ndarray):
+        raise ValueError('a dtype is required unless the data is an array with a VAX '
+                         'dtype')
+
+    # Records are viewed with the raw dtype, which has the same size, so that an array of
+    # any shape and strides is converted without a copy
+    if data.dtype.names:
+        (raw_dtype, kinds) = _parse_spec(data.dtype)
+        records = data.view(raw_dtype)
+        if records.ndim == 0:
+            return _convert_records(records.reshape(1), kinds).reshape(())
+        return _convert_records(records, kinds)
+
+    kind = _vax_kind(data.dtype)
+    if kind is None:
+        raise ValueError('dtype does not identify VAX data: ' + str(data.dtype))
+
+    # The converters take the raw values as numbers of the same size
+    (raw, converter) = _KINDS[kind]
+    return converter(data.view(raw), nthreads=nthreads)
+
+
+def to_vax(array, dtype, nthreads=None):
+    """Convert IEEE values to an array of VAX-format data marked by its dtype.
+
+    This is the counterpart of `from_vax`, returning the VAX representation as an array
+    with dtype `vax.F4`, `vax.C8`, `vax.D8`, or `vax.DC16`, which can be written with
+    `tofile`, stored in a memmap, or converted back with `from_vax`. Because the VAX
+    dtypes are void types, numpy raises an error for arithmetic on the result or for a
+    cast of it to a numeric dtype, rather than misreading the bits.
+
+    Args:
+        array (array-like): The values to convert. They are first cast to the IEEE type
+            corresponding to `dtype`.
+        dtype (np.dtype): The VAX dtype of the result.
+        nthreads (int, optional):
+            The number of threads over which to divide the conversion of a large array;
+            0 for one thread per CPU. If None, the default set by `set_nthreads` is used.
+
+    Returns:
+        np.ndarray: The VAX representation, with the shape of the input and the given
+            dtype.
+
+    Raises:
+        ValueError: If `dtype` is not a VAX dtype.
+    """
+
+    kind = _vax_kind(dtype)
+    if kind is None or np.dtype(dtype).names or np.dtype(dtype).shape:
+        raise ValueError('not a VAX dtype: ' + str(dtype))
+
+    array = np.asarray(array, dtype=_KINDS[kind][0])
+    encoder = to_vax32 if kind in ('f4', 'c8') else to_vax64
+    result = np.asarray(encoder(array, nthreads=nthreads))
+    return result.view(np.dtype(dtype))
+
+################################################################################
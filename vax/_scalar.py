@@ -0,0 +1,158 @@
+################################################################################
+# vax/_scalar.py
+################################################################################
+"""Conversion of single VAX values to and from Python floats and bytes."""
+
+import numpy as np
+import struct
+
+from vax import (_D_BIAS, _D_MAX, _D_MIN, _D_OVERFLOW, _D_RESERVED, _D_ZERO, _IEEE_INF,
+                 _f4_bits_times_4)
+
+# Precompiled formats; a VAX value is read and written as 16-bit little-endian words
+_WORDS2 = struct.Struct('<HH')
+_WORDS4 = struct.Struct('<HHHH')
+_FLOAT = struct.Struct('<f')
+_DOUBLE = struct.Struct('<d')
+_UINT32 = struct.Struct('<I')
+_UINT64 = struct.Struct('<Q')
+
+# Smallest normalized IEEE single-precision magnitude
+_F4_TINY = 2.**-126
+
+
+def vax32_to_float(data, offset=0):
+    """Convert one VAX single-precision value to a Python float.
+
+    This is a fast alternative to `from_vax32` for decoding individual fields, such as
+    those of a label or record header. The result equals that of `from_vax32`, converted
+    to a Python float.
+
+    Args:
+        data (bytes or bytearray or memoryview): The buffer containing the value.
+        offset (int, optional): The byte offset of the value in the buffer.
+
+    Returns:
+        float: The value.
+
+    Raises:
+        ValueError: If the buffer has fewer than four bytes after the offset.
+    """
+
+    try:
+        (high, low) = _WORDS2.unpack_from(data, offset)
+    except struct.error:
+        raise ValueError('buffer is too short for a 4-byte value at offset '
+                         + str(offset))
+
+    # Swap the 16-bit halves, then divide by 4 to correct the exponent bias
+    value = _FLOAT.unpack(_UINT32.pack((high << 16) | low))[0] / 4.
+
+    # Round any value that becomes denormal back to single precision, as from_vax32 does
+    if -_F4_TINY < value < _F4_TINY:
+        value = _FLOAT.unpack(_FLOAT.pack(value))[0]
+
+    return value
+
+
+def vax64_to_float(data, offset=0):
+    """Convert one VAX double-precision (D-floating) value to a Python float.
+
+    This is a fast alternative to `from_vax64` for decoding individual fields, such as
+    those of a label or record header. The result equals that of `from_vax64`, converted
+    to a Python float.
+
+    Args:
+        data (bytes or bytearray or memoryview): The buffer containing the value.
+        offset (int, optional): The byte offset of the value in the buffer.
+
+    Returns:
+        float: The value.
+
+    Raises:
+        ValueError: If the buffer has fewer than eight bytes after the offset.
+    """
+
+    try:
+        words = _WORDS4.unpack_from(data, offset)
+    except struct.error:
+        raise ValueError('buffer is too short for an 8-byte value at offset '
+                         + str(offset))
+
+    # Reverse the 16-bit words, so that the sign is in the high bit
+    bits = (words[0] << 48) | (words[1] << 32) | (words[2] << 16) | words[3]
+    magnitude = bits & 0x7fffffffffffffff
+    if magnitude < _D_ZERO:
+        return -0. if bits != magnitude else 0.
+
+    # Shift right by three, rounding, and rebias the exponent; see _vax64_to_ieee
+    bits = (((magnitude >> 2) + 1 + 2 * _D_BIAS) >> 1) | (bits ^ magnitude)
+    return _DOUBLE.unpack(_UINT64.pack(bits))[0]
+
+
+def float_to_vax32(value):
+    """Convert a Python float to the bytes of a VAX single-precision value.
+
+    This is a fast alternative to `to_vax32_bytes` for encoding individual values. The
+    result equals that of `to_vax32_bytes` with its default overflow policy; in
+    particular, negative zero and magnitudes below 2**-128 become a clean VAX zero.
+
+    Args:
+        value (float): The value.
+
+    Returns:
+        bytes: The four bytes of the VAX representation.
+    """
+
+    try:
+        bits = _UINT32.unpack(_FLOAT.pack(value))[0]
+    except OverflowError:
+        bits = 0xff800000 if value < 0 else 0x7f800000     # infinity
+
+    # Multiplying by 4 adds 2 to the exponent, except for the exponents that need
+    # special handling; see _ieee_to_vax32_int. Negative zero and magnitudes below
+    # 2**-128 become a clean zero.
+    magnitude = bits & 0x7fffffff
+    if 0x00800000 <= magnitude < 0x7e800000:
+        bits += 0x01000000
+    elif magnitude < 0x00200000:
+        bits = 0
+    else:
+        bits = int(_f4_bits_times_4(np.array([bits], dtype='<u4'), 'saturate')[0])
+
+    # Swap the 16-bit halves
+    return _WORDS2.pack(bits >> 16, bits & 0xffff)
+
+
+def float_to_vax64(value):
+    """Convert a Python float to the bytes of a VAX double-precision (D-floating) value.
+
+    This is a fast alternative to `to_vax64_bytes` for encoding individual values. The
+    result equals that of `to_vax64_bytes`.
+
+    Args:
+        value (float): The value.
+
+    Returns:
+        bytes: The eight bytes of the VAX representation.
+    """
+
+    bits = _UINT64.unpack(_DOUBLE.pack(value))[0]
+    magnitude = bits & 0x7fffffffffffffff
+    sign = bits ^ magnitude
+
+    # Rebias the exponent and shift it into place; see _ieee_to_vax64
+    if magnitude < _D_MIN:
+        bits = 0
+    elif magnitude < _D_OVERFLOW:
+        bits = ((magnitude - _D_BIAS) << 3) | sign
+    elif magnitude <= _IEEE_INF:
+        bits = sign | _D_MAX
+    else:
+        bits = _D_RESERVED
+
+    # Reverse the 16-bit words
+    return _WORDS4.pack(bits >> 48, (bits >> 32) & 0xffff, (bits >> 16) & 0xffff,
+                        bits & 0xffff)
+
+################################################################################
@@ -0,0 +1,165 @@
+################################################################################
+# vax/_scan.py
+################################################################################
+"""Scanning of VAX-format data for special values, without conversion."""
+
+import numpy as np
+
+from vax import _BLOCK
+
+# Masks applied to the first 16-bit word of each VAX value, which holds the sign, the
+# exponent, and the leading bits of the mantissa
+_SIGN = 0x8000
+_EXPONENT = 0x7f80
+
+
+def scan_vax32(data, indices=False):
+    """Count the special values in VAX single-precision data, without converting it.
+
+    The raw words are examined directly, one cache-sized block at a time, and no IEEE
+    output is produced, so even a multi-gigabyte memory-mapped file can be scanned with
+    little memory. The categories are:
+
+    * "reserved": reserved operands, which have a sign bit of 1 and an exponent of 0. The
+      VAX raises an exception when one is used.
+    * "dirty_zero": values with a sign bit of 0 and an exponent of 0, but a nonzero
+      mantissa. The VAX treats these as zero.
+    * "overflow": values with the largest exponent, 255. These are valid VAX numbers,
+      but `from_vax32` converts them to IEEE infinity or NaN.
+
+    Args:
+        data (bytes or bytearray or memoryview or str or numpy array-like):
+            The VAX data, in any form accepted by `from_vax32`. A numpy memmap may be
+            used to scan a file directly.
+        indices (bool, optional): True to also return the index of each special value.
+
+    Returns:
+        dict: "count" is the total number of 4-byte values, and "reserved",
+            "dirty_zero", and "overflow" are the number of values in each category. If
+            `indices` is True, the keys "reserved_indices", "dirty_zero_indices", and
+            "overflow_indices" give the sorted indices of these values as 1-D arrays of
+            dtype int64. Indices count 4-byte values in the flattened data, so for
+            complex data, the index of the complex element is the index divided by 2.
+
+    Raises:
+        ValueError: If the input has an invalid size or data type.
+    """
+
+    words = _raw_words(data, 4)
+    return _scan(words, 0xffff007f, overflow=True, indices=indices)
+
+
+def scan_vax64(data, indices=False):
+    """Count the special values in VAX double-precision data, without converting it.
+
+    The raw words are examined directly, one cache-sized block at a time, and no IEEE
+    output is produced, so even a multi-gigabyte memory-mapped file can be scanned with
+    little memory. The categories are:
+
+    * "reserved": reserved operands, which have a sign bit of 1 and an exponent of 0. The
+      VAX raises an exception when one is used.
+    * "dirty_zero": values with a sign bit of 0 and an exponent of 0, but a nonzero
+      mantissa. The VAX treats these as zero.
+    * "overflow": values that overflow on conversion to IEEE. The D-floating range lies
+      within that of IEEE doubles, so this count is always zero; it is included for
+      consistency with `scan_vax32`.
+
+    Args:
+        data (bytes or bytearray or memoryview or str or numpy array-like):
+            The VAX data, in any form accepted by `from_vax64`. A numpy memmap may be
+            used to scan a file directly.
+        indices (bool, optional): True to also return the index of each special value.
+
+    Returns:
+        dict: "count" is the total number of 8-byte values, and "reserved",
+            "dirty_zero", and "overflow" are the number of values in each category. If
+            `indices` is True, the keys "reserved_indices", "dirty_zero_indices", and
+            "overflow_indices" give the sorted indices of these values as 1-D arrays of
+            dtype int64. Indices count 8-byte values in the flattened data, so for
+            complex data, the index of the complex element is the index divided by 2.
+
+    Raises:
+        ValueError: If the input has an invalid size or data type.
+    """
+
+    words = _raw_words(data, 8)
+    return _scan(words, 0xffffffffffff007f, overflow=False, indices=indices)
+
+
+def _raw_words(data, itemsize):
+    """Return the raw VAX data as a flat array of little-endian words of this size.
+
+    No copy is made if the data is a buffer or a contiguous array.
+    """
+
+    if isinstance(data, str):
+        data = bytes(data, encoding='latin8')
+
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        array = np.frombuffer(data, dtype='u1')
+        key = 'u1'
+    else:
+        array = np.asarray(data)
+        if not isinstance(data, np.ndarray) and itemsize == 4:
+            # Array-likes are converted to 4-byte values, as in from_vax32
+            if array.dtype.kind == 'c':
+                array = np.asarray(array, dtype='<c8')
+            elif array.dtype.kind in 'uif':
+                array = np.asarray(array, dtype='<' + array.dtype.kind + '4')
+        key = array.dtype.kind + str(array.dtype.itemsize)
+
+    valid = ({'f4', 'c8', 'u1', 'u2', 'u4', 'i1', 'i2', 'i4'} if itemsize == 4 else
+             {'f8', 'c16', 'u1', 'u2', 'u4', 'u8', 'i1', 'i2', 'i4', 'i8'})
+    if key not in valid:
+        raise ValueError('invalid data type for ' + str(itemsize) + '-byte array input: '
+                         + str(array.dtype))
+
+    array = array.reshape(-1)
+    if array.nbytes % itemsize != 0:
+        raise ValueError('data size is not a multiple of ' + str(itemsize) + ' bytes')
+
+    return np.ascontiguousarray(array).view('<u' + str(itemsize))
+
+
+def _scan(words, mantissa_mask, overflow, indices):
+    """Scan a flat array of VAX words, returning the dictionary of results."""
+
+    counts = {'reserved': 0, 'dirty_zero': 0, 'overflow': 0}
+    found = {name: [] for name in counts}
+
+    temp = np.empty(min(len(words), _BLOCK), dtype=words.dtype)
+    for start in range(0, len(words), _BLOCK):
+        block = words[start:start + _BLOCK]
+        work = temp[:len(block)]
+
+        # The sign and exponent are the same bits of the first 16-bit word in both
+        # formats, which is the low-order word of each little-endian integer
+        np.bitwise_and(block, _SIGN | _EXPONENT, out=work)
+        masks = {'reserved': work == _SIGN}
+        zero = work == 0
+        if overflow:
+            np.bitwise_and(work, _EXPONENT, out=work)
+            masks['overflow'] = work == _EXPONENT
+
+        # Dirty zeros have any other bit set
+        if zero.any():
+            np.bitwise_and(block, mantissa_mask, out=work)
+            masks['dirty_zero'] = zero & (work != 0)
+
+        for (name, mask) in masks.items():
+            count = int(np.count_nonzero(mask))
+            if count:
+                counts[name] += count
+                if indices:
+                    found[name].append(np.flatnonzero(mask) + start)
+
+    result = {'count': len(words)}
+    result.update(counts)
+    if indices:
+        for (name, arrays) in found.items():
+            result[name + '_indices'] = (np.concatenate(arrays) if arrays
+                                         else np.empty(0, dtype='int64')).astype('int64')
+
+    return result
+
+################################################################################
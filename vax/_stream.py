@@ -0,0 +1,499 @@
+################################################################################
+# vax/_stream.py
+################################################################################
+"""Streaming conversion of VAX-format data read from files and asyncio streams, and
+written to files."""
+
+import asyncio
+import functools
+import numpy as np
+import os
+
+from vax import (_KINDS, _OVERFLOW_POLICIES, _policy, to_vax32, to_vax64)
+
+# Default number of items per block yielded by the streaming decoders
+_CHUNK_ITEMS = 1 << 20
+
+# Blocks of at least this many items are converted in an executor by the asyncio decoders
+_EXECUTOR_ITEMS = 1 << 16
+
+# Encoder for each kind of VAX data written by VaxWriter
+_ENCODERS = {'f4': to_vax32, 'c8': to_vax32, 'd8': to_vax64, 'dc16': to_vax64}
+
+
+def iter_from_vax32(source, offset=0, count=None, chunk_items=_CHUNK_ITEMS, kind='f4'):
+    """Generate blocks of IEEE values from VAX single-precision data in a file.
+
+    The data is read one block at a time into a single internal buffer, which is
+    converted in place, so memory use is bounded by `chunk_items` no matter how large the
+    file is.
+
+    Args:
+        source (str or os.PathLike or file): A file path, or a binary file object
+            supporting `read` or `readinto`.
+        offset (int, optional): Number of bytes to skip before the first value. For a
+            path, this is measured from the start of the file; for a file object, it is
+            measured from the current position.
+        count (int, optional): Number of values to read. If None, values are read until
+            the end of the file.
+        chunk_items (int, optional): Maximum number of values in each block.
+        kind (str, optional): "f4" to interpret the data as VAX float32 values; "c8" to
+            interpret it as complex64 values.
+
+    Yields:
+        np.ndarray: A 1-D array of dtype "<f4" or "<c8" containing the next block of
+            converted values. The array is a view of the internal buffer and is
+            overwritten by the next block; copy it if it must be retained.
+
+    Raises:
+        ValueError: If the file ends before `count` values are read, if the data ends
+            with a partial value, or if the kind is invalid.
+    """
+
+    if kind not in ('f4', 'c8'):
+        raise ValueError('invalid kind for 4-byte VAX data: ' + repr(kind))
+
+    dtype, converter = _KINDS[kind]
+    return _iter_blocks(source, offset, count, chunk_items, dtype, converter)
+
+
+def iter_from_vax64(source, offset=0, count=None, chunk_items=_CHUNK_ITEMS, kind='d8'):
+    """Generate blocks of IEEE values from VAX double-precision data in a file.
+
+    The data is read one block at a time into a single internal buffer, which is
+    converted in place, so memory use is bounded by `chunk_items` no matter how large the
+    file is.
+
+    Args:
+        source (str or os.PathLike or file): A file path, or a binary file object
+            supporting `read` or `readinto`.
+        offset (int, optional): Number of bytes to skip before the first value. For a
+            path, this is measured from the start of the file; for a file object, it is
+            measured from the current position.
+        count (int, optional): Number of values to read. If None, values are read until
+            the end of the file.
+        chunk_items (int, optional): Maximum number of values in each block.
+        kind (str, optional): "d8" to interpret the data as VAX D-floating values; "dc16"
+            to interpret it as D-floating complex values.
+
+    Yields:
+        np.ndarray: A 1-D array of dtype "<f8" or "<c16" containing the next block of
+            converted values. The array is a view of the internal buffer and is
+            overwritten by the next block; copy it if it must be retained.
+
+    Raises:
+        ValueError: If the file ends before `count` values are read, if the data ends
+            with a partial value, or if the kind is invalid.
+    """
+
+    if kind not in ('d8', 'dc16'):
+        raise ValueError('invalid kind for 8-byte VAX data: ' + repr(kind))
+
+    dtype, converter = _KINDS[kind]
+    return _iter_blocks(source, offset, count, chunk_items, dtype, converter)
+
+
+def aiter_from_vax32(reader, offset=0, count=None, chunk_items=_CHUNK_ITEMS, kind='f4',
+                     executor=None):
+    """Asynchronously generate blocks of IEEE values from VAX single-precision data in a
+    stream.
+
+    Bytes are read from the stream until a block of `chunk_items` values is complete, so
+    a value split across two reads is handled correctly. Large blocks are converted in an
+    executor, so the event loop continues to run during the conversion.
+
+    Args:
+        reader (asyncio.StreamReader): The stream, or any object with a coroutine method
+            `read(n)` that returns up to `n` bytes, and no bytes at the end of the data.
+        offset (int, optional): Number of bytes to skip before the first value.
+        count (int, optional): Number of values to read. If None, values are read until
+            the end of the stream.
+        chunk_items (int, optional): Maximum number of values in each block.
+        kind (str, optional): "f4" to interpret the data as VAX float32 values; "c8" to
+            interpret it as complex64 values.
+        executor (concurrent.futures.Executor, optional): The executor for converting
+            blocks of 65,536 values or more; None for the default executor of the event
+            loop.
+
+    Yields:
+        np.ndarray: A 1-D array of dtype "<f4" or "<c8" containing the next block of
+            converted values. Unlike the arrays from `iter_from_vax32`, each is newly
+            allocated and may be retained.
+
+    Raises:
+        ValueError: If the stream ends before `count` values are read, if the data ends
+            with a partial value, or if the kind is invalid.
+    """
+
+    if kind not in ('f4', 'c8'):
+        raise ValueError('invalid kind for 4-byte VAX data: ' + repr(kind))
+
+    dtype, converter = _KINDS[kind]
+    if chunk_items < 1:
+        raise ValueError('chunk_items must be positive')
+
+    return _agenerate_blocks(reader, offset, count, chunk_items, dtype, converter,
+                             executor)
+
+
+def aiter_from_vax64(reader, offset=0, count=None, chunk_items=_CHUNK_ITEMS, kind='d8',
+                     executor=None):
+    """Asynchronously generate blocks of IEEE values from VAX double-precision data in a
+    stream.
+
+    Bytes are read from the stream until a block of `chunk_items` values is complete, so
+    a value split across two reads is handled correctly. Large blocks are converted in an
+    executor, so the event loop continues to run during the conversion.
+
+    Args:
+        reader (asyncio.StreamReader): The stream, or any object with a coroutine method
+            `read(n)` that returns up to `n` bytes, and no bytes at the end of the data.
+        offset (int, optional): Number of bytes to skip before the first value.
+        count (int, optional): Number of values to read. If None, values are read until
+            the end of the stream.
+        chunk_items (int, optional): Maximum number of values in each block.
+        kind (str, optional): "d8" to interpret the data as VAX D-floating values; "dc16"
+            to interpret it as D-floating complex values.
+        executor (concurrent.futures.Executor, optional): The executor for converting
+            blocks of 65,536 values or more; None for the default executor of the event
+            loop.
+
+    Yields:
+        np.ndarray: A 1-D array of dtype "<f8" or "<c16" containing the next block of
+            converted values. Unlike the arrays from `iter_from_vax64`, each is newly
+            allocated and may be retained.
+
+    Raises:
+        ValueError: If the stream ends before `count` values are read, if the data ends
+            with a partial value, or if the kind is invalid.
+    """
+
+    if kind not in ('d8', 'dc16'):
+        raise ValueError('invalid kind for 8-byte VAX data: ' + repr(kind))
+
+    dtype, converter = _KINDS[kind]
+    if chunk_items < 1:
+        raise ValueError('chunk_items must be positive')
+
+    return _agenerate_blocks(reader, offset, count, chunk_items, dtype, converter,
+                             executor)
+
+
+async def _agenerate_blocks(reader, offset, count, chunk_items, dtype, converter,
+                            executor):
+    """Asynchronous generator shared by aiter_from_vax32 and aiter_from_vax64."""
+
+    while offset > 0:
+        data = await reader.read(min(offset, _CHUNK_ITEMS))
+        if not data:
+            raise ValueError('end of stream reached before offset')
+        offset -= len(data)
+
+    itemsize = np.dtype(dtype).itemsize
+    if count is not None:
+        chunk_items = max(1, min(chunk_items, count))
+
+    remaining = count
+    while remaining is None or remaining > 0:
+        items = chunk_items if remaining is None else min(chunk_items, remaining)
+
+        # Fill a new buffer; a read may end anywhere, including within a value
+        buffer = bytearray(items * itemsize)
+        nbytes = 0
+        while nbytes < len(buffer):
+            data = await reader.read(len(buffer) - nbytes)
+            if not data:
+                break
+            buffer[nbytes:nbytes + len(data)] = data
+            nbytes += len(data)
+
+        if nbytes % itemsize != 0:
+            raise ValueError('data size is not a multiple of ' + str(itemsize)
+                             + ' bytes')
+        if remaining is not None:
+            if nbytes < items * itemsize:
+                raise ValueError('end of stream reached after '
+                                 + str(count - remaining + nbytes // itemsize)
+                                 + ' of ' + str(count) + ' values')
+            remaining -= items
+        if nbytes == 0:
+            return
+
+        array = np.frombuffer(buffer, dtype=dtype, count=nbytes // itemsize)
+        if len(array) >= _EXECUTOR_ITEMS:
+            loop = asyncio.get_running_loop()
+            yield await loop.run_in_executor(executor, functools.partial(converter, array,
+                                                                         inplace=True))
+        else:
+            yield converter(array, inplace=True)
+
+        if nbytes < items * itemsize:       # end of stream
+            return
+
+
+class VaxWriter(object):
+    """A writer that encodes IEEE values to VAX format and writes them to a file.
+
+    Each array passed to `write` is encoded in blocks into a single internal buffer,
+    which is written to the file and then reused, so memory use is bounded by
+    `chunk_items` no matter how much data is written. No full-size copy of an input
+    array is made, even if it is not contiguous or has another dtype.
+
+    If `record_bytes` is given, the output is a sequence of fixed-length records, as in
+    PDS3 files with RECORD_TYPE = FIXED_LENGTH. Values continue from one record to the
+    next, and `close` pads the last record with zero bytes.
+
+        with vax.VaxWriter('image.dat', record_bytes=512) as writer:
+            for block in blocks:
+                writer.write(block)
+
+    Attributes:
+        kind (str): "f4", "c8", "d8", or "dc16"; see the constructor.
+        record_bytes (int or None): The record length in bytes, or None.
+        count (int): The number of values written so far.
+        nbytes (int): The number of bytes written so far, including any padding.
+        closed (bool): True if the writer has been closed.
+    """
+
+    def __init__(self, target, kind='f4', record_bytes=None, chunk_items=_CHUNK_ITEMS,
+                 overflow='saturate'):
+        """Constructor for a VaxWriter.
+
+        Args:
+            target (str or os.PathLike or file): A file path, which is created or
+                truncated, or a binary file object supporting `write`. Writing to a file
+                object begins at its current position.
+            kind (str, optional): The type of the VAX values: "f4" for single precision
+                (F-floating), "c8" for single-precision complex, "d8" for double
+                precision (D-floating), or "dc16" for double-precision complex.
+            record_bytes (int, optional): The length of each record in bytes; None to
+                write the values without padding.
+            chunk_items (int, optional): Maximum number of values encoded per block.
+            overflow (str, optional): How to encode values outside the range of VAX
+                single precision; see `to_vax32`. D-floating values always saturate, so
+                for "d8" and "dc16", this must be "saturate".
+
+        Raises:
+            ValueError: If the kind, record length, chunk size, or overflow policy is
+                invalid.
+        """
+
+        if kind not in _KINDS:
+            raise ValueError('invalid kind for VAX data: ' + repr(kind))
+        if chunk_items < 1:
+            raise ValueError('chunk_items must be positive')
+        if record_bytes is not None and record_bytes < 1:
+            raise ValueError('record_bytes must be positive')
+
+        _policy(overflow, _OVERFLOW_POLICIES, 'overflow')
+        if kind in ('d8', 'dc16') and overflow != 'saturate':
+            raise ValueError('overflow must be "saturate" for kind ' + repr(kind))
+
+        self.kind = kind
+        self.record_bytes = record_bytes
+        self.count = 0
+        self.nbytes = 0
+        self.closed = False
+
+        self._dtype = np.dtype(_KINDS[kind][0])
+        self._encoder = _ENCODERS[kind]
+        self._options = {'overflow': overflow} if self._encoder is to_vax32 else {}
+        self._chunk_items = chunk_items
+        self._buffer = None         # bytearray, allocated by the first write
+
+        if isinstance(target, (str, bytes, os.PathLike)):
+            self._file = open(target, 'wb')
+            self._owned = True
+        else:
+            self._file = target
+            self._owned = False
+
+    def write(self, array):
+        """Encode values and write them to the file.
+
+        Args:
+            array (numpy array-like): The values, of any shape; they are written in C
+                order. Real values are accepted for every kind; complex values only for
+                "c8" and "dc16". Other numeric types and byte orders are cast as they
+                are encoded.
+
+        Raises:
+            ValueError: If the writer is closed, if the values are complex and the kind
+                is not, or as raised by `to_vax32`.
+        """
+
+        if self.closed:
+            raise ValueError('write to a closed VaxWriter')
+
+        array = np.asarray(array)
+        if array.dtype.kind == 'c' and self._dtype.kind != 'c':
+            raise ValueError('complex values cannot be written as kind '
+                             + repr(self.kind))
+
+        size = array.size
+        if size == 0:
+            return
+
+        # A C-contiguous input is sliced directly; flat slices of others are copied
+        flat = array.reshape(-1) if array.flags.c_contiguous else array.flat
+
+        items = min(size, self._chunk_items)
+        itemsize = self._dtype.itemsize
+        if self._buffer is None or len(self._buffer) < items * itemsize:
+            self._buffer = bytearray(items * itemsize)
+        view = memoryview(self._buffer)
+
+        for start in range(0, size, items):
+            chunk = flat[start:start + items]
+            values = np.frombuffer(self._buffer, dtype=self._dtype, count=len(chunk))
+            if values.dtype.kind == 'c' and chunk.dtype.kind != 'c':
+                # Real values are copied into the buffer as complex, then encoded
+                values.imag = 0.
+                values.real = chunk
+                self._encoder(values, inplace=True, **self._options)
+            else:
+                self._encoder(chunk, out=values, **self._options)
+
+            _write(self._file, view[:values.nbytes])
+            self.count += len(chunk)
+            self.nbytes += values.nbytes
+
+    def close(self):
+        """Pad the last record, if necessary, and close the writer.
+
+        A file opened from a path is closed; a file object passed to the constructor is
+        left open. Closing a closed writer has no effect.
+        """
+
+        if self.closed:
+            return
+
+        try:
+            if self.record_bytes:
+                padding = -self.nbytes % self.record_bytes
+                if padding:
+                    _write(self._file, memoryview(bytes(padding)))
+                    self.nbytes += padding
+        finally:
+            self.closed = True
+            self._buffer = None
+            if self._owned:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _iter_blocks(source, offset, count, chunk_items, dtype, converter):
+    """Validate arguments and return the generator for iter_from_vax32/64."""
+
+    if chunk_items < 1:
+        raise ValueError('chunk_items must be positive')
+
+    return _generate_blocks(source, offset, count, chunk_items, dtype, converter)
+
+
+def _generate_blocks(source, offset, count, chunk_items, dtype, converter):
+    """Generator shared by iter_from_vax32 and iter_from_vax64."""
+
+    itemsize = np.dtype(dtype).itemsize
+    if isinstance(source, (str, bytes, os.PathLike)):
+        with open(source, 'rb') as f:
+            f.seek(offset)
+            for block in _read_blocks(f, count, chunk_items, itemsize, dtype,
+                                      converter):
+                yield block
+    else:
+        _skip(source, offset)
+        for block in _read_blocks(source, count, chunk_items, itemsize, dtype,
+                                  converter):
+            yield block
+
+
+def _read_blocks(f, count, chunk_items, itemsize, dtype, converter):
+    """Read, convert, and yield blocks from an open file positioned at the data."""
+
+    if count is not None:
+        chunk_items = max(1, min(chunk_items, count))
+
+    buffer = bytearray(chunk_items * itemsize)
+    view = memoryview(buffer)
+    remaining = count
+
+    while remaining is None or remaining > 0:
+        items = chunk_items if remaining is None else min(chunk_items, remaining)
+        nbytes = _readinto(f, view[:items * itemsize])
+
+        if nbytes % itemsize != 0:
+            raise ValueError('data size is not a multiple of ' + str(itemsize)
+                             + ' bytes')
+        if remaining is not None:
+            if nbytes < items * itemsize:
+                raise ValueError('end of file reached after '
+                                 + str(count - remaining + nbytes // itemsize)
+                                 + ' of ' + str(count) + ' values')
+            remaining -= items
+        if nbytes == 0:
+            return
+
+        array = np.frombuffer(buffer, dtype=dtype, count=nbytes // itemsize)
+        yield converter(array, inplace=True)
+
+        if nbytes < items * itemsize:       # end of file
+            return
+
+
+def _readinto(f, view):
+    """Fill a memoryview from a file, returning the number of bytes read.
+
+    Fewer bytes than requested are returned only at the end of the file.
+    """
+
+    filled = 0
+    readinto = getattr(f, 'readinto', None)
+    while filled < len(view):
+        if readinto:
+            n = readinto(view[filled:])
+        else:
+            data = f.read(len(view) - filled)
+            n = len(data)
+            view[filled:filled + n] = data
+
+        if not n:
+            break
+        filled += n
+
+    return filled
+
+
+def _write(f, view):
+    """Write all of a memoryview to a file, repeating partial writes."""
+
+    while len(view):
+        n = f.write(view)
+        if n is None:               # a write method that does not report its count
+            return
+        view = view[n:]
+
+
+def _skip(f, nbytes):
+    """Advance an open file by the given number of bytes."""
+
+    if nbytes <= 0:
+        return
+
+    seekable = getattr(f, 'seekable', None)
+    if seekable and seekable():
+        f.seek(nbytes, os.SEEK_CUR)
+        return
+
+    while nbytes > 0:
+        data = f.read(min(nbytes, _CHUNK_ITEMS))
+        if not data:
+            raise ValueError('end of file reached before offset')
+        nbytes -= len(data)
+
+################################################################################
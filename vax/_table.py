@@ -0,0 +1,489 @@
+################################################################################
+# vax/_table.py
+################################################################################
+"""Conversion of binary tables mixing VAX floats with native fields."""
+
+import collections
+import numpy as np
+import os
+import re
+
+from vax import _KINDS, _vax_kind
+
+# Format codes that mark a field of a record description as VAX-format
+_VAX_FORMATS = {'vax_f4': 'f4', 'vax_c8': 'c8', 'vax_d8': 'd8', 'vax_dc16': 'dc16'}
+
+# Approximate number of bytes of records converted per block
+_BLOCK_BYTES = 1 << 20
+
+
+def from_vax_records(buffer, dtype_spec, offset=0, count=None, columns=False):
+    """Convert a table of fixed-length binary records containing VAX-format fields.
+
+    The record layout is described in the same way as a numpy structured dtype, except
+    that fields holding VAX values are given one of the formats "vax_f4" (single
+    precision), "vax_c8" (single-precision complex), "vax_d8" (double precision), or
+    "vax_dc16" (double-precision complex), or the equivalent dtype `vax.F4`, `vax.C8`,
+    `vax.D8`, or `vax.DC16`. All other fields are native numpy types, such as "<i4" or
+    "|S8", and are copied unchanged. Fields of void type ("V") are padding
+    and are omitted from the result, as are any bytes not covered by a field.
+
+    The records are converted in cache-sized blocks, so each record is read only once.
+
+    Args:
+        buffer (bytes or bytearray or memoryview or np.ndarray): The binary table. A
+            numpy memmap may be used to read the table directly from a file.
+        dtype_spec (list or dict or np.dtype): The record layout, either as a list of
+            (name, format) or (name, format, shape) tuples, as a dict with keys "names",
+            "formats", and optionally "offsets" and "itemsize", as accepted by
+            `np.dtype`, or as a structured dtype.
+        offset (int, optional): The byte offset of the first record in the buffer.
+        count (int, optional): The number of records to convert. If None, the buffer
+            must contain a whole number of records after the offset, all of which are
+            converted.
+        columns (bool, optional): True to return a dictionary of contiguous column
+            arrays keyed by field name; False to return a structured array.
+
+    Returns:
+        np.ndarray or dict: A packed structured array with one element per record, in
+            which VAX fields have dtype "<f4", "<c8", "<f8", or "<c16"; or, if `columns`
+            is True, a dictionary mapping each field name to a 1-D (or, for fields with
+            a shape, N-D) array.
+
+    Raises:
+        ValueError: If the description is invalid or the buffer size does not match it.
+    """
+
+    raw_dtype, kinds = _parse_spec(dtype_spec)
+    itemsize = raw_dtype.itemsize
+
+    if isinstance(buffer, (memoryview, np.ndarray)):
+        nbytes = buffer.nbytes
+    else:
+        nbytes = len(buffer)
+
+    if count is None:
+        if (nbytes - offset) % itemsize != 0:
+            raise ValueError('buffer size is not a multiple of the record size ('
+                             + str(itemsize) + ' bytes)')
+        count = (nbytes - offset) // itemsize
+
+    records = np.frombuffer(buffer, dtype=raw_dtype, count=count, offset=offset)
+    return _convert_records(records, kinds, columns)
+
+
+def _convert_records(records, kinds, columns=False):
+    """Convert an array of raw records, of any strides, block by block.
+
+    Args:
+        records (np.ndarray): The records, with one or more dimensions and the raw dtype
+            returned by `_parse_spec`.
+        kinds (dict): The kind of each VAX field, as returned by `_parse_spec`.
+        columns (bool, optional): True to return a dictionary of column arrays.
+
+    Returns:
+        np.ndarray or dict: The converted records, with the shape of `records`; see
+            `from_vax_records`.
+    """
+
+    raw_dtype = records.dtype
+    shape = records.shape
+
+    # Padding fields are dropped from the result
+    names = [name for name in raw_dtype.names
+             if not _is_padding(raw_dtype.fields[name][0])]
+
+    if columns:
+        result = {name: np.empty(shape + raw_dtype.fields[name][0].shape,
+                                 dtype=raw_dtype.fields[name][0].base)
+                  for name in names}
+        targets = result
+    else:
+        result = np.empty(shape, dtype=[(name, raw_dtype.fields[name][0])
+                                        for name in names])
+        targets = {name: result[name] for name in names}
+
+    # Blocks are taken along the first axis
+    count = shape[0]
+    row_bytes = raw_dtype.itemsize * int(np.prod(shape[1:]))
+    rows = max(1, _BLOCK_BYTES // max(row_bytes, 1))
+    for start in range(0, count, rows):
+        block = records[start:start + rows]
+        for name in names:
+            target = targets[name][start:start + rows]
+            if name not in kinds:
+                target[...] = block[name]
+            elif target.flags.c_contiguous:
+                _KINDS[kinds[name]][1](block[name], out=target)
+            else:
+                target[...] = _KINDS[kinds[name]][1](block[name])
+
+    return result
+
+
+def _parse_spec(dtype_spec):
+    """Translate a record description into a raw numpy dtype.
+
+    Returns:
+        tuple: (dtype, kinds), where dtype is the structured dtype of the raw records,
+            with each VAX field represented by the numpy dtype of the same size, and
+            kinds maps the name of each VAX field to its kind ("f4", "c8", "d8", or
+            "dc16"). Fields with the void VAX dtypes, such as `vax.F4`, are also
+            given the numeric dtype, so they are not taken for padding.
+    """
+
+    kinds = {}
+
+    def translate(name, fmt):
+        if isinstance(fmt, tuple):              # (format, shape), in a dict of lists
+            return (translate(name, fmt[0]),) + fmt[1:]
+        if isinstance(fmt, str) and fmt in _VAX_FORMATS:
+            kinds[name] = _VAX_FORMATS[fmt]
+        elif isinstance(fmt, np.dtype) and _vax_kind(fmt):
+            kinds[name] = _vax_kind(fmt)
+            if fmt.shape:
+                return (_KINDS[kinds[name]][0], fmt.shape)
+        else:
+            return fmt
+        return _KINDS[kinds[name]][0]
+
+    try:
+        if isinstance(dtype_spec, np.dtype) and dtype_spec.names:
+            fields = dtype_spec.fields
+            spec = {'names': list(dtype_spec.names),
+                    'formats': [translate(name, fields[name][0])
+                                for name in dtype_spec.names],
+                    'offsets': [fields[name][1] for name in dtype_spec.names],
+                    'itemsize': dtype_spec.itemsize}
+        elif isinstance(dtype_spec, dict):
+            spec = dict(dtype_spec)
+            spec['formats'] = [translate(name, fmt) for name, fmt
+                               in zip(spec['names'], spec['formats'])]
+        elif isinstance(dtype_spec, (list, tuple)):
+            spec = [(field[0], translate(field[0], field[1])) + tuple(field[2:])
+                    for field in dtype_spec]
+        else:
+            raise TypeError('expected a list or dict')
+
+        dtype = np.dtype(spec)
+
+    except (IndexError, KeyError, TypeError, ValueError) as e:
+        raise ValueError('invalid record description: ' + str(e))
+
+    if not dtype.names or dtype.itemsize == 0:
+        raise ValueError('record description has no fields')
+
+    return (dtype, kinds)
+
+
+def _is_padding(dtype):
+    """True if this field dtype is unstructured void, i.e., padding."""
+
+    return dtype.base.kind == 'V' and dtype.base.names is None
+
+
+def read_table(label_or_params, columns=None, rows=None, table='BINARY_TABLE'):
+    """Read selected columns and rows of a binary table containing VAX-format values.
+
+    The table is memory-mapped, and only the requested columns of the requested rows are
+    converted, so reading two columns of a wide table does a fraction of the work of
+    converting every record. Rows of the file beyond the table's row count, such as the
+    padding at the end of a fixed-length-record file, are never read.
+
+    Args:
+        label_or_params (str or os.PathLike or dict):
+            The path to a PDS3 label describing the table; or a dictionary of table
+            parameters, as returned by `table_params`, which may be edited to correct
+            or override the label.
+        columns (list, optional): The names of the columns to read; None for all.
+        rows (slice or array-like, optional): The rows to read, as a slice, an array of
+            row indices, or a boolean mask; None for all.
+        table (str, optional): The name of the table object in the label, if the first
+            argument is a label.
+
+    Returns:
+        dict: A dictionary mapping each requested column name to a new, C-contiguous
+            array with one element per selected row. VAX values are converted to
+            "<f4", "<c8", "<f8", or "<c16"; other columns are copied unchanged.
+
+    Raises:
+        ValueError: If the label cannot be interpreted, a column name is unknown, or the
+            file is too small for the table.
+    """
+
+    if isinstance(label_or_params, dict):
+        params = label_or_params
+    else:
+        params = table_params(label_or_params, table=table)
+
+    raw_dtype, kinds = _parse_spec(params['record'])
+    names = [name for name in raw_dtype.names
+             if not _is_padding(raw_dtype.fields[name][0])]
+    if columns is None:
+        columns = names
+    for name in columns:
+        if name not in names:
+            raise ValueError('unknown column: ' + repr(name))
+
+    offset = params.get('offset', 0)
+    count = params.get('rows')
+    if count is None:
+        count = (os.path.getsize(params['path']) - offset) // raw_dtype.itemsize
+    elif offset + count * raw_dtype.itemsize > os.path.getsize(params['path']):
+        raise ValueError('file is too small for ' + str(count) + ' rows of '
+                         + str(raw_dtype.itemsize) + ' bytes at offset ' + str(offset))
+
+    records = np.memmap(params['path'], dtype=raw_dtype, mode='r', offset=offset,
+                        shape=(count,))
+    if rows is not None:
+        records = records[rows]
+
+    # Each column is a strided view of the mapped records, which the converters read
+    # in place
+    result = {}
+    for name in columns:
+        column = records[name]
+        if name in kinds:
+            result[name] = _KINDS[kinds[name]][1](column.view(np.ndarray), order='C')
+        else:
+            result[name] = np.array(column, order='C')
+
+    return result
+
+
+def table_params(label, table='BINARY_TABLE'):
+    """Describe a binary table using its PDS3 label, for use by `read_table`.
+
+    Columns of type VAX_REAL, VAX_DOUBLE, and VAX_COMPLEX are VAX-format values; integer,
+    IEEE, and character columns are given the equivalent numpy types. Columns with ITEMS
+    become arrays. Some labels, including that of test_files/C3490702_GEOMA.DAT,
+    overstate the BYTES of a column; a column is truncated where it would overlap the
+    next column or the end of the row.
+
+    Args:
+        label (str or os.PathLike): The path to the label. The data file is found from
+            the table pointer, relative to the directory of the label; the label itself
+            is used if the pointer gives no file name.
+        table (str, optional): The name of the table object and its pointer.
+
+    Returns:
+        dict: The table parameters: "path" (the data file), "offset" (the byte offset of
+            the table), "rows" (the number of rows), and "record" (the row layout, as
+            accepted by `from_vax_records`).
+
+    Raises:
+        ValueError: If the label cannot be interpreted.
+    """
+
+    label = os.fspath(label)
+    with open(label, 'rb') as f:
+        text = f.read().decode('latin-1')
+
+    (scope, node) = _find_object(_parse_label(text), table)
+    if node is None:
+        raise ValueError('table object not found in label: ' + table)
+
+    # Locate the data file and the table within it
+    record_bytes = scope['keywords'].get('RECORD_BYTES', 1)
+    pointer = scope['keywords'].get('^' + table)
+    if pointer is None:
+        raise ValueError('table pointer not found in label: ^' + table)
+
+    filename = None
+    if isinstance(pointer, str):
+        (filename, pointer) = (pointer, 1)
+    elif isinstance(pointer, list):
+        (filename, pointer) = (pointer + [1])[:2]
+
+    if isinstance(pointer, _Quantity):
+        offset = pointer.value - 1
+    else:
+        offset = (pointer - 1) * _value(record_bytes)
+
+    path = label if filename is None else _find_file(os.path.dirname(label), filename)
+
+    # Build the record layout
+    keywords = node['keywords']
+    prefix = _value(keywords.get('ROW_PREFIX_BYTES', 0))
+    row_bytes = _value(keywords['ROW_BYTES'])
+    itemsize = prefix + row_bytes + _value(keywords.get('ROW_SUFFIX_BYTES', 0))
+
+    layout = []
+    for (name, column) in node['objects']:
+        if name != 'COLUMN':
+            continue
+        values = {key: _value(value) for (key, value) in column['keywords'].items()}
+        layout.append((values['START_BYTE'] - 1, values))
+    layout.sort(key=lambda item: item[0])
+
+    names = []
+    formats = []
+    offsets = []
+    for (k, (start, values)) in enumerate(layout):
+        limit = layout[k + 1][0] if k + 1 < len(layout) else row_bytes
+        items = values.get('ITEMS', 1)
+        if 'ITEMS' in values:
+            nbytes = values.get('ITEM_BYTES', values['BYTES'] // items)
+        else:
+            nbytes = min(values['BYTES'], max(limit - start, 1))
+
+        fmt = _column_format(values['DATA_TYPE'], nbytes)
+        names.append(values['NAME'])
+        formats.append(fmt if items == 1 else (fmt, (items,)))
+        offsets.append(prefix + start)
+
+    record = {'names': names, 'formats': formats, 'offsets': offsets,
+              'itemsize': itemsize}
+
+    return {'path': path, 'offset': offset, 'rows': _value(keywords['ROWS']),
+            'record': record}
+
+
+def _column_format(data_type, nbytes):
+    """The record format for a PDS3 column data type of this size."""
+
+    data_type = data_type.replace(' ', '_').upper()
+    if data_type in ('VAX_REAL', 'VAX_DOUBLE', 'VAX_COMPLEX'):
+        kind = {4: 'f4', 8: 'd8'} if data_type != 'VAX_COMPLEX' else {8: 'c8', 16: 'dc16'}
+        if nbytes in kind:
+            return 'vax_' + kind[nbytes]
+    elif data_type in _PDS_NUMBERS:
+        fmt = _PDS_NUMBERS[data_type] + str(nbytes)
+        try:
+            if np.dtype(fmt).itemsize == nbytes:
+                return fmt
+        except TypeError:
+            pass
+    elif data_type in ('CHARACTER', 'ASCII_REAL', 'ASCII_INTEGER', 'TIME', 'DATE'):
+        return 'S' + str(nbytes)
+
+    raise ValueError('unsupported column type: ' + data_type + ' of '
+                     + str(nbytes) + ' bytes')
+
+
+# PDS3 numeric data types with numpy equivalents, by byte order and kind
+_PDS_NUMBERS = {'LSB_INTEGER': '<i', 'VAX_INTEGER': '<i', 'PC_INTEGER': '<i',
+                'LSB_UNSIGNED_INTEGER': '<u', 'VAX_UNSIGNED_INTEGER': '<u',
+                'PC_UNSIGNED_INTEGER': '<u',
+                'MSB_INTEGER': '>i', 'INTEGER': '>i', 'SUN_INTEGER': '>i',
+                'MAC_INTEGER': '>i',
+                'MSB_UNSIGNED_INTEGER': '>u', 'UNSIGNED_INTEGER': '>u',
+                'SUN_UNSIGNED_INTEGER': '>u', 'MAC_UNSIGNED_INTEGER': '>u',
+                'PC_REAL': '<f', 'IEEE_REAL': '>f', 'FLOAT': '>f', 'REAL': '>f',
+                'SUN_REAL': '>f', 'MAC_REAL': '>f'}
+
+
+def _find_file(directory, filename):
+    """The path to a file named in a label, matching its case if necessary."""
+
+    path = os.path.join(directory, filename)
+    if os.path.exists(path):
+        return path
+
+    for name in os.listdir(directory or '.'):
+        if name.upper() == filename.upper():
+            return os.path.join(directory, name)
+
+    raise ValueError('file named in label not found: ' + filename)
+
+
+################################################################################
+# A minimal reader for PDS3 labels
+################################################################################
+
+_Quantity = collections.namedtuple('_Quantity', ['value', 'unit'])
+
+_TOKENS = re.compile(r'/\*.*?\*/|"[^"]*"|\'[^\']*\'|<[^>]*>|[(){},=]|[^\s(){},="<]+',
+                     re.S)
+
+
+def _parse_label(text):
+    """Parse the text of a PDS3 label into a tree of objects.
+
+    Each node is a dict with "keywords", mapping each keyword to its value, and
+    "objects", a list of (name, node) for the objects and groups it contains.
+    """
+
+    tokens = [token for token in _TOKENS.findall(text) if not token.startswith('/*')]
+    root = {'keywords': {}, 'objects': []}
+    stack = [root]
+
+    k = 0
+    try:
+        while k < len(tokens):
+            name = tokens[k]
+            if name == 'END':
+                break
+            if tokens[k + 1] != '=':
+                raise ValueError('expected "=" after ' + name)
+            (value, k) = _parse_value(tokens, k + 2)
+
+            if name in ('OBJECT', 'GROUP'):
+                node = {'keywords': {}, 'objects': []}
+                stack[-1]['objects'].append((value, node))
+                stack.append(node)
+            elif name in ('END_OBJECT', 'END_GROUP'):
+                if len(stack) == 1:
+                    raise ValueError('unbalanced ' + name)
+                stack.pop()
+            else:
+                stack[-1]['keywords'][name] = value
+
+    except IndexError:
+        raise ValueError('label ended unexpectedly')
+
+    return root
+
+
+def _parse_value(tokens, k):
+    """Parse the value starting at tokens[k], returning (value, index of next token)."""
+
+    token = tokens[k]
+    if token in ('(', '{'):
+        values = []
+        k += 1
+        while tokens[k] not in (')', '}'):
+            (value, k) = _parse_value(tokens, k)
+            values.append(value)
+            if tokens[k] == ',':
+                k += 1
+        return (values, k + 1)
+
+    if token[0] in '"\'':
+        value = token[1:-1]
+    else:
+        try:
+            value = int(token)
+        except ValueError:
+            try:
+                value = float(token)
+            except ValueError:
+                value = token
+
+    if k + 1 < len(tokens) and tokens[k + 1].startswith('<'):
+        return (_Quantity(value, tokens[k + 1][1:-1].strip().upper()), k + 2)
+    return (value, k + 1)
+
+
+def _value(value):
+    """A label value without its unit."""
+
+    return value.value if isinstance(value, _Quantity) else value
+
+
+def _find_object(node, name):
+    """Find the first object of this name, returning (enclosing node, object node).
+
+    Returns (None, None) if there is no such object.
+    """
+
+    for (object_name, child) in node['objects']:
+        if object_name == name:
+            return (node, child)
+        (scope, found) = _find_object(child, name)
+        if found is not None:
+            return (scope, found)
+
+    return (None, None)
+
+################################################################################
@@ -0,0 +1,323 @@
+################################################################################
+# vax/parallel.py
+################################################################################
+"""Multiprocess conversion of large arrays through shared memory.
+
+The conversion functions of this package can divide a large array among threads, but
+the interpreter and numpy overheads of each block still run under the GIL. For
+conversions that remain CPU-bound, `convert` divides the work among a persistent pool of
+worker processes instead. The input and output are placed in shared memory blocks,
+which the workers attach by name; each converts a disjoint slice directly into the
+output, so no data passes through pipes, and the result is returned as a numpy array
+over the shared output.
+
+    import vax.parallel
+    ieee = vax.parallel.convert(raw, 'from_vax32', nprocs=8)
+
+The first call starts the workers, which then serve later calls; `start` can be called
+in advance to pay this cost up front, and `shutdown` stops them. The workers are
+started with the "spawn" method, so a script that uses them must protect its main code
+with `if __name__ == '__main__':`. Each shared memory block is released when the last
+array using it is deleted, and any left by a process that exits abnormally are removed
+by the `multiprocessing` resource tracker.
+"""
+
+import multiprocessing
+import numpy as np
+import os
+import threading
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from vax import (_BLOCK, _component, _result_dtype, from_vax32, from_vax64, to_vax32,
+                 to_vax64)
+
+# Supported functions: name -> (function, bytes per value component, True if decoding)
+_FUNCTIONS = {'from_vax32': (from_vax32, 4, True),
+              'from_vax64': (from_vax64, 8, True),
+              'to_vax32': (to_vax32, 4, False),
+              'to_vax64': (to_vax64, 8, False)}
+
+# Below this number of value components, a conversion is done in the calling process
+_MIN_SIZE = 4 * _BLOCK
+
+_POOL = None            # persistent worker pool, created on first use
+_POOL_LOCK = threading.Lock()
+
+
+def convert(data, function='from_vax32', nprocs=None, **options):
+    """Convert an array using a pool of worker processes and shared memory.
+
+    Args:
+        data (np.ndarray or bytes or bytearray or memoryview or str):
+            The input. For "from_vax32" and "from_vax64", it is interpreted as by those
+            functions; for "to_vax32" and "to_vax64", it is an array of real or complex
+            values. An array previously returned by `convert` or `empty` is used in
+            place if it is C-contiguous; any other input is first copied into shared
+            memory.
+        function (str, optional): The conversion to perform: "from_vax32",
+            "from_vax64", "to_vax32", or "to_vax64".
+        nprocs (int, optional): The number of worker processes; None or 0 for one per
+            CPU. Small inputs are converted in the calling process.
+        **options: Other options of the conversion function, such as `special`,
+            `engine`, `overflow`, or `dtype`.
+
+    Returns:
+        np.ndarray: The converted values, in a C-contiguous array over shared memory,
+            with the shape and dtype the conversion function would return.
+
+    Raises:
+        ValueError: If the function or an option is invalid, or as raised by the
+            conversion function.
+    """
+
+    if function not in _FUNCTIONS:
+        raise ValueError('invalid function: ' + repr(function))
+    (func, size, decoding) = _FUNCTIONS[function]
+    for name in ('out', 'inplace', 'nthreads', 'order', 'indices', 'mask'):
+        if name in options:
+            raise ValueError('option is not supported: ' + name)
+
+    # Determine the shape and dtype of the result
+    array = _input_array(data, decoding)
+    if decoding:
+        is_complex = array.dtype.kind == 'c' and array.itemsize == 2 * size
+        natural = ('<c' if is_complex else '<f') + str(2 * size if is_complex else size)
+        dtype = _result_dtype(options.get('dtype'), natural)
+        if array.itemsize >= size:
+            shape = array.shape
+        else:
+            last = array.shape[-1] * array.itemsize
+            if last % size:
+                raise ValueError('last axis size is not a multiple of ' + str(size)
+                                 + ' bytes')
+            shape = array.shape[:-1] + ((last // size,) if last != size else ())
+    else:
+        if 'dtype' in options:
+            raise ValueError('option is not supported: dtype')
+        dtype = np.dtype(('<c' if array.dtype.kind == 'c' else '<f')
+                         + str(2 * size if array.dtype.kind == 'c' else size))
+        shape = array.shape
+
+    # Check the input dtype and the options before starting any work
+    component = _component(dtype)
+    checks = dict(options, dtype=dtype) if decoding else options
+    func(np.empty(0, dtype=array.dtype), **checks)
+
+    result = empty(shape, dtype)
+    count = result.size * (dtype.itemsize // component.itemsize)
+    if count == 0:
+        return result
+
+    (segment, offset) = _shared(array)
+    output = _segment(result)
+    tasks = [(function, segment.name, offset, array.dtype.str, output.name, component.str,
+              start, stop, options) for (start, stop) in _bounds(count, nprocs)]
+
+    if len(tasks) == 1:
+        _run(tasks[0], {segment.name: np.asarray(segment),
+                        output.name: np.asarray(output)})
+    else:
+        for future in [_get_pool(len(tasks)).submit(_work, task) for task in tasks]:
+            future.result()
+
+    return result
+
+
+def empty(shape, dtype):
+    """Return a new, uninitialized array in shared memory.
+
+    The array can be filled, e.g., with `readinto` from a file, and then passed to
+    `convert` without being copied.
+
+    Args:
+        shape (int or tuple): The shape of the array.
+        dtype (np.dtype or str): The dtype of the array.
+
+    Returns:
+        np.ndarray: A C-contiguous array over a new shared memory block.
+    """
+
+    dtype = np.dtype(dtype)
+    shape = (shape,) if np.isscalar(shape) else tuple(shape)
+    segment = _Segment(int(np.prod(shape)) * dtype.itemsize)
+    return np.asarray(segment).view(dtype).reshape(shape)
+
+
+def start(nprocs=None):
+    """Start the worker processes, so that the first conversion need not wait for them.
+
+    Args:
+        nprocs (int, optional): The number of worker processes; None or 0 for one per
+            CPU.
+    """
+
+    nprocs = _nprocs(nprocs)
+    pool = _get_pool(nprocs)
+    for future in [pool.submit(os.getpid) for _ in range(nprocs)]:
+        future.result()
+
+
+def shutdown():
+    """Stop the worker processes; they are restarted by the next conversion."""
+
+    global _POOL
+
+    with _POOL_LOCK:
+        if _POOL is not None:
+            _POOL.shutdown(wait=True)
+            _POOL = None
+
+
+class _Segment(object):
+    """A shared memory block, unlinked when the last array using it is deleted.
+
+    Arrays are made from the block with `np.asarray`, through `__array_interface__`, so
+    that each keeps a reference to this object rather than to the block's buffer.
+    """
+
+    def __init__(self, nbytes):
+        self.shm = shared_memory.SharedMemory(create=True, size=max(nbytes, 1))
+        self.name = self.shm.name
+        self._export = np.frombuffer(self.shm.buf, dtype='u1')
+        self.__array_interface__ = {'data': (self._export.ctypes.data, False),
+                                    'shape': (nbytes,), 'typestr': '|u1', 'version': 3}
+
+    def __del__(self):
+        if self.shm is not None:
+            self._export = None
+            self.shm.close()
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:           # pragma: no cover
+                pass
+            self.shm = None
+
+
+def _input_array(data, decoding):
+    """The input as a numpy array."""
+
+    if isinstance(data, np.ndarray):
+        return data
+    if decoding and isinstance(data, str):
+        data = bytes(data, encoding='latin8')
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return np.frombuffer(data, dtype='u1')
+    if decoding:
+        raise ValueError('input must be an array or buffer')
+    return np.asarray(data)
+
+
+def _segment(array):
+    """The _Segment containing an array, or None."""
+
+    base = array
+    while isinstance(base, np.ndarray):
+        base = base.base
+    return base if isinstance(base, _Segment) else None
+
+
+def _shared(array):
+    """The segment containing an array and the byte offset of the array within it.
+
+    The array is copied into a new segment unless it is a C-contiguous view of one.
+    """
+
+    segment = _segment(array)
+    if segment is not None and array.flags.c_contiguous:
+        address = segment.__array_interface__['data'][0]
+        return (segment, array.__array_interface__['data'][0] - address)
+
+    copy = empty(array.shape, array.dtype)
+    copy[...] = array
+    return (_segment(copy), 0)
+
+
+def _bounds(count, nprocs):
+    """Divide value components into one range per worker, aligned to whole blocks."""
+
+    nprocs = min(_nprocs(nprocs), max(count // _MIN_SIZE, 1))
+    blocks = -(-count // _BLOCK)
+    bounds = [min(count, ((blocks * k) // nprocs) * _BLOCK) for k in range(nprocs + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _work(task):
+    """Perform one task in a worker process, attaching the shared memory by name.
+
+    Each task is a tuple (function, source name, source offset, source dtype, result
+    name, result dtype, start, stop, options), where start and stop index the value
+    components to convert.
+    """
+
+    segments = {}
+    arrays = {}
+    try:
+        for name in (task[1], task[4]):
+            if name not in segments:
+                segments[name] = shared_memory.SharedMemory(name=name)
+                arrays[name] = np.frombuffer(segments[name].buf, dtype='u1')
+        _run(task, arrays)
+
+    except BaseException as e:
+        # Release the views held by the traceback, so that the blocks can be closed
+        traceback.clear_frames(e.__traceback__)
+        raise
+
+    finally:
+        arrays.clear()
+        for shm in segments.values():
+            shm.close()
+
+
+def _run(task, arrays):
+    """Convert the slice of the input described by a task into the output.
+
+    Args:
+        task (tuple): The task; see `_work`.
+        arrays (dict): A 1-D array of dtype "u1" over each shared memory block, keyed
+            by the name of the block.
+    """
+
+    (function, source_name, offset, source_dtype, result_name, result_dtype, start,
+     stop, options) = task
+    (func, size, decoding) = _FUNCTIONS[function]
+
+    itemsize = np.dtype(result_dtype).itemsize
+    result = arrays[result_name][start * itemsize:stop * itemsize].view(result_dtype)
+    if decoding:
+        values = arrays[source_name][offset + start * size:offset + stop * size]
+        func(values, out=result, nthreads=1, **dict(options, dtype=result_dtype))
+    else:
+        component = _component(source_dtype)
+        values = arrays[source_name][offset + start * component.itemsize:
+                                     offset + stop * component.itemsize]
+        func(values.view(component), out=result, nthreads=1, **options)
+
+
+def _nprocs(nprocs):
+    """The number of worker processes to use, given the value of an nprocs argument."""
+
+    if not nprocs or nprocs <= 0:
+        return os.cpu_count() or 1
+    return nprocs
+
+
+def _get_pool(nprocs):
+    """Return the persistent worker pool, enlarging it if necessary.
+
+    A pool that is too small is replaced but not shut down, because another thread may
+    still be submitting work to it; its workers exit once it is no longer referenced.
+    """
+
+    global _POOL
+
+    with _POOL_LOCK:
+        if _POOL is None or _POOL._max_workers < nprocs:
+            # Workers are spawned rather than forked, as the parent may hold threads
+            _POOL = ProcessPoolExecutor(max_workers=nprocs,
+                                        mp_context=multiprocessing.get_context('spawn'))
+        return _POOL
+
+################################################################################